@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+import argparse, sys, tempfile
+
+from pse2json import benchmark
+from pse2json import converter
+from pse2json import synthetic
+
+
+def _sizes(text: str) -> list[int]:
+    sizes = [int(size) for size in text.split(',')]
+    if any(size < 1 for size in sizes):
+        raise argparse.ArgumentTypeError(f'sizes should be positive: {text}')
+    return sizes
+
+
+def _parse_args(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Generate synthetic PSE bills and benchmark pse2json on them.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    generate = subparsers.add_parser('generate', help='write synthetic bill PDFs with their expected JSON')
+    generate.add_argument('directory', help='where the bills are written')
+    generate.add_argument('-n', '--count', type=int, default=10, help='number of bills (default: %(default)s)')
+    generate.add_argument('--seed', type=int, default=0, help='random seed (default: %(default)s)')
+    generate.add_argument('--layout', action='append', choices=sorted(synthetic.LAYOUTS),
+                          help='bill layout, may be repeated (default: all)')
+
+    run = subparsers.add_parser('run', help='measure throughput, stage timings and accuracy')
+    run.add_argument('--sizes', type=_sizes, default=[10, 100, 1000],
+                     help='comma separated corpus sizes (default: 10,100,1000)')
+    run.add_argument('-j', '--jobs', type=int, default=1, help='number of worker processes (default: %(default)s)')
+    run.add_argument('--corpus', metavar='DIR', help='keep the generated corpus in DIR and reuse it')
+    run.add_argument('--seed', type=int, default=0, help='random seed (default: %(default)s)')
+    run.add_argument('--layout', action='append', choices=sorted(synthetic.LAYOUTS),
+                     help='bill layout, may be repeated (default: all)')
+    run.add_argument('--extractor', action='append', choices=sorted(converter.EXTRACTORS),
+                     help='table extractor to compare, may be repeated (default: blocks)')
+
+    record = subparsers.add_parser('record', help='time the stages on stored fixtures and save the results as JSON')
+    record.add_argument('output', help='JSON file for the results')
+    record.add_argument('--repeat', type=int, default=15, help='samples per stage (default: %(default)s)')
+
+    compare = subparsers.add_parser('compare', help='compare two recorded results, fail on a slowdown')
+    compare.add_argument('base', help='results of the baseline')
+    compare.add_argument('new', help='results to check')
+    compare.add_argument('--threshold', type=float, default=0.1,
+                         help='relative slowdown of a stage median that fails the comparison (default: %(default)s)')
+    compare.add_argument('--alpha', type=float, default=0.05,
+                         help='significance level of the Mann-Whitney U test (default: %(default)s)')
+
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _parse_args(argv)
+
+    match args.command:
+        case 'generate':
+            synthetic.generate_corpus(args.directory, args.count, args.seed, args.layout)
+        case 'run':
+            with tempfile.TemporaryDirectory() as temp_dir:
+                results = benchmark.run(
+                    args.corpus or temp_dir, args.sizes, args.jobs, args.seed, args.layout, args.extractor)
+            for line in benchmark.format_results(results):
+                print(line)
+        case 'record':
+            benchmark.save(args.output, benchmark.record(args.repeat))
+        case 'compare':
+            base = benchmark.load(args.base)
+            new = benchmark.load(args.new)
+            if base['environment'] != new['environment']:
+                print('warning: the results were recorded in different environments', file=sys.stderr)
+
+            comparisons = benchmark.compare(base, new, args.threshold, args.alpha)
+            for line in benchmark.format_comparison(comparisons):
+                print(line)
+            if any(comparison.regression for comparison in comparisons):
+                return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
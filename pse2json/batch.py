@@ -0,0 +1,264 @@
+import collections, contextlib, dataclasses, functools
+
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+from typing import Any
+
+from pse2json import checkpoint
+from pse2json import converter
+from pse2json import diagnostics
+from pse2json import electricity_bill as eb
+from pse2json import memory
+from pse2json import metrics
+from pse2json import prefetch
+from pse2json import preflight
+from pse2json import profiling
+from pse2json import rows_reader
+from pse2json import worker_pool
+
+
+@dataclass
+class BatchOptions:
+    jobs: int = 1
+    recycle: worker_pool.RecyclePolicy = field(default_factory=worker_pool.RecyclePolicy)
+    store: memory.StoreSettings = field(default_factory=memory.StoreSettings)
+    checkpoint_dir: str | None = None
+    checkpoint_batch: int = 32
+    resume: bool = False
+    preflight: bool = False
+    profile: profiling.ProfileOptions | None = None
+    metrics: bool = False
+    validation: str = rows_reader.STRICT
+    extractor: str = converter.BLOCKS
+    prefetch_options: prefetch.PrefetchOptions | None = None
+
+
+@dataclass(frozen=True)
+class Skipped:
+    file_name: str
+    reason: str
+
+
+@dataclass
+class BatchResult:
+    bills: list[eb.ElectricityBill] = field(default_factory=list)
+    # input file of every bill
+    file_names: list[str] = field(default_factory=list)
+    skipped: list[Skipped] = field(default_factory=list)
+    failures: list[diagnostics.Diagnostic] = field(default_factory=list)
+    pool_stats: list[worker_pool.PoolStats] = field(default_factory=list)
+    profile: profiling.ProfileReport | None = None
+
+
+_IndexedFile = tuple[int, str]
+
+
+def _failure(file_name: str, e: Exception) -> diagnostics.Diagnostic:
+    diagnostic = diagnostics.of_exception(file_name, e)
+    metrics.PARSE_FAILURES.inc(labels=(diagnostic.stage, diagnostic.kind))
+    return diagnostic
+
+
+def _diagnosed(convert: Callable[..., Any], file_name: str, **kwargs: Any) -> Any:
+    # a failed file doesn't stop the batch, it is reported with the others at the end
+    try:
+        return convert(file_name, **kwargs)
+    except Exception as e:
+        return _failure(file_name, e)
+
+
+def _worker_died(arg: str | tuple[str, bytes | None], e: worker_pool.WorkerDied) -> diagnostics.Diagnostic:
+    # the file a worker was killed on, e.g. when out of memory, fails on its own
+    return _failure(arg[0] if isinstance(arg, tuple) else arg, e)
+
+
+def _init_worker(store: memory.StoreSettings, metrics_enabled: bool) -> None:
+    memory.configure_store(store)
+    metrics.enable(metrics_enabled)
+    # a forked worker starts with the counters of this process, only its own ones are merged back
+    metrics.REGISTRY.drain()
+
+
+def _check_and_convert(
+    check: Callable[..., Any],
+    convert: Callable[..., Any],
+    file_name: str,
+    data: bytes | None = None,
+) -> tuple[preflight.PreflightResult | diagnostics.Diagnostic, Any]:
+    # the bytes read by the check stay in this process, only the result of the check goes back for deduplication
+    checked = check(file_name, data=data)
+    if isinstance(checked, diagnostics.Diagnostic) or checked.rejected:
+        return checked, None
+    return dataclasses.replace(checked, data=None), convert(file_name, data=checked.data)
+
+
+def _convert_prefetched(convert: Callable[..., Any], prefetched: tuple[str, bytes | None]) -> Any:
+    file_name, data = prefetched
+    return convert(file_name, data=data)
+
+
+BillSink = Callable[[str, eb.ElectricityBill], None]
+
+
+class _Batch:
+    def __init__(self, options: BatchOptions, stack: contextlib.ExitStack, on_bill: BillSink | None = None):
+        self.options = options
+        self.result = BatchResult()
+        self._stack = stack
+        self._on_bill = on_bill
+        # files done out of order wait here until the files before them are done, None for no bill
+        self._done: dict[int, tuple[str, eb.ElectricityBill] | None] = {}
+        self._next_index = 0
+        self._deduplicator = preflight.Deduplicator() if options.preflight else None
+        self._journal: checkpoint.CheckpointJournal | None = None
+
+        if options.checkpoint_dir:
+            self._journal = stack.enter_context(checkpoint.CheckpointJournal(
+                options.checkpoint_dir, options.resume, options.checkpoint_batch))
+
+        metrics.enable(options.metrics)
+        if not self._use_pool():
+            memory.configure_store(options.store)
+
+    def _use_pool(self) -> bool:
+        return self.options.jobs > 1 or bool(self.options.recycle.max_tasks or self.options.recycle.max_rss_bytes)
+
+    def _map(
+        self,
+        func: Callable[[str], Any],
+        files: Iterable[_IndexedFile],
+        prefetch_options: prefetch.PrefetchOptions | None = None,
+    ) -> Iterator[tuple[int, str, Any]]:
+        pending: collections.deque[_IndexedFile] = collections.deque()
+
+        def file_names() -> Iterator[str]:
+            for indexed_file in files:
+                pending.append(indexed_file)
+                yield indexed_file[1]
+
+        args: Iterable[Any] = file_names()
+        if prefetch_options is not None:
+            # the files are read ahead while the workers parse, func gets the file name with its bytes
+            args = self._stack.enter_context(prefetch.Prefetcher(args, prefetch_options))
+            func = functools.partial(_convert_prefetched, func)
+
+        if self._use_pool():
+            pool = self._stack.enter_context(worker_pool.WorkerPool(
+                func, self.options.jobs, self.options.recycle, _init_worker, (self.options.store, self.options.metrics),
+                # counters of the worker processes are merged into the registry of this one
+                metrics.drain if self.options.metrics else None,
+                metrics.REGISTRY.merge if self.options.metrics else None,
+                _worker_died))
+            self.result.pool_stats.append(pool.stats)
+            values = pool.imap(args)
+        else:
+            values = map(func, args)
+
+        for value in values:
+            index, file_name = pending.popleft()
+            yield index, file_name, value
+
+    def _finish(self, index: int, file_name: str, bill: eb.ElectricityBill | None = None) -> None:
+        # bills are passed on in the input order as soon as they and the bills before them are known
+        self._done[index] = (file_name, bill) if bill is not None else None
+        while self._next_index in self._done:
+            done = self._done.pop(self._next_index)
+            self._next_index += 1
+            if done is None:
+                continue
+            if self._on_bill is not None:
+                self._on_bill(*done)
+            else:
+                self.result.file_names.append(done[0])
+                self.result.bills.append(done[1])
+
+    def _fail(self, index: int, diagnostic: diagnostics.Diagnostic) -> None:
+        self.result.failures.append(diagnostic)
+        self._finish(index, diagnostic.file_name)
+
+    def _skip(self, index: int, file_name: str, reason: str) -> None:
+        self.result.skipped.append(Skipped(file_name, reason))
+        self._finish(index, file_name)
+
+    def _load_done(self, files: Iterable[str]) -> Iterator[_IndexedFile]:
+        for index, file_name in enumerate(files):
+            if self._journal is not None and self._journal.is_done(file_name):
+                self._finish(index, file_name, self._journal.load_bill(file_name))
+            else:
+                yield index, file_name
+
+    def run(self, file_names: Iterable[str]) -> BatchResult:
+        # file names are consumed lazily, so that conversion starts while the inputs are still being listed
+        files = self._load_done(file_names)
+
+        if self._deduplicator is not None and self._journal is not None:
+            # every bill of the journal is seeded up front, the files that produced them may come later
+            self._deduplicator.seed(
+                self._journal.content_hashes.values(),
+                (preflight.Fingerprint.of_bill(self._journal.load_bill(key)) for key in self._journal.completed))
+
+        convert: Callable[[str], Any] = functools.partial(
+            converter.read_table, validation=self.options.validation, extractor=self.options.extractor)
+        timed = self.options.profile is not None or self.options.metrics
+        if self.options.profile is not None:
+            profile_table = functools.partial(
+                converter.profile_table, validation=self.options.validation, extractor=self.options.extractor)
+            convert = functools.partial(profiling.profiled, profile_table, self.options.profile)
+            self.result.profile = profiling.ProfileReport()
+        elif self.options.metrics:
+            convert = functools.partial(profiling.profiled, convert, profiling.ProfileOptions())
+        convert = functools.partial(_diagnosed, convert)
+
+        if self._deduplicator is not None:
+            # a file is checked and converted by one task, which reads it once
+            check = functools.partial(
+                _diagnosed,
+                preflight.check,
+                page_index=converter.PAGE_INDEX,
+                from_text=converter.FROM_TEXT,
+                to_text=converter.TO_TEXT)
+            convert = functools.partial(_check_and_convert, check, convert)
+
+        for index, file_name, value in self._map(convert, files, self.options.prefetch_options):
+            checked = None
+            if self._deduplicator is not None and not isinstance(value, diagnostics.Diagnostic):
+                checked, value = value
+                if isinstance(checked, diagnostics.Diagnostic):
+                    self._fail(index, checked)
+                    continue
+
+                # a copy of a bill converted before is dropped, even if this one failed to convert
+                reason = checked.rejected or self._deduplicator.check(checked)
+                if reason:
+                    self._skip(index, file_name, reason)
+                    continue
+
+            bill = value
+            if isinstance(bill, diagnostics.Diagnostic):
+                self._fail(index, bill)
+                continue
+
+            if timed:
+                if self.options.metrics:
+                    metrics.observe_stages(bill.timings)
+                if self.result.profile is not None:
+                    self.result.profile.add(bill)
+                bill = bill.value
+
+            if checked is not None:
+                reason = self._deduplicator.record(checked.content_hash, preflight.Fingerprint.of_bill(bill))
+                if reason:
+                    self._skip(index, file_name, reason)
+                    continue
+
+            if self._journal is not None:
+                self._journal.record(file_name, bill, checked.content_hash if checked else None)
+            self._finish(index, file_name, bill)
+
+        return self.result
+
+
+def convert_files(file_names: Iterable[str], options: BatchOptions, on_bill: BillSink | None = None) -> BatchResult:
+    # with on_bill, bills are handed over in the input order as they are converted instead of kept in the result
+    with contextlib.ExitStack() as stack:
+        return _Batch(options, stack, on_bill).run(file_names)
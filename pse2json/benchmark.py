@@ -0,0 +1,327 @@
+import datetime, functools, json, math, multiprocessing, os, platform, statistics, sys, tempfile, time
+
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any
+
+from pse2json import converter
+from pse2json import memory
+from pse2json import profiling
+from pse2json import rows_reader
+from pse2json import synthetic
+from pse2json import table_reader
+from pse2json import worker_pool
+from pse2json.text_block import Rectangle, TextBlock
+
+# import PyMuPDF - python binding for MuPDF
+import fitz
+
+_FIXTURES = os.path.join(os.path.dirname(__file__), 'benchmark_fixtures.json')
+_RESULTS_VERSION = 1
+_END_TO_END_BILLS = 20
+
+
+@dataclass
+class CorpusResult:
+    size: int
+    jobs: int
+    seconds: float
+    bills_per_second: float
+    correct: int
+    failed: int
+    peak_rss_bytes: int
+    extractor: str = converter.BLOCKS
+    # per stage p50 and p90 in seconds
+    stages: dict[str, tuple[float, float]] = field(default_factory=dict)
+
+    @property
+    def accuracy(self) -> float:
+        return self.correct / self.size if self.size else 0.0
+
+
+def _convert_checked(file_name: str, extractor: str) -> tuple[profiling.Profiled | None, bool]:
+    convert = functools.partial(converter.profile_table, extractor=extractor)
+    try:
+        profile = profiling.profiled(convert, profiling.ProfileOptions(), file_name)
+    except Exception:
+        return None, False
+
+    correct = profile.value == synthetic.expected_bill(file_name)
+    # the bill itself is not needed by the caller, don't send it between processes
+    profile.value = None
+    return profile, correct
+
+
+def run_corpus(file_names: list[str], jobs: int = 1, extractor: str = converter.BLOCKS) -> CorpusResult:
+    # every corpus is converted by a fresh process, so that its peak RSS is neither that of generating the corpus
+    # nor that of a larger corpus converted before it
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(_run_corpus, file_names, jobs, extractor).result()
+
+
+def _run_corpus(file_names: list[str], jobs: int, extractor: str) -> CorpusResult:
+    convert = functools.partial(_convert_checked, extractor=extractor)
+    report = profiling.ProfileReport()
+    correct = 0
+    failed = 0
+    pool_stats = None
+
+    start = time.perf_counter()
+    if jobs > 1:
+        with worker_pool.WorkerPool(convert, jobs) as pool:
+            results = list(pool.imap(file_names))
+        pool_stats = pool.stats
+    else:
+        results = [convert(file_name) for file_name in file_names]
+    seconds = time.perf_counter() - start
+
+    for profile, is_correct in results:
+        if profile is None:
+            failed += 1
+        else:
+            report.add(profile)
+        correct += is_correct
+
+    peak_rss_bytes = memory.peak_rss_bytes()
+    if pool_stats is not None:
+        peak_rss_bytes = max(pool_stats.worker_peak_rss_bytes, default=0)
+
+    stages = {}
+    for name, values in report.stages.items():
+        values = sorted(values)
+        stages[name] = (profiling.percentile(values, 50), profiling.percentile(values, 90))
+
+    return CorpusResult(
+        size=len(file_names),
+        jobs=jobs,
+        seconds=seconds,
+        bills_per_second=len(file_names) / seconds if seconds else 0.0,
+        correct=correct,
+        failed=failed,
+        peak_rss_bytes=peak_rss_bytes,
+        extractor=extractor,
+        stages=stages)
+
+
+def run(corpus_dir: str, sizes: list[int], jobs: int = 1, seed: int = 0,
+        layouts: list[str] | None = None, extractors: list[str] | None = None) -> list[CorpusResult]:
+    # the largest corpus is generated once, smaller sizes use its first files
+    file_names = synthetic.generate_corpus(corpus_dir, max(sizes), seed, layouts)
+    return [
+        run_corpus(file_names[:size], jobs, extractor)
+        for extractor in extractors or [converter.BLOCKS]
+        for size in sorted(sizes)]
+
+
+def format_results(results: list[CorpusResult]) -> list[str]:
+    lines = [f'{"extractor":<9} {"bills":>8} {"jobs":>4} {"seconds":>9} {"bills/s":>9} {"accuracy":>8} {"peak MB":>8}']
+    for result in results:
+        lines.append(
+            f'{result.extractor:<9} {result.size:>8} {result.jobs:>4} {result.seconds:>9.3f} '
+            f'{result.bills_per_second:>9.1f} {result.accuracy:>8.1%} {memory.to_mb(result.peak_rss_bytes):>8.1f}')
+
+    # stages of the largest corpus of every extractor
+    largest: dict[str, CorpusResult] = {}
+    for result in results:
+        if result.extractor not in largest or result.size > largest[result.extractor].size:
+            largest[result.extractor] = result
+
+    for result in largest.values():
+        lines.append(f'stages of {result.size} bills with {result.extractor}, p50 / p90 ms:')
+        for name, (p50, p90) in sorted(result.stages.items(), key=lambda item: -item[1][0]):
+            lines.append(f'  {name:<24} {p50 * 1000:>9.3f} {p90 * 1000:>9.3f}')
+    return lines
+
+
+@dataclass(frozen=True)
+class Fixture:
+    name: str
+    blocks: list[TextBlock]
+    rows: list[str]
+
+
+def load_fixtures(path: str = _FIXTURES) -> tuple[str, str, list[Fixture]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    fixtures = [
+        Fixture(
+            case['name'],
+            [TextBlock(Rectangle(*block[:4]), block[4]) for block in case['blocks']],
+            case['rows'])
+        for case in data['cases']]
+    return data['from_text'], data['to_text'], fixtures
+
+
+def _time_calls(call: Callable[[], Any], repeat: int, min_seconds: float) -> list[float]:
+    # calibrate the number of calls per sample, so that a sample is long enough for the timer
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            call()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            break
+        loops *= 2
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            call()
+        samples.append((time.perf_counter() - start) / loops)
+    return samples
+
+
+def environment() -> dict[str, Any]:
+    return {
+        'python': sys.version.split()[0],
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'pymupdf': fitz.VersionBind,
+        'mupdf': fitz.VersionFitz,
+    }
+
+
+def record(repeat: int = 15, min_seconds: float = 0.01, seed: int = 0) -> dict[str, Any]:
+    from_text, to_text, fixtures = load_fixtures()
+
+    def read_table_rows() -> None:
+        for fixture in fixtures:
+            table_reader.read_table_rows(fixture.blocks, from_text, to_text)
+
+    def read_electricity_bill() -> None:
+        for fixture in fixtures:
+            rows_reader.read_electricity_bill(fixture.rows)
+
+    def read_electricity_bill_unchecked() -> None:
+        for fixture in fixtures:
+            rows_reader.read_electricity_bill(fixture.rows, rows_reader.OFF)
+
+    stages = {
+        'read_table_rows': _time_calls(read_table_rows, repeat, min_seconds),
+        'read_electricity_bill': _time_calls(read_electricity_bill, repeat, min_seconds),
+        'read_electricity_bill_unchecked': _time_calls(read_electricity_bill_unchecked, repeat, min_seconds),
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_names = synthetic.generate_corpus(directory, _END_TO_END_BILLS, seed)
+
+        def read_table() -> None:
+            for file_name in file_names:
+                converter.read_table(file_name)
+
+        def read_table_words() -> None:
+            for file_name in file_names:
+                converter.read_table(file_name, extractor=converter.WORDS)
+
+        stages['read_table'] = _time_calls(read_table, repeat, min_seconds)
+        stages['read_table_words'] = _time_calls(read_table_words, repeat, min_seconds)
+
+    return {
+        'version': _RESULTS_VERSION,
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'environment': environment(),
+        'unit': 'seconds per pass over the fixtures',
+        'stages': {name: {'median': statistics.median(samples), 'samples': samples} for name, samples in stages.items()},
+    }
+
+
+def save(path: str, results: dict[str, Any]) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+        f.write('\n')
+
+
+def load(path: str) -> dict[str, Any]:
+    with open(path, 'r', encoding='utf-8') as f:
+        results = json.load(f)
+    if results.get('version') != _RESULTS_VERSION:
+        raise ValueError(f'Unsupported benchmark results version in {path}: {results.get("version")}')
+    return results
+
+
+def _mann_whitney_p(a: list[float], b: list[float]) -> float:
+    # two-sided p-value of the Mann-Whitney U test, normal approximation with average ranks for ties
+    values = sorted([(value, 0) for value in a] + [(value, 1) for value in b])
+    ranks = [0.0] * len(values)
+    i = 0
+    while i < len(values):
+        j = i
+        while j + 1 < len(values) and values[j + 1][0] == values[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        i = j + 1
+
+    n1, n2 = len(a), len(b)
+    rank_sum = sum(rank for rank, (_, group) in zip(ranks, values) if group == 0)
+    u = rank_sum - n1 * (n1 + 1) / 2
+    sigma = math.sqrt(n1 * n2 * (n1 + n2 + 1) / 12)
+    if sigma == 0:
+        return 1.0
+    z = (u - n1 * n2 / 2) / sigma
+    return 2 * (1 - statistics.NormalDist().cdf(abs(z)))
+
+
+def _relative_spread(samples: list[float]) -> float:
+    if len(samples) < 4:
+        return 0.0
+    q1, median, q3 = statistics.quantiles(samples, n=4)
+    return (q3 - q1) / median if median else 0.0
+
+
+def _change(base: float, new: float) -> float:
+    # a stage that took no time before has no relative change, any time it takes now is an unbounded slowdown
+    if base == 0:
+        return 0.0 if new == 0 else math.inf
+    return new / base - 1
+
+
+@dataclass(frozen=True)
+class Comparison:
+    stage: str
+    base_median: float
+    new_median: float
+    p_value: float
+    noise: float
+    regression: bool
+
+    @property
+    def change(self) -> float:
+        return _change(self.base_median, self.new_median)
+
+
+def compare(base: dict[str, Any], new: dict[str, Any], threshold: float = 0.1, alpha: float = 0.05) -> list[Comparison]:
+    comparisons = []
+    for stage, base_stage in base['stages'].items():
+        new_stage = new['stages'].get(stage)
+        if new_stage is None:
+            continue
+
+        base_samples = base_stage['samples']
+        new_samples = new_stage['samples']
+        base_median = statistics.median(base_samples)
+        new_median = statistics.median(new_samples)
+        p_value = _mann_whitney_p(base_samples, new_samples)
+        # a slowdown within the spread of the runs themselves is noise, whatever the test says
+        noise = max(_relative_spread(base_samples), _relative_spread(new_samples))
+        regression = _change(base_median, new_median) > max(threshold, noise) and p_value < alpha
+
+        comparisons.append(Comparison(stage, base_median, new_median, p_value, noise, regression))
+    return comparisons
+
+
+def format_comparison(comparisons: list[Comparison]) -> list[str]:
+    lines = [f'{"stage":<24} {"base ms":>10} {"new ms":>10} {"change":>8} {"noise":>7} {"p":>7}']
+    for c in comparisons:
+        verdict = '  REGRESSION' if c.regression else ''
+        change = f'{c.change:>+8.1%}' if math.isfinite(c.change) else f'{"n/a":>8}'
+        lines.append(
+            f'{c.stage:<24} {c.base_median * 1000:>10.3f} {c.new_median * 1000:>10.3f} '
+            f'{change} {c.noise:>7.1%} {c.p_value:>7.3f}{verdict}')
+    return lines
@@ -0,0 +1,139 @@
+import re
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from pse2json.text_block import TextBlock
+
+# kinds of line items, each one has its own parser in rows_reader
+IGNORE = 'ignore'
+USAGE = 'usage'
+BASIC_CHARGE = 'basic_charge'
+TIER = 'tier'
+DATED_CHARGE = 'dated_charge'
+CHARGE = 'charge'
+AMOUNT = 'amount'
+TAX_RATE = 'tax_rate'
+
+_KINDS_WITHOUT_FIELD = (IGNORE, USAGE)
+_KINDS = _KINDS_WITHOUT_FIELD + (BASIC_CHARGE, TIER, DATED_CHARGE, CHARGE, AMOUNT, TAX_RATE)
+
+
+@dataclass(frozen=True)
+class LineItem:
+    label: str
+    kind: str
+    # bill field the parsed value goes to
+    field: str | None = None
+    # the label may be anywhere in the row, not only at its start
+    anywhere: bool = False
+
+
+@dataclass(frozen=True)
+class BillLayout:
+    name: str
+    page_index: int
+    from_text: str
+    to_text: str
+    line_items: tuple[LineItem, ...]
+    # more text that must start a block of the page for the layout to be selected
+    markers: tuple[str, ...] = ()
+    # text that starts a row of its own inside a block
+    split_before: str = ''
+    # a block containing this text ends the row even if it doesn't reach the right edge of the table
+    row_end: str = ''
+    # dropped from the start of rows, case insensitive
+    row_prefix: str = ''
+
+
+class CompiledLayout:
+    def __init__(self, layout: BillLayout):
+        self.layout = layout
+        self.name = layout.name
+        self.page_index = layout.page_index
+        self.from_text = layout.from_text
+        self.to_text = layout.to_text
+        self.split_before = layout.split_before
+        self.row_end = layout.row_end
+        self.row_prefix = re.compile('^' + re.escape(layout.row_prefix), re.IGNORECASE) if layout.row_prefix else None
+        self.anchors = (layout.from_text, layout.to_text) + layout.markers
+
+        # one alternation for the items at the start of a row, the named group that matched tells the item;
+        # items that may be anywhere are plain substring checks, which are much cheaper than a '.*?' in the pattern
+        self.items: dict[str, tuple[int, LineItem]] = {}
+        self.labels: dict[str, str] = {}
+        self._anywhere: list[tuple[int, str, LineItem]] = []
+        alternatives = []
+        for i, item in enumerate(layout.line_items):
+            if item.kind not in _KINDS:
+                raise ValueError(f'Unknown line item kind in layout {layout.name}: {item.kind}')
+            if (item.field is None) != (item.kind in _KINDS_WITHOUT_FIELD):
+                raise ValueError(f'Unexpected field of \'{item.label}\' in layout {layout.name}: {item.field}')
+
+            if item.field is not None:
+                self.labels.setdefault(item.field, item.label)
+            if item.anywhere:
+                self._anywhere.append((i, item.label, item))
+            else:
+                group = f'item{i}'
+                self.items[group] = (i, item)
+                alternatives.append(f'(?P<{group}>{re.escape(item.label)})')
+        self._pattern = re.compile('|'.join(alternatives)) if alternatives else None
+
+    def line_item(self, row: str) -> LineItem | None:
+        # the first item in the order of the layout wins
+        m = self._pattern.match(row) if self._pattern is not None else None
+        index, item = self.items[m.lastgroup] if m is not None else (len(self.layout.line_items), None)
+
+        for anywhere_index, label, anywhere_item in self._anywhere:
+            if anywhere_index > index:
+                break
+            if label in row:
+                return anywhere_item
+        return item
+
+    def matches(self, blocks: Iterable[TextBlock]) -> bool:
+        texts = [block.text for block in blocks]
+        return all(any(text.startswith(anchor) for text in texts) for anchor in self.anchors)
+
+
+def compile_layout(layout: BillLayout) -> CompiledLayout:
+    return CompiledLayout(layout)
+
+
+PSE_ELECTRIC = compile_layout(BillLayout(
+    name='pse-electric',
+    page_index=1,
+    from_text='Your Electric Charge Details',
+    to_text='Current Electric Charges',
+    split_before=' Basic Charge ',
+    row_end='Taxes',
+    # the first 'Tier 1' row starts with 'Electricity'
+    row_prefix='Electricity ',
+    line_items=(
+        LineItem('Your Electric Charge Details', IGNORE),
+        LineItem('used for service', USAGE, anywhere=True),
+        LineItem('Basic Charge', BASIC_CHARGE, 'basic_charge_cents', anywhere=True),
+        LineItem('Tier 1', TIER, 'tier_1'),
+        LineItem('Tier ', TIER, 'tier_2'),
+        LineItem('Energy Exchange Credit', DATED_CHARGE, 'energy_exchange_credit'),
+        LineItem('Electric Cons. Program Charge', DATED_CHARGE, 'electric_cons_program_charge'),
+        LineItem('Federal Wind Power Credit', DATED_CHARGE, 'federal_wind_power_credit'),
+        LineItem('Renewable Energy Credit', DATED_CHARGE, 'renewable_energy_credit'),
+        LineItem('Power Cost Adjustment', DATED_CHARGE, 'power_cost_adjustment'),
+        LineItem('Other Electric Charges & Credits', CHARGE, 'other'),
+        LineItem('Subtotal', AMOUNT, 'subtotal_cents'),
+        LineItem('Taxes State Utility Tax', TAX_RATE, 'state_utility_tax'),
+        LineItem('Current Electric Charges', AMOUNT, 'total_cents'),
+    )))
+
+# layouts tried in order for every document
+REGISTERED: list[CompiledLayout] = [PSE_ELECTRIC]
+
+
+def register(layout: BillLayout) -> CompiledLayout:
+    compiled = compile_layout(layout)
+    if any(registered.name == compiled.name for registered in REGISTERED):
+        raise ValueError(f'Layout already registered: {compiled.name}')
+    REGISTERED.append(compiled)
+    return compiled
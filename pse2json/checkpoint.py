@@ -0,0 +1,133 @@
+import hashlib, json, os
+
+from pse2json import electricity_bill
+
+_JOURNAL_NAME = 'journal.jsonl'
+_BILLS_DIR = 'bills'
+_DEFAULT_BATCH_SIZE = 32
+
+
+def fsync_path(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def fsync_dir(path: str) -> None:
+    if os.name != 'posix':
+        return  # pragma: no cover
+
+    fsync_path(path)
+
+
+def write_atomic(path: str, text: str) -> None:
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class CheckpointJournal:
+    def __init__(self, directory: str, resume: bool = False, batch_size: int = _DEFAULT_BATCH_SIZE):
+        if batch_size < 1:
+            raise ValueError(f'Checkpoint batch size should be positive: {batch_size}')
+
+        self.directory = directory
+        self.batch_size = batch_size
+        self.completed: dict[str, str] = {}
+        self.content_hashes: dict[str, str] = {}
+        self._pending: list[str] = []
+        # bill files written since the last commit
+        self._unsynced: list[str] = []
+
+        os.makedirs(os.path.join(directory, _BILLS_DIR), exist_ok=True)
+        self._journal_path = os.path.join(directory, _JOURNAL_NAME)
+
+        if resume:
+            self._load()
+
+        self._journal = open(self._journal_path, 'a' if resume else 'w', encoding='utf-8')
+
+    def _load(self) -> None:
+        if not os.path.exists(self._journal_path):
+            return
+
+        with open(self._journal_path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+
+        for line in lines:
+            # a crash in the middle of a commit leaves a truncated last line
+            if not line.endswith('\n'):
+                break
+            entry = json.loads(line)
+            self.completed[entry['input']] = entry['output']
+            if 'hash' in entry:
+                self.content_hashes[entry['input']] = entry['hash']
+
+        # drop the truncated tail, so appended entries start on a new line
+        valid_size = sum(len(line.encode('utf-8')) for line in lines if line.endswith('\n'))
+        if valid_size != os.path.getsize(self._journal_path):
+            with open(self._journal_path, 'r+b') as f:
+                f.truncate(valid_size)
+
+    @staticmethod
+    def _key(file_name: str) -> str:
+        return os.path.abspath(file_name)
+
+    def is_done(self, file_name: str) -> bool:
+        return self._key(file_name) in self.completed
+
+    def record(self, file_name: str, bill: electricity_bill.ElectricityBill, content_hash: str | None = None) -> None:
+        key = self._key(file_name)
+        output = os.path.join(_BILLS_DIR, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+        # the journal doesn't mention the file before it is synced by the commit of its batch
+        path = os.path.join(self.directory, output)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(bill.to_json())
+        self._unsynced.append(path)
+
+        entry = {'input': key, 'output': output}
+        if content_hash is not None:
+            entry['hash'] = content_hash
+            self.content_hashes[key] = content_hash
+
+        self.completed[key] = output
+        self._pending.append(json.dumps(entry) + '\n')
+        if len(self._pending) >= self.batch_size:
+            self.commit()
+
+    def commit(self) -> None:
+        if not self._pending:
+            return
+
+        # the outputs are durable before the journal mentions them
+        for path in self._unsynced:
+            fsync_path(path)
+        self._unsynced.clear()
+        fsync_dir(os.path.join(self.directory, _BILLS_DIR))
+
+        # one write per batch, a torn write is dropped on the next load
+        self._journal.write(''.join(self._pending))
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._pending.clear()
+
+    def load_bill(self, file_name: str) -> electricity_bill.ElectricityBill:
+        output = self.completed[self._key(file_name)]
+        with open(os.path.join(self.directory, output), 'r', encoding='utf-8') as f:
+            return electricity_bill.ElectricityBill.from_json(f.read())
+
+    def close(self) -> None:
+        self.commit()
+        self._journal.close()
+
+    def __enter__(self) -> 'CheckpointJournal':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
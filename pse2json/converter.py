@@ -0,0 +1,137 @@
+import os
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import ContextManager
+
+from pse2json import bill_layout
+from pse2json import diagnostics
+from pse2json import electricity_bill as eb
+from pse2json import memory
+from pse2json import metrics
+from pse2json import pdf_text_block_reader as ptbr
+from pse2json import pdf_text_word_reader as ptwr
+from pse2json import profiling
+from pse2json import rows_reader
+from pse2json import table_reader
+from pse2json import word_table_reader
+from pse2json.text_block import Rectangle, TextBlock, TextWord
+
+PAGE_INDEX = bill_layout.PSE_ELECTRIC.page_index
+FROM_TEXT = bill_layout.PSE_ELECTRIC.from_text
+TO_TEXT = bill_layout.PSE_ELECTRIC.to_text
+
+_Page = list[TextBlock] | list[list[TextWord]]
+
+
+def _select_layout(
+    file_name: str,
+    layouts: list[bill_layout.CompiledLayout],
+    read_page: Callable[[str, int, bytes | None], _Page],
+    matches: Callable[[bill_layout.CompiledLayout, _Page], bool],
+    data: bytes | None = None,
+) -> tuple[bill_layout.CompiledLayout, _Page]:
+    # a page is read once however many layouts expect their table on it
+    pages: dict[int, _Page] = {}
+    for layout in layouts:
+        page = pages.get(layout.page_index)
+        if page is None:
+            page = pages[layout.page_index] = read_page(file_name, layout.page_index, data)
+        if matches(layout, page):
+            return layout, page
+
+    # the only candidate reports what exactly is missing from the page
+    if len(layouts) == 1:
+        return layouts[0], pages[layouts[0].page_index]
+    raise ValueError(f'No known bill layout matches {file_name}')
+
+
+def select_layout(
+    file_name: str,
+    layouts: list[bill_layout.CompiledLayout],
+    data: bytes | None = None,
+) -> tuple[bill_layout.CompiledLayout, list[TextBlock]]:
+    return _select_layout(
+        file_name, layouts, ptbr.read_text_blocks, lambda layout, blocks: layout.matches(blocks), data)
+
+
+@dataclass(frozen=True)
+class Table:
+    layout: bill_layout.CompiledLayout
+    rect: Rectangle
+    rows: list[str]
+
+
+def _table_stage(file_name: str, layout: bill_layout.CompiledLayout) -> ContextManager[None]:
+    return diagnostics.stage(file_name, diagnostics.READ_TABLE_ROWS, layout.page_index, layout.name)
+
+
+def read_block_rows(file_name: str, layouts: list[bill_layout.CompiledLayout], data: bytes | None = None) -> Table:
+    layout, blocks = select_layout(file_name, layouts, data)
+
+    with profiling.stage('read_table_rows'), _table_stage(file_name, layout):
+        rect = table_reader.find_table_rect(blocks, layout.from_text, layout.to_text)
+        return Table(layout, rect, table_reader.read_table_rows(blocks, layout.from_text, layout.to_text, layout, rect))
+
+
+def _read_text_lines(file_name: str, page_index: int, data: bytes | None = None) -> list[list[TextWord]]:
+    words = ptwr.read_text_words(file_name, page_index, data)
+    with profiling.stage('group_lines'):
+        return word_table_reader.group_lines(words)
+
+
+def read_word_rows(file_name: str, layouts: list[bill_layout.CompiledLayout], data: bytes | None = None) -> Table:
+    layout, lines = _select_layout(
+        file_name, layouts, _read_text_lines, lambda layout, lines: word_table_reader.matches(lines, layout), data)
+
+    with profiling.stage('read_table_rows'), _table_stage(file_name, layout):
+        rect, table_lines = word_table_reader.find_table(lines, layout.from_text, layout.to_text)
+        return Table(layout, rect, word_table_reader.read_table_lines(table_lines, layout))
+
+
+# an extractor finds the layout of a bill and reads the rows of its charge table
+Extractor = Callable[[str, list[bill_layout.CompiledLayout], bytes | None], Table]
+
+BLOCKS = 'blocks'
+WORDS = 'words'
+
+EXTRACTORS: dict[str, Extractor] = {
+    BLOCKS: read_block_rows,
+    WORDS: read_word_rows,
+}
+
+
+def read_table(
+    file_name: str,
+    validation: str = rows_reader.STRICT,
+    extractor: str = BLOCKS,
+    data: bytes | None = None,
+) -> eb.ElectricityBill:
+    # failures are raised as diagnostics.ParseError, which tells the stage and what was found on the page
+    with diagnostics.stage(file_name, diagnostics.SELECT_LAYOUT):
+        if data is not None:
+            metrics.BYTES_READ.inc(len(data))
+        elif metrics.enabled():
+            # the file is only stat'ed for the counter when metrics are exported
+            metrics.BYTES_READ.inc(os.path.getsize(file_name))
+        table = EXTRACTORS[extractor](file_name, bill_layout.REGISTERED, data)
+    memory.after_document()
+
+    with profiling.stage('read_electricity_bill'), diagnostics.stage(
+            file_name, diagnostics.READ_ELECTRICITY_BILL, table.layout.page_index, table.layout.name, table.rect):
+        return rows_reader.read_electricity_bill(table.rows, validation, table.layout)
+
+
+def profile_table(
+    file_name: str,
+    validation: str = rows_reader.STRICT,
+    extractor: str = BLOCKS,
+    data: bytes | None = None,
+) -> eb.ElectricityBill:
+    bill = read_table(file_name, validation, extractor, data)
+
+    # the output is serialized once for all bills, so the per bill cost is measured separately
+    with profiling.stage('to_json'):
+        bill.to_json()
+
+    return bill
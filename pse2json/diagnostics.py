@@ -0,0 +1,135 @@
+import contextlib, json, re
+
+from collections.abc import Iterable, Iterator
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from pse2json.text_block import Rectangle
+
+# stages a bill can fail in, named as the profiling stages that cover them
+CONVERT = 'convert'
+PREFLIGHT = 'preflight'
+SELECT_LAYOUT = 'select_layout'
+READ_TABLE_ROWS = 'read_table_rows'
+READ_ELECTRICITY_BILL = 'read_electricity_bill'
+
+_RE_NUMBER = re.compile(r'\d+(?:[.,/]\d+)*')
+_RE_SPACES = re.compile(r'\s+')
+_EXAMPLES = 3
+
+
+@dataclass(frozen=True)
+class Diagnostic:
+    file_name: str
+    stage: str
+    kind: str
+    message: str
+    page: int | None = None
+    layout: str | None = None
+    row: str | None = None
+    # left, top, right, bottom of the charge table on the page
+    table_rect: tuple[float, float, float, float] | None = None
+    expected: int | None = None
+    actual: int | None = None
+
+    @property
+    def signature(self) -> str:
+        # failures that differ only in amounts, dates and file names share a signature
+        message = _RE_SPACES.sub(' ', _RE_NUMBER.sub('#', self.message.replace(self.file_name, '<file>')))
+        return f'{self.stage}: {self.kind}: {message}'
+
+    def to_dict(self) -> dict[str, Any]:
+        return {name: value for name, value in asdict(self).items() if value is not None}
+
+
+class ParseError(ValueError):
+    def __init__(self, diagnostic: Diagnostic):
+        super().__init__(diagnostic)
+        self.diagnostic = diagnostic
+
+    def __str__(self) -> str:
+        return f'{self.diagnostic.file_name}: {self.diagnostic.message}'
+
+
+def error(
+    file_name: str,
+    stage: str,
+    e: Exception,
+    page: int | None = None,
+    layout: str | None = None,
+    table_rect: Rectangle | None = None,
+) -> ParseError:
+    # the row and the amounts come from the BillError of rows_reader, other errors only tell their type
+    return ParseError(Diagnostic(
+        file_name=file_name,
+        stage=stage,
+        kind=getattr(e, 'kind', type(e).__name__),
+        message=str(e),
+        page=page,
+        layout=layout,
+        row=getattr(e, 'row', None),
+        table_rect=(table_rect.left, table_rect.top, table_rect.right, table_rect.bottom) if table_rect else None,
+        expected=getattr(e, 'expected', None),
+        actual=getattr(e, 'actual', None)))
+
+
+@contextlib.contextmanager
+def stage(
+    file_name: str,
+    name: str,
+    page: int | None = None,
+    layout: str | None = None,
+    table_rect: Rectangle | None = None,
+) -> Iterator[None]:
+    # an error of an inner stage already tells where it happened
+    try:
+        yield
+    except ParseError:
+        raise
+    except Exception as e:
+        raise error(file_name, name, e, page, layout, table_rect) from e
+
+
+def of_exception(file_name: str, e: Exception) -> Diagnostic:
+    if isinstance(e, ParseError):
+        return e.diagnostic
+    return error(file_name, CONVERT, e).diagnostic
+
+
+@dataclass
+class DiagnosticReport:
+    groups: dict[str, list[Diagnostic]] = field(default_factory=dict)
+
+    def add(self, diagnostic: Diagnostic) -> None:
+        self.groups.setdefault(diagnostic.signature, []).append(diagnostic)
+
+    def extend(self, diagnostics: Iterable[Diagnostic]) -> None:
+        for diagnostic in diagnostics:
+            self.add(diagnostic)
+
+    @property
+    def count(self) -> int:
+        return sum(len(diagnostics) for diagnostics in self.groups.values())
+
+    def lines(self, examples: int = _EXAMPLES) -> list[str]:
+        if not self.groups:
+            return []
+
+        lines = [f'{self.count} file(s) failed, {len(self.groups)} distinct failure(s):']
+        for signature, diagnostics in sorted(self.groups.items(), key=lambda item: (-len(item[1]), item[0])):
+            lines.append(f'{len(diagnostics):>7} {signature}')
+            for diagnostic in diagnostics[:examples]:
+                details = [f'page {diagnostic.page + 1}'] if diagnostic.page is not None else []
+                if diagnostic.expected is not None:
+                    details.append(f'expected {diagnostic.expected}, actual {diagnostic.actual}')
+                if diagnostic.row is not None:
+                    details.append(f'row \'{diagnostic.row}\'')
+                lines.append(f'        {diagnostic.file_name}' + (f' ({", ".join(details)})' if details else ''))
+        return lines
+
+    def write_jsonl(self, path: str) -> None:
+        # one record per failed file, grouped by signature
+        with open(path, 'w', encoding='utf-8') as f:
+            for signature, diagnostics in self.groups.items():
+                for diagnostic in diagnostics:
+                    f.write(json.dumps({'signature': signature, **diagnostic.to_dict()}) + '\n')
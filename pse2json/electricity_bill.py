@@ -1,7 +1,8 @@
 from dataclasses import dataclass
 from datetime import date
 
-from dataclass_wizard import JSONWizard
+from dataclass_wizard import JSONWizard, skip_if_field
+from dataclass_wizard.conditions import IS_FALSY
 
 @dataclass(frozen=True)
 class DateRange:
@@ -45,6 +46,8 @@ class ElectricityBill(JSONWizard):
     subtotal_cents: int
     state_utility_tax: float
     total_cents: int
+    # validation findings of a leniently parsed bill, only written out when there are any
+    warnings: list[str] = skip_if_field(IS_FALSY(), default_factory=list, compare=False)
 
 @dataclass
 class ElectricityBillList(JSONWizard):
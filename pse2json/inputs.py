@@ -0,0 +1,56 @@
+import glob, os, sys
+
+from collections.abc import Iterable, Iterator
+from typing import BinaryIO
+
+STDIN = '-'
+
+_SUFFIX = '.pdf'
+_GLOB_CHARS = frozenset('*?[')
+_CHUNK_SIZE = 64 * 1024
+
+
+def scan_directory(directory: str) -> Iterator[str]:
+    # entries are sorted, so that runs over the same tree convert the files in the same order;
+    # symbolic links to directories are not followed, so a link loop can't make the scan endless
+    with os.scandir(directory) as it:
+        entries = sorted(it, key=lambda entry: entry.name)
+
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from scan_directory(entry.path)
+        elif entry.name.lower().endswith(_SUFFIX) and entry.is_file():
+            yield entry.path
+
+
+def expand(paths: Iterable[str]) -> Iterator[str]:
+    for path in paths:
+        if not _GLOB_CHARS.isdisjoint(path) and not os.path.lexists(path):
+            # matches are sorted like the directory scan, so that runs convert the files in the same order;
+            # directories matched by a pattern are skipped, '**' already matches the files in them
+            matches = sorted(match for match in glob.iglob(path, recursive=True) if not os.path.isdir(match))
+            # like the shell, a pattern that matches nothing is passed on as is, so that it is reported as missing
+            yield from matches or [path]
+        elif os.path.isdir(path):
+            yield from scan_directory(path)
+        else:
+            yield path
+
+
+def read_file_list(f: BinaryIO, separator: bytes = b'\n') -> Iterator[str]:
+    # read1 returns what is already available, so names are yielded while the producer is still writing the list
+    buffer = b''
+    while chunk := f.read1(_CHUNK_SIZE):
+        *names, buffer = (buffer + chunk).split(separator)
+        yield from (os.fsdecode(name) for name in names if name)
+    if buffer:
+        yield os.fsdecode(buffer)
+
+
+def files_from(path: str, separator: bytes = b'\n') -> Iterator[str]:
+    if path == STDIN:
+        yield from read_file_list(sys.stdin.buffer, separator)
+        return
+
+    with open(path, 'rb') as f:
+        yield from read_file_list(f, separator)
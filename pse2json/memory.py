@@ -0,0 +1,114 @@
+import math, os, resource, sys
+
+from dataclasses import dataclass
+
+# import PyMuPDF - python binding for MuPDF
+import fitz
+
+_MB = 1024 * 1024
+
+
+@dataclass
+class StoreSettings:
+    limit_bytes: int = 0
+    shrink_every: int = 0
+    shrink_percent: int = 50
+
+
+_settings = StoreSettings()
+_documents = 0
+
+
+def configure_store(settings: StoreSettings) -> None:
+    global _settings, _documents
+
+    if settings.limit_bytes < 0:
+        raise ValueError(f'MuPDF store limit should not be negative: {settings.limit_bytes}')
+    if settings.shrink_every < 0:
+        raise ValueError(f'MuPDF store shrink interval should not be negative: {settings.shrink_every}')
+    if not 0 < settings.shrink_percent <= 100:
+        raise ValueError(f'MuPDF store shrink percent should be in (0, 100]: {settings.shrink_percent}')
+
+    _settings = settings
+    _documents = 0
+
+
+def _tools_value(value) -> int | None:
+    # PyMuPDF exposes these as properties in older releases and as functions in newer ones,
+    # the newest releases return None
+    if callable(value):
+        value = value()
+    return None if value is None else int(value)
+
+
+def store_size() -> int | None:
+    return _tools_value(fitz.TOOLS.store_size)
+
+
+def store_maxsize() -> int | None:
+    return _tools_value(fitz.TOOLS.store_maxsize)
+
+
+def describe_store() -> str:
+    size = store_size()
+    maxsize = store_maxsize()
+    if size is None or maxsize is None:
+        return 'MuPDF store: size unknown'
+    return f'MuPDF store: {to_mb(size):.1f} MB of {to_mb(maxsize):.1f} MB'
+
+
+def after_document() -> None:
+    global _documents
+
+    _documents += 1
+
+    if _settings.shrink_every and _documents % _settings.shrink_every == 0:
+        fitz.TOOLS.store_shrink(_settings.shrink_percent)
+        fitz.TOOLS.glyph_cache_empty()
+
+    # MuPDF fixes the store size when its context is created, so the limit is enforced by shrinking
+    if _settings.limit_bytes:
+        size = store_size()
+        if size is None:
+            # the size can't be checked, so shrink after every document
+            fitz.TOOLS.store_shrink(_settings.shrink_percent)
+        elif size > _settings.limit_bytes:
+            fitz.TOOLS.store_shrink(math.ceil(100 * (size - _settings.limit_bytes) / size))
+
+
+def current_rss_bytes() -> int:
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):  # pragma: no cover
+        return peak_rss_bytes()
+
+
+def _ru_maxrss_bytes(who: int) -> int:
+    max_rss = resource.getrusage(who).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def peak_rss_bytes() -> int:
+    # ru_maxrss also counts the process this one was exec'd from, VmHWM is the peak of this process image only
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):  # pragma: no cover
+        pass
+    return _ru_maxrss_bytes(resource.RUSAGE_SELF)
+
+
+def peak_children_rss_bytes() -> int:
+    return _ru_maxrss_bytes(resource.RUSAGE_CHILDREN)
+
+
+def to_mb(size_bytes: int) -> float:
+    return size_bytes / _MB
+
+
+def from_mb(size_mb: float) -> int:
+    return int(size_mb * _MB)
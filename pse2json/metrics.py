@@ -0,0 +1,206 @@
+import bisect, http.server, math, os, threading
+
+from collections.abc import Iterable
+
+_Labels = tuple[str, ...]
+
+_DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, label_names: _Labels = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values: dict[_Labels, float] = {}
+
+    def inc(self, amount: float = 1, labels: _Labels = ()) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: _Labels = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def drain(self) -> dict[_Labels, float]:
+        values = self._values
+        self._values = {}
+        return values
+
+    def merge(self, values: dict[_Labels, float]) -> None:
+        for labels, amount in values.items():
+            self.inc(amount, labels)
+
+    def samples(self) -> list[str]:
+        return [
+            f'{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}'
+            for labels, value in sorted(self._values.items())]
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, label_names: _Labels = (), buckets: tuple[float, ...] = _DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = tuple(sorted(buckets))
+        # per label values: counts per bucket (the last one is +Inf), sum of observed values
+        self._values: dict[_Labels, tuple[list[int], list[float]]] = {}
+
+    def _series(self, labels: _Labels) -> tuple[list[int], list[float]]:
+        series = self._values.get(labels)
+        if series is None:
+            series = self._values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        return series
+
+    def observe(self, value: float, labels: _Labels = ()) -> None:
+        counts, total = self._series(labels)
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def count(self, labels: _Labels = ()) -> int:
+        series = self._values.get(labels)
+        return sum(series[0]) if series else 0
+
+    def drain(self) -> dict[_Labels, tuple[list[int], list[float]]]:
+        values = self._values
+        self._values = {}
+        return values
+
+    def merge(self, values: dict[_Labels, tuple[list[int], list[float]]]) -> None:
+        for labels, (counts, total) in values.items():
+            own_counts, own_total = self._series(labels)
+            for i, count in enumerate(counts):
+                own_counts[i] += count
+            own_total[0] += total[0]
+
+    def samples(self) -> list[str]:
+        lines = []
+        for labels, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                bucket_labels = _format_labels(self.label_names + ('le',), labels + (_format_value(bound),))
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            series_labels = _format_labels(self.label_names, labels)
+            lines.append(f'{self.name}_sum{series_labels} {_format_value(total[0])}')
+            lines.append(f'{self.name}_count{series_labels} {cumulative}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Counter | Histogram] = {}
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f'Metric already registered: {metric.name}')
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, label_names: _Labels = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))
+
+    def histogram(self, name: str, documentation: str, label_names: _Labels = (),
+                  buckets: tuple[float, ...] = _DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def drain(self) -> dict[str, dict]:
+        return {name: values for name, metric in self._metrics.items() if (values := metric.drain())}
+
+    def merge(self, drained: dict[str, dict]) -> None:
+        for name, values in drained.items():
+            self._metrics[name].merge(values)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+BILLS_PARSED = REGISTRY.counter('pse2json_bills_parsed_total', 'Bills parsed successfully.')
+PARSE_FAILURES = REGISTRY.counter(
+    'pse2json_parse_failures_total', 'Files that failed to convert, by the stage and kind of the failure.',
+    ('stage', 'kind'))
+VALIDATION_WARNINGS = REGISTRY.counter(
+    'pse2json_validation_warnings_total', 'Checks that failed on bills parsed with lenient validation.', ('kind',))
+PAGES_SCANNED = REGISTRY.counter('pse2json_pages_scanned_total', 'PDF pages extracted.')
+BYTES_READ = REGISTRY.counter('pse2json_bytes_read_total', 'Bytes of PDF input opened.')
+TABLE_ROWS = REGISTRY.counter('pse2json_table_rows_total', 'Charge table rows reconstructed.')
+STAGE_SECONDS = REGISTRY.histogram('pse2json_stage_seconds', 'Time spent per file in a conversion stage.', ('stage',))
+
+
+_enabled = False
+
+
+def enable(enabled: bool = True) -> None:
+    global _enabled
+    _enabled = enabled
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def drain() -> dict[str, dict]:
+    # a module function, so that a spawned worker process drains its own registry rather than a pickled copy
+    return REGISTRY.drain()
+
+
+def observe_stages(timings: dict[str, float]) -> None:
+    for stage, seconds in timings.items():
+        STAGE_SECONDS.observe(seconds, (stage,))
+
+
+def write_textfile(path: str, registry: Registry = REGISTRY) -> None:
+    # node_exporter's textfile collector may read at any moment, so replace the file atomically
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(registry.render())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    registry: Registry = REGISTRY
+
+    def do_GET(self) -> None:
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_) -> None:
+        pass
+
+
+def serve(port: int, address: str = '127.0.0.1', registry: Registry = REGISTRY) -> http.server.ThreadingHTTPServer:
+    handler = type('MetricsHandler', (_MetricsHandler,), {'registry': registry})
+    server = http.server.ThreadingHTTPServer((address, port), handler)
+    thread = threading.Thread(target=server.serve_forever, name='pse2json-metrics', daemon=True)
+    thread.start()
+    return server
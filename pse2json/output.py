@@ -0,0 +1,343 @@
+import bz2, collections, contextlib, gzip, hashlib, json, lzma, os, re, zlib
+
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO
+
+from pse2json import checkpoint
+from pse2json import electricity_bill as eb
+
+MANIFEST_NAME = 'manifest.json'
+_MANIFEST_VERSION = 1
+# uncompressed bytes of a shard handed to a writer thread at a time
+_CHUNK_BYTES = 1024 * 1024
+
+# partitions of the bills
+NONE = 'none'
+YEAR = 'year'
+MONTH = 'month'
+SHARD = 'shard'
+PARTITIONS = (NONE, YEAR, MONTH, SHARD)
+
+
+def _open_none(f: BinaryIO) -> BinaryIO:
+    return f
+
+
+def _open_gzip(f: BinaryIO) -> BinaryIO:
+    # no file name and time in the header, so that the same bills give the same checksum
+    return gzip.GzipFile(filename='', mode='wb', fileobj=f, compresslevel=6, mtime=0)
+
+
+def _open_lzma(f: BinaryIO) -> BinaryIO:
+    return lzma.LZMAFile(f, 'wb')
+
+
+def _open_bz2(f: BinaryIO) -> BinaryIO:
+    return bz2.BZ2File(f, 'wb')
+
+
+# compression name to the file suffix and the stream compressing into a binary file
+COMPRESSIONS: dict[str, tuple[str, Callable[[BinaryIO], BinaryIO]]] = {
+    'none': ('', _open_none),
+    'gzip': ('.gz', _open_gzip),
+    'lzma': ('.xz', _open_lzma),
+    'bz2': ('.bz2', _open_bz2),
+}
+
+
+_DECOMPRESSORS: dict[str, Callable[[bytes], bytes]] = {
+    'none': bytes,
+    'gzip': gzip.decompress,
+    'lzma': lzma.decompress,
+    'bz2': bz2.decompress,
+}
+
+
+@dataclass(frozen=True)
+class OutputOptions:
+    directory: str
+    partition: str = NONE
+    shards: int = 16
+    compression: str = 'none'
+    writers: int = 4
+    # a shard file is closed and the next part of its partition started after this many bills
+    # or uncompressed bytes, 0 for no limit
+    max_records: int = 0
+    max_bytes: int = 0
+    # every open shard file holds a compressor, up to about 90 MB for lzma, so at most this many are open;
+    # the least recently used one is closed and its partition continues in the next part
+    max_open: int = 8
+
+
+@dataclass(frozen=True)
+class Shard:
+    key: str
+    path: str
+    records: int
+    bytes: int
+    sha256: str
+
+
+@dataclass
+class Manifest:
+    partition: str
+    compression: str
+    shards: list[Shard] = field(default_factory=list)
+
+    @property
+    def records(self) -> int:
+        return sum(shard.records for shard in self.shards)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'version': _MANIFEST_VERSION,
+            'partition': self.partition,
+            'compression': self.compression,
+            'records': self.records,
+            'shards': [
+                {'key': s.key, 'path': s.path, 'records': s.records, 'bytes': s.bytes, 'sha256': s.sha256}
+                for s in self.shards],
+        }
+
+
+def partition_key(options: OutputOptions, file_name: str, bill: eb.ElectricityBill) -> str:
+    # bills are partitioned by the start of their service period
+    match options.partition:
+        case 'none':
+            return 'bills'
+        case 'year':
+            return f'{bill.dates.from_date.year:04d}'
+        case 'month':
+            return f'{bill.dates.from_date.year:04d}-{bill.dates.from_date.month:02d}'
+        case 'shard':
+            # a stable shard, so that reruns and resumed runs put a file into the same shard
+            return f'shard-{zlib.crc32(file_name.encode("utf-8")) % options.shards:05d}'
+    raise ValueError(f'Unknown output partition: {options.partition}')
+
+
+# names of the shard files written for the partition keys above, with the part number
+_RE_SHARD_NAME = re.compile(
+    r'(bills|\d{4}|\d{4}-\d{2}|shard-\d{5})-\d{5}\.jsonl(' +
+    '|'.join(re.escape(suffix) for suffix, _ in COMPRESSIONS.values() if suffix) + r')?(\.tmp)?')
+_RE_JSONL = re.compile(r'.*\.jsonl(\..*)?')
+
+
+class _HashingWriter:
+    def __init__(self, f: BinaryIO):
+        self._f = f
+        self.hash = hashlib.sha256()
+        self.bytes = 0
+
+    def write(self, data: bytes) -> int:
+        self.hash.update(data)
+        self.bytes += len(data)
+        return self._f.write(data)
+
+    def flush(self) -> None:
+        self._f.flush()
+
+
+class _ShardFile:
+    # bills go through the compressor and the hash straight into the file, chunk by chunk
+    def __init__(self, options: OutputOptions, key: str, part: int):
+        suffix, open_stream = COMPRESSIONS[options.compression]
+        self.key = key
+        self.name = f'{key}-{part:05d}.jsonl{suffix}'
+        self.path = os.path.join(options.directory, self.name)
+        self.tmp_path = self.path + '.tmp'
+        self.records = 0
+        self.size = 0
+        self.chunk: list[bytes] = []
+        self.chunk_size = 0
+        # the last chunk handed to the writer threads, chunks of a shard are written one after another
+        self.future: Future | None = None
+
+        self._f = open(self.tmp_path, 'wb')
+        self._writer = _HashingWriter(self._f)
+        self._stream = open_stream(self._writer)
+
+    def add(self, line: bytes) -> None:
+        self.chunk.append(line)
+        self.chunk_size += len(line)
+        self.records += 1
+        self.size += len(line)
+
+    def take_chunk(self) -> bytes:
+        data = b''.join(self.chunk)
+        self.chunk = []
+        self.chunk_size = 0
+        return data
+
+    def write(self, data: bytes) -> None:
+        self._stream.write(data)
+
+    def finish(self, data: bytes) -> Shard:
+        self._stream.write(data)
+        if self._stream is not self._writer:
+            self._stream.close()
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._f.close()
+        os.replace(self.tmp_path, self.path)
+        return Shard(self.key, self.name, self.records, self._writer.bytes, self._writer.hash.hexdigest())
+
+    def discard(self) -> None:
+        self._f.close()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.tmp_path)
+
+
+def _listed_shards(directory: str) -> set[str]:
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return {shard['path'] for shard in json.load(f)['shards']}
+    except (OSError, ValueError, KeyError, TypeError):
+        return set()
+
+
+def _clear_directory(directory: str) -> None:
+    os.makedirs(directory, exist_ok=True)
+    names = os.listdir(directory)
+    listed = _listed_shards(directory)
+    ours = [name for name in names if _RE_SHARD_NAME.fullmatch(name) or name in listed]
+    foreign = sorted(name for name in names if _RE_JSONL.fullmatch(name) and name not in ours)
+    if foreign:
+        raise ValueError(f'Output directory {directory} has JSON lines files not written by pse2json: {foreign[0]}')
+
+    # the old manifest goes first, so that the directory never lists shards that are gone
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(os.path.join(directory, MANIFEST_NAME))
+    for name in ours:
+        os.remove(os.path.join(directory, name))
+
+
+class ShardWriter:
+    def __init__(self, options: OutputOptions):
+        if options.partition not in PARTITIONS:
+            raise ValueError(f'Unknown output partition: {options.partition}')
+        if options.compression not in COMPRESSIONS:
+            raise ValueError(f'Unknown output compression: {options.compression}')
+        if options.shards < 1:
+            raise ValueError(f'Number of output shards should be positive: {options.shards}')
+        if options.max_records < 0 or options.max_bytes < 0:
+            raise ValueError('Shard size limits should not be negative')
+        if options.max_open < 1:
+            raise ValueError(f'Number of open shard files should be positive: {options.max_open}')
+
+        # shards of an earlier run are removed, so that the directory matches the manifest of this one
+        _clear_directory(options.directory)
+
+        self.options = options
+        self.manifest: Manifest | None = None
+        # open shard files from the least to the most recently used
+        self._open: collections.OrderedDict[str, _ShardFile] = collections.OrderedDict()
+        self._parts: dict[str, int] = {}
+        self._finished: list[Future] = []
+        # compression releases the GIL, so shards are compressed in parallel while the bills are converted
+        self._executor = ThreadPoolExecutor(max(options.writers, 1))
+
+    def add(self, file_name: str, bill: eb.ElectricityBill) -> None:
+        key = partition_key(self.options, file_name, bill)
+        shard = self._open.get(key)
+        if shard is not None:
+            self._open.move_to_end(key)
+        else:
+            if len(self._open) >= self.options.max_open:
+                self._finish(self._open.popitem(last=False)[1])
+            part = self._parts.get(key, 0)
+            self._parts[key] = part + 1
+            shard = self._open[key] = _ShardFile(self.options, key, part)
+
+        # one bill per line, so that a shard can be split further downstream
+        shard.add(bill.to_json().encode('utf-8') + b'\n')
+
+        if ((self.options.max_records and shard.records >= self.options.max_records)
+                or (self.options.max_bytes and shard.size >= self.options.max_bytes)):
+            del self._open[key]
+            self._finish(shard)
+        elif shard.chunk_size >= _CHUNK_BYTES:
+            self._submit(shard, shard.write)
+
+    def _submit(self, shard: _ShardFile, write: Callable[[bytes], Any]) -> Future:
+        # at most one chunk of a shard is waiting to be written, which bounds the memory held by slow writers
+        if shard.future is not None:
+            shard.future.result()
+        shard.future = self._executor.submit(write, shard.take_chunk())
+        return shard.future
+
+    def _finish(self, shard: _ShardFile) -> None:
+        self._finished.append(self._submit(shard, shard.finish))
+
+    def close(self) -> Manifest:
+        for key in sorted(self._open):
+            self._finish(self._open[key])
+        self._open.clear()
+        shards = sorted((future.result() for future in self._finished), key=lambda shard: shard.path)
+        self._executor.shutdown()
+
+        self.manifest = Manifest(self.options.partition, self.options.compression, shards)
+        # the manifest is written last, so that it only lists complete shards
+        checkpoint.write_atomic(
+            os.path.join(self.options.directory, MANIFEST_NAME),
+            json.dumps(self.manifest.to_dict(), indent=2) + '\n')
+        checkpoint.fsync_dir(self.options.directory)
+        return self.manifest
+
+    def abort(self) -> None:
+        # shards finished so far stay, without a manifest they are not an output
+        for shard in self._open.values():
+            if shard.future is not None:
+                with contextlib.suppress(Exception):
+                    shard.future.result()
+            shard.discard()
+        self._open.clear()
+        self._executor.shutdown()
+
+    def __enter__(self) -> 'ShardWriter':
+        return self
+
+    def __exit__(self, exc_type, *_) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write(options: OutputOptions, bills: Iterable[tuple[str, eb.ElectricityBill]]) -> Manifest:
+    writer = ShardWriter(options)
+    try:
+        for file_name, bill in bills:
+            writer.add(file_name, bill)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.close()
+
+
+def compression_of(path: str) -> str:
+    for compression, (suffix, _) in COMPRESSIONS.items():
+        if suffix and path.endswith(suffix):
+            return compression
+    return 'none'
+
+
+def read_lines(path: str, compression: str | None = None, sha256: str | None = None) -> list[str]:
+    with open(path, 'rb') as f:
+        data = f.read()
+    if sha256 is not None and hashlib.sha256(data).hexdigest() != sha256:
+        raise ValueError(f'Checksum of {path} doesn\'t match the manifest')
+    return _DECOMPRESSORS[compression or compression_of(path)](data).decode('utf-8').splitlines()
+
+
+def read_records(directory: str) -> Iterator[dict[str, Any]]:
+    # bills of the shards listed in the manifest as written out, shard by shard
+    with open(os.path.join(directory, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != _MANIFEST_VERSION:
+        raise ValueError(f'Unsupported manifest version in {directory}: {manifest.get("version")}')
+
+    for shard in manifest['shards']:
+        lines = read_lines(os.path.join(directory, shard['path']), manifest['compression'], shard['sha256'])
+        yield from (json.loads(line) for line in lines)
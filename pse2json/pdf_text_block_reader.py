@@ -1,15 +1,25 @@
+from pse2json import metrics
+from pse2json import profiling
 from pse2json.text_block import Rectangle, TextBlock
 
 # import PyMuPDF - python binding for MuPDF
 import fitz
 
 
-def read_text_blocks(file_name: str, page_index: int) -> list[TextBlock]:
+def read_text_blocks(file_name: str, page_index: int, data: bytes | None = None) -> list[TextBlock]:
     blocks: list[TextBlock] = []
 
-    with fitz.open(file_name) as doc:
-        page = doc.load_page(page_index)
-        page_blocks = page.get_text('blocks')
+    with profiling.stage('fitz.open'):
+        # the bytes of the file when it was already read, e.g. by a prefetcher
+        opened = fitz.open(stream=data, filetype='pdf') if data is not None else fitz.open(file_name)
+
+    with opened as doc:
+        with profiling.stage('doc.load_page'):
+            page = doc.load_page(page_index)
+        metrics.PAGES_SCANNED.inc()
+
+        with profiling.stage('page.get_text'):
+            page_blocks = page.get_text('blocks')
 
         for page_block in page_blocks:
             left, top, right, bottom, text, *_ = page_block
@@ -0,0 +1,29 @@
+from pse2json import metrics
+from pse2json import profiling
+from pse2json.text_block import Rectangle, TextWord
+
+# import PyMuPDF - python binding for MuPDF
+import fitz
+
+
+def read_text_words(file_name: str, page_index: int, data: bytes | None = None) -> list[TextWord]:
+    words: list[TextWord] = []
+
+    with profiling.stage('fitz.open'):
+        # the bytes of the file when it was already read, e.g. by a prefetcher
+        opened = fitz.open(stream=data, filetype='pdf') if data is not None else fitz.open(file_name)
+
+    with opened as doc:
+        with profiling.stage('doc.load_page'):
+            page = doc.load_page(page_index)
+        metrics.PAGES_SCANNED.inc()
+
+        # the whole page, the table is clipped out of the words once its anchors are found
+        with profiling.stage('page.get_text'):
+            page_words = page.get_text('words')
+
+        for page_word in page_words:
+            left, top, right, bottom, text, *_ = page_word
+            words.append(TextWord(Rectangle(left, top, right, bottom), text))
+
+    return words
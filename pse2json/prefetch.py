@@ -0,0 +1,117 @@
+import asyncio, collections, concurrent.futures, threading
+
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+
+_DEFAULT_BUDGET_BYTES = 64 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class PrefetchOptions:
+    # files read at the same time
+    concurrency: int = 8
+    # bytes read but not yet taken by the consumer, the reads in flight may go over it
+    budget_bytes: int = _DEFAULT_BUDGET_BYTES
+
+
+def _read_file(file_name: str) -> bytes | None:
+    try:
+        with open(file_name, 'rb') as f:
+            return f.read()
+    except OSError:
+        # the file is opened again by its name when it is converted, which reports the error
+        return None
+
+
+class Prefetcher:
+    def __init__(self, file_names: Iterable[str], options: PrefetchOptions = PrefetchOptions()):
+        if options.concurrency < 1:
+            raise ValueError(f'Prefetch concurrency should be positive: {options.concurrency}')
+
+        self.options = options
+        self._file_names = iter(file_names)
+        self._window: collections.deque[tuple[str, concurrent.futures.Future]] = collections.deque()
+        self._submitted = 0
+
+        # state of the event loop thread
+        self._reading = 0
+        self._buffered_bytes = 0
+        self._consumed = 0
+
+        self._executor = concurrent.futures.ThreadPoolExecutor(options.concurrency)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        self._changed = asyncio.run_coroutine_threadsafe(self._create_condition(), self._loop).result()
+
+    async def _create_condition(self) -> asyncio.Condition:
+        return asyncio.Condition()
+
+    def _may_read(self, sequence: int) -> bool:
+        # the oldest file is read whatever the budget, otherwise the files read after it could hold the budget forever
+        return self._reading < self.options.concurrency and (
+            self._buffered_bytes < self.options.budget_bytes or sequence == self._consumed)
+
+    async def _read(self, file_name: str, sequence: int) -> bytes | None:
+        async with self._changed:
+            await self._changed.wait_for(lambda: self._may_read(sequence))
+            self._reading += 1
+
+        data = None
+        try:
+            data = await self._loop.run_in_executor(self._executor, _read_file, file_name)
+        finally:
+            async with self._changed:
+                self._reading -= 1
+                if data is not None:
+                    self._buffered_bytes += len(data)
+                self._changed.notify_all()
+        return data
+
+    async def _release(self, size: int) -> None:
+        async with self._changed:
+            self._buffered_bytes -= size
+            self._consumed += 1
+            self._changed.notify_all()
+
+    def __iter__(self) -> Iterator[tuple[str, bytes | None]]:
+        # file names are taken in the thread of the consumer, as many ahead as a worker pool keeps in flight
+        exhausted = False
+        while True:
+            while not exhausted and len(self._window) < self.options.concurrency * 2:
+                file_name = next(self._file_names, None)
+                if file_name is None:
+                    exhausted = True
+                    break
+                future = asyncio.run_coroutine_threadsafe(self._read(file_name, self._submitted), self._loop)
+                self._window.append((file_name, future))
+                self._submitted += 1
+
+            if not self._window:
+                return
+
+            file_name, future = self._window.popleft()
+            data = future.result()
+            asyncio.run_coroutine_threadsafe(self._release(len(data) if data is not None else 0), self._loop)
+            yield file_name, data
+
+    async def _cancel_reads(self) -> None:
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def close(self) -> None:
+        self._window.clear()
+        asyncio.run_coroutine_threadsafe(self._cancel_reads(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        # a read blocked on the storage is not waited for
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self) -> 'Prefetcher':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
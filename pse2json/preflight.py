@@ -0,0 +1,124 @@
+import hashlib, re
+
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+from pse2json import diagnostics
+from pse2json import electricity_bill
+from pse2json import rows_reader
+
+# import PyMuPDF - python binding for MuPDF
+import fitz
+
+_RE_TOTAL = re.compile(r'\s*\$?\s*([-\N{MINUS SIGN}]?(\d*,)*\d+\.\d{2})')
+
+
+@dataclass(frozen=True)
+class Fingerprint:
+    dates: electricity_bill.DateRange
+    total_cents: int
+
+    @staticmethod
+    def of_bill(bill: electricity_bill.ElectricityBill) -> 'Fingerprint':
+        return Fingerprint(bill.dates, bill.total_cents)
+
+
+@dataclass(frozen=True)
+class PreflightResult:
+    file_name: str
+    content_hash: str
+    rejected: str | None = None
+    fingerprint: Fingerprint | None = None
+    # bytes of the file, so that the converter doesn't read it again
+    data: bytes | None = field(default=None, repr=False, compare=False)
+
+
+def _fingerprint(text: str, to_text: str) -> Fingerprint | None:
+    service_index = text.find('used for service')
+    total_index = text.rfind(to_text)
+    if service_index < 0 or total_index < 0:
+        return None
+
+    dates = rows_reader.find_date_range(text, service_index)
+    total = _RE_TOTAL.match(text, total_index + len(to_text))
+    if dates is None or total is None:
+        return None
+
+    total_text = total.group(1).replace('\N{MINUS SIGN}', '-').replace(',', '')
+    return Fingerprint(dates, int(round(float(total_text) * 100)))
+
+
+def check(
+    file_name: str,
+    page_index: int,
+    from_text: str,
+    to_text: str,
+    data: bytes | None = None,
+) -> PreflightResult:
+    with diagnostics.stage(file_name, diagnostics.PREFLIGHT):
+        if data is None:
+            with open(file_name, 'rb') as f:
+                data = f.read()
+        return _check(file_name, page_index, from_text, to_text, data)
+
+
+def _check(file_name: str, page_index: int, from_text: str, to_text: str, data: bytes) -> PreflightResult:
+    content_hash = hashlib.sha256(data).hexdigest()
+
+    try:
+        doc = fitz.open(stream=data, filetype='pdf')
+    except Exception as e:
+        return PreflightResult(file_name, content_hash, f'not a PDF: {e}')
+
+    with doc:
+        if doc.needs_pass:
+            return PreflightResult(file_name, content_hash, 'encrypted PDF')
+        if doc.page_count <= page_index:
+            return PreflightResult(file_name, content_hash, f'{doc.page_count} page(s), no page {page_index + 1}')
+
+        page = doc.load_page(page_index)
+        from_hits = page.search_for(from_text)
+        if not from_hits:
+            return PreflightResult(file_name, content_hash, f'\'{from_text}\' not found')
+        to_hits = page.search_for(to_text)
+        if not to_hits:
+            return PreflightResult(file_name, content_hash, f'\'{to_text}\' not found')
+
+        # only the text between the anchors is needed for the fingerprint
+        clip = fitz.Rect(0, from_hits[0].y0, page.rect.width, to_hits[-1].y1)
+        text = _normalize(page.get_text('text', clip=clip))
+
+    return PreflightResult(file_name, content_hash, fingerprint=_fingerprint(text, to_text), data=data)
+
+
+def _normalize(text: str) -> str:
+    return ' '.join(text.split())
+
+
+class Deduplicator:
+    def __init__(self):
+        self._hashes: set[str] = set()
+        self._fingerprints: set[Fingerprint] = set()
+
+    def seed(self, content_hashes: Iterable[str], fingerprints: Iterable[Fingerprint]) -> None:
+        self._hashes.update(content_hashes)
+        self._fingerprints.update(fingerprints)
+
+    def check(self, result: PreflightResult) -> str | None:
+        return self._duplicate(result.content_hash, result.fingerprint)
+
+    def record(self, content_hash: str, fingerprint: Fingerprint) -> str | None:
+        # only converted bills are recorded, so that a copy of a bill that failed to convert is still tried,
+        # copies that were converted at the same time are caught here
+        reason = self._duplicate(content_hash, fingerprint)
+        if reason is None:
+            self._hashes.add(content_hash)
+            self._fingerprints.add(fingerprint)
+        return reason
+
+    def _duplicate(self, content_hash: str, fingerprint: Fingerprint | None) -> str | None:
+        if content_hash in self._hashes:
+            return 'duplicate file content'
+        if fingerprint is not None and fingerprint in self._fingerprints:
+            return f'duplicate bill {fingerprint.dates.from_date} - {fingerprint.dates.to_date}'
+        return None
@@ -0,0 +1,152 @@
+import contextlib, cProfile, math, os, time, tracemalloc, zlib
+
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from typing import Any, ContextManager
+
+TOTAL = 'total'
+
+_NULL_STAGE = contextlib.nullcontext()
+_TRACEMALLOC_TOP = 10
+
+# stage timings of the file being profiled, None when profiling is off
+_timings: dict[str, float] | None = None
+
+
+class _Stage:
+    __slots__ = ('_name', '_start')
+
+    def __init__(self, name: str):
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter()
+
+    def __exit__(self, *_) -> None:
+        elapsed = time.perf_counter() - self._start
+        if _timings is not None:
+            _timings[self._name] = _timings.get(self._name, 0.0) + elapsed
+
+
+def stage(name: str) -> ContextManager[None]:
+    if _timings is None:
+        return _NULL_STAGE
+    return _Stage(name)
+
+
+@contextlib.contextmanager
+def collect() -> Iterator[dict[str, float]]:
+    global _timings
+
+    previous = _timings
+    timings: dict[str, float] = {}
+    _timings = timings
+    try:
+        yield timings
+    finally:
+        _timings = previous
+
+
+@dataclass(frozen=True)
+class ProfileOptions:
+    sample_every: int = 0
+    output_dir: str = '.'
+    trace_memory: bool = False
+
+    def is_sampled(self, file_name: str) -> bool:
+        # a stable sample, so that reruns profile the same files
+        return bool(self.sample_every) and zlib.crc32(file_name.encode('utf-8')) % self.sample_every == 0
+
+
+@dataclass
+class Profiled:
+    file_name: str
+    value: Any
+    timings: dict[str, float]
+    traced_peak_bytes: int | None = None
+
+
+def _sample_path(options: ProfileOptions, file_name: str, suffix: str) -> str:
+    base_name = os.path.splitext(os.path.basename(file_name))[0]
+    return os.path.join(options.output_dir, f'{base_name}-{zlib.crc32(file_name.encode("utf-8")):08x}{suffix}')
+
+
+def _write_tracemalloc(path: str, snapshot: tracemalloc.Snapshot, peak_bytes: int) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'peak traced memory: {peak_bytes} bytes\n')
+        for statistic in snapshot.statistics('lineno')[:_TRACEMALLOC_TOP]:
+            f.write(f'{statistic}\n')
+
+
+def profiled(func: Callable[..., Any], options: ProfileOptions, file_name: str, **kwargs: Any) -> Profiled:
+    sampled = options.is_sampled(file_name)
+    profiler = cProfile.Profile() if sampled else None
+    trace_memory = sampled and options.trace_memory and not tracemalloc.is_tracing()
+    traced_peak_bytes = None
+
+    if sampled:
+        os.makedirs(options.output_dir, exist_ok=True)
+    if trace_memory:
+        tracemalloc.start()
+    if profiler is not None:
+        profiler.enable()
+
+    try:
+        start = time.perf_counter()
+        with collect() as timings:
+            value = func(file_name, **kwargs)
+        timings[TOTAL] = time.perf_counter() - start
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(_sample_path(options, file_name, '.prof'))
+
+        if trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            traced_peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            _write_tracemalloc(_sample_path(options, file_name, '.tracemalloc.txt'), snapshot, traced_peak_bytes)
+
+    return Profiled(file_name, value, timings, traced_peak_bytes)
+
+
+def percentile(sorted_values: list[float], percent: float) -> float:
+    # nearest-rank percentile
+    rank = math.ceil(percent / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+@dataclass
+class ProfileReport:
+    stages: dict[str, list[float]] = field(default_factory=dict)
+    files: list[tuple[float, str]] = field(default_factory=list)
+    traced_peaks: list[tuple[int, str]] = field(default_factory=list)
+
+    def add(self, profile: Profiled) -> None:
+        for name, seconds in profile.timings.items():
+            self.stages.setdefault(name, []).append(seconds)
+        self.files.append((profile.timings.get(TOTAL, 0.0), profile.file_name))
+        if profile.traced_peak_bytes is not None:
+            self.traced_peaks.append((profile.traced_peak_bytes, profile.file_name))
+
+    def lines(self, slowest: int = 10) -> list[str]:
+        if not self.files:
+            return ['no files profiled']
+
+        lines = [f'{"stage":<24} {"count":>7} {"p50 ms":>9} {"p90 ms":>9} {"p99 ms":>9} {"max ms":>9} {"total s":>9}']
+        for name, values in sorted(self.stages.items(), key=lambda item: -sum(item[1])):
+            values = sorted(values)
+            lines.append(
+                f'{name:<24} {len(values):>7} ' +
+                ' '.join(f'{percentile(values, p) * 1000:>9.2f}' for p in (50, 90, 99)) +
+                f' {values[-1] * 1000:>9.2f} {sum(values):>9.3f}')
+
+        lines.append(f'slowest {min(slowest, len(self.files))} file(s):')
+        for seconds, file_name in sorted(self.files, reverse=True)[:slowest]:
+            lines.append(f'{seconds * 1000:>9.2f} ms {file_name}')
+
+        if self.traced_peaks:
+            peak_bytes, file_name = max(self.traced_peaks)
+            lines.append(f'largest traced memory peak: {peak_bytes} bytes in {file_name}')
+        return lines
@@ -0,0 +1,218 @@
+import hashlib, json, os
+
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from typing import Any
+
+from pse2json import output
+
+# a bill as written out by read.py, see ElectricityBill.to_dict
+Bill = dict[str, Any]
+_DateKey = tuple[str, str]
+
+# not a part of the bill itself, see ElectricityBill.warnings
+_IGNORED_FIELDS = frozenset(('warnings',))
+
+
+def _canonical(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _without_ignored(bill: Bill) -> Bill:
+    return {name: value for name, value in bill.items() if name not in _IGNORED_FIELDS}
+
+
+def _bill_text(bill: Bill) -> str:
+    return _canonical(_without_ignored(bill))
+
+
+def bill_hash(bill: Bill) -> str:
+    # the same for the same bill whatever the output format, key order or compression it was read from
+    return _digest(_bill_text(bill))
+
+
+def _date_key(dates: dict[str, str] | None) -> _DateKey | None:
+    return (dates['from_date'], dates['to_date']) if dates else None
+
+
+def _format_dates(key: _DateKey | None) -> str:
+    return f'{key[0]} - {key[1]}' if key else 'no dates'
+
+
+def _item_keys(items: list[Any]) -> list[_DateKey] | None:
+    # line items with their own service dates are matched by them, so an inserted item doesn't shift the others
+    keys = [_date_key(item.get('dates')) if isinstance(item, dict) else None for item in items]
+    if None in keys or len(set(keys)) < len(keys):
+        return None
+    return keys
+
+
+def line_item_hashes(bill: Bill) -> dict[str, str]:
+    hashes = {}
+    for name, value in _without_ignored(bill).items():
+        if isinstance(value, list):
+            keys = _item_keys(value)
+            if keys is not None:
+                paths = [f'{name}[{_format_dates(key)}]' for key in keys]
+            else:
+                paths = [f'{name}[{i}]' for i in range(len(value))]
+            hashes.update((path, _digest(_canonical(item))) for path, item in zip(paths, value))
+        else:
+            hashes[name] = _digest(_canonical(value))
+    return hashes
+
+
+@dataclass(frozen=True)
+class Change:
+    path: str
+    old: Any
+    new: Any
+
+
+def _align(old: list[Any], new: list[Any]) -> Iterator[tuple[str, Any, Any]]:
+    old_keys = _item_keys(old)
+    new_keys = _item_keys(new)
+    if old_keys is None or new_keys is None:
+        for i in range(max(len(old), len(new))):
+            yield f'[{i}]', old[i] if i < len(old) else None, new[i] if i < len(new) else None
+        return
+
+    old_by_key = dict(zip(old_keys, old))
+    for i, (key, item) in enumerate(zip(new_keys, new)):
+        yield f'[{i}]', old_by_key.pop(key, None), item
+    for key, item in old_by_key.items():
+        yield f'[{old_keys.index(key)}]', item, None
+
+
+def _diff(path: str, old: Any, new: Any, changes: list[Change]) -> None:
+    if old == new:
+        return
+    if isinstance(old, dict) and isinstance(new, dict):
+        for name in list(old) + [name for name in new if name not in old]:
+            _diff(f'{path}.{name}' if path else name, old.get(name), new.get(name), changes)
+    elif isinstance(old, list) and isinstance(new, list):
+        for index, old_item, new_item in _align(old, new):
+            _diff(path + index, old_item, new_item, changes)
+    else:
+        changes.append(Change(path, old, new))
+
+
+def diff_bills(old: Bill, new: Bill) -> list[Change]:
+    changes: list[Change] = []
+    _diff('', _without_ignored(old), _without_ignored(new), changes)
+    return changes
+
+
+@dataclass
+class BillDiff:
+    dates: _DateKey | None
+    old_hash: str
+    new_hash: str
+    # fields and line items whose hash differs
+    line_items: list[str]
+    changes: list[Change]
+
+
+@dataclass
+class Reconciliation:
+    old_count: int = 0
+    new_count: int = 0
+    unchanged: int = 0
+    changed: list[BillDiff] = field(default_factory=list)
+    only_old: list[tuple[_DateKey | None, str]] = field(default_factory=list)
+    only_new: list[tuple[_DateKey | None, str]] = field(default_factory=list)
+
+    @property
+    def differs(self) -> bool:
+        return bool(self.changed or self.only_old or self.only_new)
+
+    def lines(self) -> list[str]:
+        lines = [
+            f'old: {self.old_count} bill(s), new: {self.new_count} bill(s)',
+            f'unchanged: {self.unchanged}, changed: {len(self.changed)}, '
+            f'only in old: {len(self.only_old)}, only in new: {len(self.only_new)}',
+        ]
+        for bill_diff in self.changed:
+            lines.append(f'changed {_format_dates(bill_diff.dates)}:')
+            lines.extend(f'  {change.path}: {change.old!r} -> {change.new!r}' for change in bill_diff.changes)
+        lines.extend(f'only in old {_format_dates(dates)}' for dates, _ in self.only_old)
+        lines.extend(f'only in new {_format_dates(dates)}' for dates, _ in self.only_new)
+        return lines
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'old_count': self.old_count,
+            'new_count': self.new_count,
+            'unchanged': self.unchanged,
+            'changed': [
+                {
+                    'dates': d.dates,
+                    'old_hash': d.old_hash,
+                    'new_hash': d.new_hash,
+                    'line_items': d.line_items,
+                    'changes': [{'path': c.path, 'old': c.old, 'new': c.new} for c in d.changes],
+                }
+                for d in self.changed],
+            'only_old': [{'dates': dates, 'hash': bill_hash} for dates, bill_hash in self.only_old],
+            'only_new': [{'dates': dates, 'hash': bill_hash} for dates, bill_hash in self.only_new],
+        }
+
+
+def reconcile(old_bills: Iterable[Bill], new_bills: Iterable[Bill]) -> Reconciliation:
+    result = Reconciliation()
+
+    # only the canonical text of the old bills is kept, bills with the same service dates are matched in order
+    old_by_dates: dict[_DateKey | None, list[tuple[str, str]]] = {}
+    for bill in old_bills:
+        text = _bill_text(bill)
+        old_by_dates.setdefault(_date_key(bill.get('dates')), []).append((_digest(text), text))
+        result.old_count += 1
+
+    for bill in new_bills:
+        result.new_count += 1
+        dates = _date_key(bill.get('dates'))
+        new_text = _bill_text(bill)
+        new_hash = _digest(new_text)
+
+        candidates = old_by_dates.get(dates)
+        if not candidates:
+            result.only_new.append((dates, new_hash))
+            continue
+
+        # a bill with the same dates and content is preferred over the first one with the same dates
+        index = next((i for i, (old_hash, _) in enumerate(candidates) if old_hash == new_hash), 0)
+        old_hash, old_text = candidates.pop(index)
+        if old_hash == new_hash:
+            result.unchanged += 1
+        else:
+            old_bill = json.loads(old_text)
+            old_items = line_item_hashes(old_bill)
+            new_items = line_item_hashes(bill)
+            line_items = [path for path in old_items | new_items if old_items.get(path) != new_items.get(path)]
+            result.changed.append(BillDiff(dates, old_hash, new_hash, line_items, diff_bills(old_bill, bill)))
+
+    for dates, candidates in old_by_dates.items():
+        result.only_old.extend((dates, old_hash) for old_hash, _ in candidates)
+    return result
+
+
+def load_bills(path: str) -> Iterator[Bill]:
+    # an output directory with a manifest, a JSON lines shard or the JSON printed by read.py
+    if os.path.isdir(path):
+        yield from output.read_records(path)
+        return
+
+    compression = output.compression_of(path)
+    if path.endswith('.jsonl' + output.COMPRESSIONS[compression][0]):
+        yield from (json.loads(line) for line in output.read_lines(path, compression))
+        return
+
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    # nothing is printed when no bill was converted, a single bill is printed on its own
+    data = json.loads(text) if text.strip() else {'bills': []}
+    yield from data['bills'] if 'bills' in data else [data]
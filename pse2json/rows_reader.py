@@ -1,24 +1,32 @@
 import datetime, re
 
-from collections.abc import Iterable
+from collections.abc import Callable, Iterable
+from typing import Any
 
+from pse2json import bill_layout
 from pse2json import electricity_bill
+from pse2json import metrics
 
 _FIRST = '(First '
 _FIRST_LEN = len(_FIRST)
 
 _RE_INT = re.compile(r'(\d*,)*\d+')
 _RE_FLOAT = re.compile(r'(\d*,)*\d+(\.\d+)?')
-_RE_DATE_RANGE = re.compile(r'(\d{1,2}/\d{1,2}/\d{4}) \- (\d{1,2}/\d{1,2}/\d{4})')
+_RE_DATE_RANGE = re.compile(r'(\d{1,2})/(\d{1,2})/(\d{4}) \- (\d{1,2})/(\d{1,2})/(\d{4})')
 
 def _date_range_from_match(m: re.Match[str] | None) -> electricity_bill.DateRange | None:
     if m is None:
         return None
-    
-    from_date = datetime.datetime.strptime(m.group(1), '%m/%d/%Y').date()
-    to_date = datetime.datetime.strptime(m.group(2), '%m/%d/%Y').date()
+
+    # much cheaper than strptime, which goes through the locale on every call
+    from_month, from_day, from_year, to_month, to_day, to_year = map(int, m.groups())
+    from_date = datetime.date(from_year, from_month, from_day)
+    to_date = datetime.date(to_year, to_month, to_day)
     return electricity_bill.DateRange(from_date, to_date)
 
+def find_date_range(text: str, pos: int = 0) -> electricity_bill.DateRange | None:
+    return _date_range_from_match(_RE_DATE_RANGE.search(text, pos))
+
 def _float_from_match(m: re.Match[str] | None, default_value: float | None = None) -> float | None:
     if m is None:
         return (float(default_value) if default_value is not None else None)
@@ -31,30 +39,80 @@ def _int_from_match(m: re.Match[str] | None, default_value: int | None = None) -
     
     return int(m.group(0).replace(',', ''))
 
-def _parse_charge(text: str) -> electricity_bill.Charge:
+STRICT = 'strict'
+LENIENT = 'lenient'
+OFF = 'off'
+VALIDATION_MODES = (STRICT, LENIENT, OFF)
+
+UNKNOWN_VALUE = 'unknown_value'
+MISSING_VALUE = 'missing_value'
+MALFORMED_CHARGE = 'malformed_charge'
+MALFORMED_VALUE = 'malformed_value'
+CHARGE_MISMATCH = 'charge_mismatch'
+SUBTOTAL_MISMATCH = 'subtotal_mismatch'
+TOTAL_MISMATCH = 'total_mismatch'
+
+class BillError(ValueError):
+    def __init__(
+        self,
+        kind: str,
+        message: str,
+        row: str | None = None,
+        expected: int | None = None,
+        actual: int | None = None,
+    ):
+        super().__init__(message)
+        self.kind = kind
+        self.row = row
+        self.expected = expected
+        self.actual = actual
+
+    def __reduce__(self):
+        # errors are sent back from worker processes
+        return BillError, (self.kind, str(self), self.row, self.expected, self.actual)
+
+class _Checks:
+    def __init__(self, validation: str):
+        if validation not in VALIDATION_MODES:
+            raise ValueError(f'Unknown validation mode: {validation}')
+        self.enabled = validation != OFF
+        self.strict = validation == STRICT
+        self.warnings: list[str] = []
+
+    def mismatch(self, kind: str, message: str, expected: int, actual: int, row: str | None = None) -> None:
+        if self.strict:
+            raise BillError(kind, message, row, expected, actual)
+        metrics.VALIDATION_WARNINGS.inc(labels=(kind,))
+        self.warnings.append(message)
+
+def _parse_charge(text: str, checks: _Checks) -> electricity_bill.Charge:
     items = text.split(' ')
-    assert len(items) > 4, 'More than 4 tokens expected'
-    assert items[-2] == 'kWh', 'Second from last token should be ''kWh'''
+    if len(items) <= 4:
+        raise BillError(MALFORMED_CHARGE, f'More than 4 tokens expected in \'{text}\'', text)
+    if items[-2] != 'kWh':
+        raise BillError(MALFORMED_CHARGE, f'Second from last token should be \'kWh\' in \'{text}\'', text)
 
     rate_usd_per_kwh = float(items[-4].replace(',', ''))
     consumed_kwh = float(items[-3].replace(',', ''))
     charge_cents = int(items[-1].replace(',', '').replace('.', ''))
 
-    calculated_charge_cents = int(round(rate_usd_per_kwh * consumed_kwh * 100))
-    if abs(calculated_charge_cents - charge_cents) > 2:
-        raise ValueError(
-            f'rate {rate_usd_per_kwh} x consumed {consumed_kwh} ({calculated_charge_cents / 100}) != ' +
-            f'charge {charge_cents / 100} in \'{text}\'')
+    if checks.enabled:
+        calculated_charge_cents = int(round(rate_usd_per_kwh * consumed_kwh * 100))
+        if abs(calculated_charge_cents - charge_cents) > 2:
+            checks.mismatch(
+                CHARGE_MISMATCH,
+                f'rate {rate_usd_per_kwh} x consumed {consumed_kwh} ({calculated_charge_cents / 100}) != ' +
+                f'charge {charge_cents / 100} in \'{text}\'',
+                calculated_charge_cents, charge_cents, text)
 
     return electricity_bill.Charge(rate_usd_per_kwh, consumed_kwh, charge_cents)
 
-def _parse_dated_charge(text: str) -> electricity_bill.DatedCharge:
+def _parse_dated_charge(text: str, checks: _Checks) -> electricity_bill.DatedCharge:
     dates = _date_range_from_match(_RE_DATE_RANGE.search(text))
-    charge = _parse_charge(text)
+    charge = _parse_charge(text, checks)
     return electricity_bill.DatedCharge(dates, charge)
 
-def _parse_tier(text: str) -> tuple[electricity_bill.TierCharge, int]:
-    tier_index = 1 if text.startswith('Tier 1') else 2
+def _parse_tier(text: str, checks: _Checks) -> electricity_bill.TierCharge:
     dates = _date_range_from_match(_RE_DATE_RANGE.search(text))
 
     up_to_kwh = None
@@ -62,110 +120,128 @@ def _parse_tier(text: str) -> tuple[electricity_bill.TierCharge, int]:
     if idx >= 0:
         up_to_kwh = _int_from_match(_RE_INT.match(text[idx + _FIRST_LEN:]))
 
-    charge = _parse_charge(text)
-    return (
-        electricity_bill.TierCharge(
-            dates,
-            up_to_kwh,
-            charge),
-        tier_index)
-
-_OTHER_ELECTRIC_CHARGES_CREDITS = 'Other Electric Charges & Credits'
-_SUBTOTAL = 'Subtotal'
-
-def read_electricity_bill(rows: Iterable[str]) -> electricity_bill.ElectricityBill:
-    dates: electricity_bill.DateRange | None = None
-    used_kwh: float | None = None
-    basic_charge_cents: int = 0
-    tier_1: list[electricity_bill.TierCharge] = []
-    tier_2: list[electricity_bill.TierCharge] = []
-    energy_exchange_credit: list[electricity_bill.DatedCharge] = []
-    electric_cons_program_charge: list[electricity_bill.DatedCharge] = []
-    federal_wind_power_credit: list[electricity_bill.DatedCharge] = []
-    renewable_energy_credit: list[electricity_bill.DatedCharge] = []
-    power_cost_adjustment: list[electricity_bill.DatedCharge] = []
-    other: electricity_bill.Charge | None = None
-    subtotal_cents: int | None = None
-    state_utility_tax_rate: float = 0
-    total_cents: int | None = None
-
-    for row in rows:
-        if row.startswith('Your Electric Charge Details'):
-            pass
-        elif 'used for service' in row:
-            used_kwh = _int_from_match(_RE_INT.match(row))
-            dates = _date_range_from_match(_RE_DATE_RANGE.search(row))
-        elif 'Basic Charge' in row:
-            basic_charge_cents += int(round(float(row.split(' ')[-1]) * 100))
-        elif row.startswith('Tier '):
-            tier, tier_index = _parse_tier(row)
-            if tier_index == 1:
-                tier_1.append(tier)
-            else:
-                tier_2.append(tier)
-        elif row.startswith('Energy Exchange Credit'):
-            energy_exchange_credit.append(_parse_dated_charge(row))
-        elif row.startswith('Electric Cons. Program Charge'):
-            electric_cons_program_charge.append(_parse_dated_charge(row))
-        elif row.startswith('Federal Wind Power Credit'):
-            federal_wind_power_credit.append(_parse_dated_charge(row))
-        elif row.startswith('Renewable Energy Credit'):
-            renewable_energy_credit.append(_parse_dated_charge(row))
-        elif row.startswith('Power Cost Adjustment'):
-            power_cost_adjustment.append(_parse_dated_charge(row))
-        elif row.startswith(_OTHER_ELECTRIC_CHARGES_CREDITS):
-            other = _parse_charge(row)
-        elif row.startswith(_SUBTOTAL):
-            subtotal_cents = int(round(float(row.split(' ')[-1]) * 100))
-        elif row.startswith('Taxes State Utility Tax'):
-            sut_percents = _float_from_match(_RE_FLOAT.search(row.split(") ")[-1]))
-            if sut_percents is None:
-                sut_percents = 0
-            state_utility_tax_rate = sut_percents / 100
-        elif row.startswith('Current Electric Charges'):
-            total_cents = int(round(float(row.split(' ')[-1]) * 100))
-        else:
-            raise ValueError(f'Unknown value found: {row}')
-
-    if dates is None:
-        raise ValueError('Service dates not found')
-    if used_kwh is None:
-        raise ValueError('\'kWh used for service\' not found')
-    if other is None:
-        raise ValueError(f'\'{_OTHER_ELECTRIC_CHARGES_CREDITS}\' not found')
-    if subtotal_cents is None:
-        raise ValueError(f'{_SUBTOTAL} cents not found')
-    if total_cents is None:
-        raise ValueError('Total cents not found')
-
-    other_charge_cents = other.charge_cents if other else None
-    values = [basic_charge_cents,
-        sum(x.charge.charge_cents for x in tier_1),
-        sum(x.charge.charge_cents for x in tier_2),
-        sum(x.charge.charge_cents for x in energy_exchange_credit),
-        sum(x.charge.charge_cents for x in electric_cons_program_charge),
-        sum(x.charge.charge_cents for x in federal_wind_power_credit),
-        sum(x.charge.charge_cents for x in renewable_energy_credit),
-        sum(x.charge.charge_cents for x in power_cost_adjustment),
-        other_charge_cents]
-    total_sum = sum(v for v in values if v)
-
-    if total_sum:
-        assert total_sum == subtotal_cents, f'Subtotal doesn\'t match with calculated sum: expected {total_sum}, actual {subtotal_cents}'
-        assert total_sum == total_cents, 'Total doesn\'t match with calculated sum'
-
-    return electricity_bill.ElectricityBill(
+    charge = _parse_charge(text, checks)
+    return electricity_bill.TierCharge(
         dates,
-        used_kwh,
-        basic_charge_cents,
-        tier_1,
-        tier_2,
-        energy_exchange_credit,
-        electric_cons_program_charge,
-        federal_wind_power_credit,
-        renewable_energy_credit,
-        power_cost_adjustment,
-        other,
-        subtotal_cents,
-        state_utility_tax_rate,
-        total_cents)
+        up_to_kwh,
+        charge)
+
+def _parse_cents(text: str) -> int:
+    return int(round(float(text.split(' ')[-1]) * 100))
+
+def _check_totals(checks: _Checks, values: list[int], subtotal_cents: int, total_cents: int) -> None:
+    total_sum = sum(values)
+    if not total_sum:
+        return
+
+    if total_sum != subtotal_cents:
+        checks.mismatch(
+            SUBTOTAL_MISMATCH,
+            f'Subtotal doesn\'t match with calculated sum: expected {total_sum}, actual {subtotal_cents}',
+            total_sum, subtotal_cents)
+    if total_sum != total_cents:
+        checks.mismatch(
+            TOTAL_MISMATCH,
+            f'Total doesn\'t match with calculated sum: expected {total_sum}, actual {total_cents}',
+            total_sum, total_cents)
+
+_LIST_FIELDS = (
+    'tier_1',
+    'tier_2',
+    'energy_exchange_credit',
+    'electric_cons_program_charge',
+    'federal_wind_power_credit',
+    'renewable_energy_credit',
+    'power_cost_adjustment',
+)
+
+def read_electricity_bill(
+    rows: Iterable[str],
+    validation: str = STRICT,
+    layout: bill_layout.CompiledLayout = bill_layout.PSE_ELECTRIC,
+) -> electricity_bill.ElectricityBill:
+    checks = _Checks(validation)
+    bill = _read_electricity_bill(rows, checks, layout)
+    metrics.BILLS_PARSED.inc()
+    return bill
+
+def _read_usage(row: str, checks: _Checks, values: dict[str, Any], field: str | None) -> None:
+    values['used_kwh'] = _int_from_match(_RE_INT.match(row))
+    values['dates'] = _date_range_from_match(_RE_DATE_RANGE.search(row))
+
+def _read_basic_charge(row: str, checks: _Checks, values: dict[str, Any], field: str) -> None:
+    values[field] += _parse_cents(row)
+
+def _read_tier(row: str, checks: _Checks, values: dict[str, Any], field: str) -> None:
+    values[field].append(_parse_tier(row, checks))
+
+def _read_dated_charge(row: str, checks: _Checks, values: dict[str, Any], field: str) -> None:
+    values[field].append(_parse_dated_charge(row, checks))
+
+def _read_charge(row: str, checks: _Checks, values: dict[str, Any], field: str) -> None:
+    values[field] = _parse_charge(row, checks)
+
+def _read_amount(row: str, checks: _Checks, values: dict[str, Any], field: str) -> None:
+    values[field] = _parse_cents(row)
+
+def _read_tax_rate(row: str, checks: _Checks, values: dict[str, Any], field: str) -> None:
+    sut_percents = _float_from_match(_RE_FLOAT.search(row.split(") ")[-1]))
+    if sut_percents is None:
+        sut_percents = 0
+    values[field] = sut_percents / 100
+
+def _read_nothing(row: str, checks: _Checks, values: dict[str, Any], field: str | None) -> None:
+    pass
+
+_READERS: dict[str, Callable[[str, _Checks, dict[str, Any], str | None], None]] = {
+    bill_layout.IGNORE: _read_nothing,
+    bill_layout.USAGE: _read_usage,
+    bill_layout.BASIC_CHARGE: _read_basic_charge,
+    bill_layout.TIER: _read_tier,
+    bill_layout.DATED_CHARGE: _read_dated_charge,
+    bill_layout.CHARGE: _read_charge,
+    bill_layout.AMOUNT: _read_amount,
+    bill_layout.TAX_RATE: _read_tax_rate,
+}
+
+def _read_electricity_bill(
+    rows: Iterable[str],
+    checks: _Checks,
+    layout: bill_layout.CompiledLayout,
+) -> electricity_bill.ElectricityBill:
+    values: dict[str, Any] = {name: [] for name in _LIST_FIELDS}
+    values['basic_charge_cents'] = 0
+    values['state_utility_tax'] = 0.0
+
+    line_item = layout.line_item
+    for row in rows:
+        item = line_item(row)
+        if item is None:
+            raise BillError(UNKNOWN_VALUE, f'Unknown value found: {row}', row)
+        try:
+            _READERS[item.kind](row, checks, values, item.field)
+        except BillError as e:
+            if e.row is None:
+                e.row = row
+            raise
+        except ValueError as e:
+            # a number that failed to parse
+            raise BillError(MALFORMED_VALUE, f'{e} in \'{row}\'', row) from e
+
+    if values.get('dates') is None:
+        raise BillError(MISSING_VALUE, 'Service dates not found')
+    if values.get('used_kwh') is None:
+        raise BillError(MISSING_VALUE, '\'kWh used for service\' not found')
+    for name in ('other', 'subtotal_cents', 'total_cents'):
+        if name not in values:
+            raise BillError(MISSING_VALUE, f'\'{layout.labels.get(name, name)}\' not found')
+
+    if checks.enabled:
+        _check_totals(
+            checks,
+            [values['basic_charge_cents'], values['other'].charge_cents] +
+            [sum(x.charge.charge_cents for x in values[name]) for name in _LIST_FIELDS],
+            values['subtotal_cents'],
+            values['total_cents'])
+
+    return electricity_bill.ElectricityBill(warnings=checks.warnings, **values)
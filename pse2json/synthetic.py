@@ -0,0 +1,288 @@
+import datetime, os, random
+
+from dataclasses import dataclass
+
+from pse2json import converter
+from pse2json import electricity_bill as eb
+
+# import PyMuPDF - python binding for MuPDF
+import fitz
+
+_FONT_SIZE = 8
+_LINE_HEIGHT = 10
+_ROW_GAP = 10
+_TABLE_LEFT = 22
+_TABLE_RIGHT = 374
+_TAXES_RIGHT = 321
+_UNITS_LEFT = 240
+_TOP = 110
+
+_STATE_UTILITY_TAX = 3.873
+_BASIC_CHARGE_CENTS = 749
+
+_DATED_CHARGES = {
+    'energy_exchange_credit': ('Energy Exchange Credit', -0.0095, -0.005),
+    'electric_cons_program_charge': ('Electric Cons. Program Charge', 0.003, 0.006),
+    'federal_wind_power_credit': ('Federal Wind Power Credit', -0.002, -0.001),
+    'renewable_energy_credit': ('Renewable Energy Credit', -0.0001, -0.00002),
+    'power_cost_adjustment': ('Power Cost Adjustment', 0.001, 0.003),
+}
+
+
+@dataclass(frozen=True)
+class Layout:
+    name: str
+    # dates of a charge wrap to a second line and rate, units and charge form a block of their own
+    wrap_dates: bool
+    # the first tier row starts with 'Electricity'
+    electricity_label: bool
+    font_size: float = _FONT_SIZE
+    line_height: float = _LINE_HEIGHT
+    row_gap: float = _ROW_GAP
+    # 'Electricity' is a line of its own a row pitch above the first tier row
+    electricity_line: bool = False
+
+
+LAYOUTS = {
+    'compact': Layout('compact', wrap_dates=False, electricity_label=False),
+    'wrapped': Layout('wrapped', wrap_dates=True, electricity_label=True),
+    # the geometry of a real bill: words about 8.9pt high, wrapped lines about 9.2pt apart and rows about 11.2pt
+    'dense': Layout(
+        'dense', wrap_dates=True, electricity_label=False, font_size=6.5, line_height=9.2, row_gap=2,
+        electricity_line=True),
+}
+
+
+@dataclass(frozen=True)
+class _Row:
+    label: str
+    dates: str = ''
+    units: str = ''
+    amount: str = ''
+
+
+def _format_date(value: datetime.date) -> str:
+    return f'{value.month}/{value.day}/{value.year}'
+
+
+def _format_dates(dates: eb.DateRange | None) -> str:
+    if dates is None:
+        return ''
+    return f'({_format_date(dates.from_date)} - {_format_date(dates.to_date)})'
+
+
+def _format_kwh(kwh: float) -> str:
+    return f'{kwh:,.0f}' if kwh == int(kwh) else f'{kwh:,.1f}'
+
+
+def _format_cents(cents: int) -> str:
+    return f'{cents / 100:,.2f}'
+
+
+def _charge(rate: float, consumed_kwh: float) -> eb.Charge:
+    return eb.Charge(rate, consumed_kwh, int(round(rate * consumed_kwh * 100)))
+
+
+def _units(charge: eb.Charge) -> str:
+    return f'{charge.rate_usd_per_kwh:.6f} {_format_kwh(charge.consumed_kwh)} kWh'
+
+
+def _split_kwh(total_kwh: int, segments: list[eb.DateRange]) -> list[float]:
+    days = [(s.to_date - s.from_date).days + 1 for s in segments]
+    shares = [round(total_kwh * d / sum(days), 1) for d in days[:-1]]
+    return shares + [round(total_kwh - sum(shares), 1)]
+
+
+def random_bill(rng: random.Random) -> eb.ElectricityBill:
+    from_date = datetime.date(2019, 1, 1) + datetime.timedelta(days=rng.randrange(6 * 365))
+    period_days = rng.randint(28, 33)
+    to_date = from_date + datetime.timedelta(days=period_days - 1)
+    dates = eb.DateRange(from_date, to_date)
+    used_kwh = rng.randint(200, 2500)
+
+    # a rate change in the middle of the period splits every charge in two dated lines
+    segments = [dates]
+    if rng.random() < 0.5:
+        split = from_date + datetime.timedelta(days=rng.randint(5, period_days - 5))
+        segments = [
+            eb.DateRange(from_date, split - datetime.timedelta(days=1)),
+            eb.DateRange(split, to_date)]
+    dated = len(segments) > 1
+    segment_kwh = _split_kwh(used_kwh, segments)
+
+    tier_1: list[eb.TierCharge] = []
+    tier_2: list[eb.TierCharge] = []
+    for segment, kwh in zip(segments, segment_kwh):
+        days = (segment.to_date - segment.from_date).days + 1
+        limit = round(600 * days / period_days)
+        segment_dates = segment if dated else None
+        tier_1_kwh = min(kwh, limit)
+        tier_1.append(eb.TierCharge(segment_dates, limit, _charge(round(rng.uniform(0.08, 0.11), 6), tier_1_kwh)))
+        if kwh > limit:
+            tier_2_kwh = round(kwh - limit, 1)
+            tier_2.append(eb.TierCharge(segment_dates, None, _charge(round(rng.uniform(0.1, 0.13), 6), tier_2_kwh)))
+
+    dated_charges: dict[str, list[eb.DatedCharge]] = {}
+    for name, (_, low, high) in _DATED_CHARGES.items():
+        dated_charges[name] = []
+        if rng.random() < 0.6:
+            for segment, kwh in zip(segments, segment_kwh):
+                charge = _charge(round(rng.uniform(low, high), 6), kwh)
+                dated_charges[name].append(eb.DatedCharge(segment if dated else None, charge))
+
+    other = _charge(round(rng.uniform(0.0, 0.008), 6), used_kwh)
+
+    subtotal_cents = (
+        _BASIC_CHARGE_CENTS
+        + sum(x.charge.charge_cents for x in tier_1)
+        + sum(x.charge.charge_cents for x in tier_2)
+        + sum(x.charge.charge_cents for charges in dated_charges.values() for x in charges)
+        + other.charge_cents)
+
+    return eb.ElectricityBill(
+        dates,
+        used_kwh,
+        _BASIC_CHARGE_CENTS,
+        tier_1,
+        tier_2,
+        other=other,
+        subtotal_cents=subtotal_cents,
+        state_utility_tax=_STATE_UTILITY_TAX / 100,
+        total_cents=subtotal_cents,
+        **dated_charges)
+
+
+def _tier_row(tier: eb.TierCharge, label: str) -> _Row:
+    return _Row(label, _format_dates(tier.dates), _units(tier.charge), _format_cents(tier.charge.charge_cents))
+
+
+def _bill_rows(bill: eb.ElectricityBill) -> list[_Row]:
+    rows: list[_Row] = []
+
+    # tiers of the same period go together, as on a real bill
+    tier_2_by_dates = {tier.dates: tier for tier in bill.tier_2}
+    for tier in bill.tier_1:
+        rows.append(_tier_row(tier, f'Tier 1 (First {tier.up_to_kwh} kWh Used)'))
+        tier_2 = tier_2_by_dates.get(tier.dates)
+        if tier_2 is not None:
+            rows.append(_tier_row(tier_2, f'Tier 2 (Above {tier.up_to_kwh} kWh Used)'))
+
+    for name, (label, _, _) in _DATED_CHARGES.items():
+        for dated_charge in getattr(bill, name):
+            rows.append(_Row(label, _format_dates(dated_charge.dates), _units(dated_charge.charge),
+                             _format_cents(dated_charge.charge.charge_cents)))
+
+    rows.append(_Row('Other Electric Charges & Credits', '', _units(bill.other), _format_cents(bill.other.charge_cents)))
+    return rows
+
+
+class _PageWriter:
+    def __init__(self, page: fitz.Page, layout: Layout):
+        self.page = page
+        self.layout = layout
+        self.y = _TOP
+
+    def text(self, x: float, text: str) -> None:
+        self.page.insert_text((x, self.y), text, fontsize=self.layout.font_size)
+
+    def right(self, right: float, text: str) -> None:
+        self.text(right - fitz.get_text_length(text, fontsize=self.layout.font_size), text)
+
+    def next_line(self) -> None:
+        self.y += self.layout.line_height
+
+    def next_row(self) -> None:
+        self.y += self.layout.line_height + self.layout.row_gap
+
+
+def _write_row(writer: _PageWriter, row: _Row, layout: Layout, label_prefix: str) -> None:
+    label = label_prefix + row.label
+    if row.dates and layout.wrap_dates:
+        # MuPDF makes the two label lines one block and the numbers another one
+        top = writer.y
+        writer.text(_TABLE_LEFT, label)
+        writer.next_line()
+        writer.text(_TABLE_LEFT, row.dates)
+        writer.y = top
+        writer.text(_UNITS_LEFT, row.units)
+        writer.right(_TABLE_RIGHT, row.amount)
+        writer.next_line()
+    else:
+        writer.text(_TABLE_LEFT, f'{label} {row.dates}' if row.dates else label)
+        writer.text(_UNITS_LEFT, row.units)
+        writer.right(_TABLE_RIGHT, row.amount)
+    writer.next_row()
+
+
+def write_pdf(file_name: str, bill: eb.ElectricityBill, layout: Layout) -> None:
+    doc = fitz.open()
+    cover = doc.new_page()
+    cover.insert_text((72, 72), 'Puget Sound Energy', fontsize=14)
+    cover.insert_text((72, 96), f'Statement for {_format_dates(bill.dates)}', fontsize=10)
+
+    for _ in range(converter.PAGE_INDEX):
+        doc.new_page()
+    writer = _PageWriter(doc.load_page(converter.PAGE_INDEX), layout)
+
+    days = (bill.dates.to_date - bill.dates.from_date).days + 1
+    writer.text(_TABLE_LEFT, f'{converter.FROM_TEXT} ({days} days)')
+    writer.text(_UNITS_LEFT, 'Rate x Unit')
+    writer.right(_TABLE_RIGHT, '= Charge')
+    writer.next_row()
+
+    # service usage and basic charge are one block on a real bill
+    writer.text(_TABLE_LEFT, f'{bill.used_kwh:,} kWh used for service {_format_date(bill.dates.from_date)} - '
+                             f'{_format_date(bill.dates.to_date)}')
+    writer.next_line()
+    writer.text(_TABLE_LEFT, f'Basic Charge ${_BASIC_CHARGE_CENTS / 100:.2f} per month')
+    writer.right(_TABLE_RIGHT, _format_cents(bill.basic_charge_cents))
+    writer.next_row()
+
+    if layout.electricity_line:
+        writer.text(_TABLE_LEFT, 'Electricity')
+        writer.next_row()
+
+    for i, row in enumerate(_bill_rows(bill)):
+        _write_row(writer, row, layout, 'Electricity ' if i == 0 and layout.electricity_label else '')
+
+    writer.text(_TABLE_LEFT, 'Subtotal')
+    writer.right(_TABLE_RIGHT, _format_cents(bill.subtotal_cents))
+    writer.next_row()
+
+    tax_cents = int(round(bill.subtotal_cents * bill.state_utility_tax))
+    writer.text(_TABLE_LEFT, f'Taxes State Utility Tax (${tax_cents / 100:.2f} included in above charges)')
+    writer.right(_TAXES_RIGHT, f'{bill.state_utility_tax * 100:.3f}%')
+    writer.next_row()
+
+    writer.text(_TABLE_LEFT, converter.TO_TEXT)
+    writer.text(_UNITS_LEFT + 90, '$')
+    writer.right(_TABLE_RIGHT, _format_cents(bill.total_cents))
+
+    doc.save(file_name)
+    doc.close()
+
+
+def generate_corpus(directory: str, count: int, seed: int = 0, layouts: list[str] | None = None) -> list[str]:
+    # bills are generated from the seed in order, so files of an earlier run with the same seed are reused
+    layout_names = layouts or sorted(LAYOUTS)
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    file_names = []
+    for i in range(count):
+        bill = random_bill(rng)
+        layout = LAYOUTS[layout_names[i % len(layout_names)]]
+        base_name = os.path.join(directory, f'bill-{seed}-{i:06d}-{layout.name}')
+        file_names.append(base_name + '.pdf')
+        if os.path.exists(base_name + '.pdf') and os.path.exists(base_name + '.json'):
+            continue
+
+        write_pdf(base_name + '.pdf', bill, layout)
+        with open(base_name + '.json', 'w', encoding='utf-8') as f:
+            f.write(bill.to_json())
+    return file_names
+
+
+def expected_bill(file_name: str) -> eb.ElectricityBill:
+    with open(os.path.splitext(file_name)[0] + '.json', 'r', encoding='utf-8') as f:
+        return eb.ElectricityBill.from_json(f.read())
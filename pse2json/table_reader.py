@@ -2,15 +2,13 @@ import math, re
 
 from collections.abc import Iterable
 
+from pse2json import bill_layout
+from pse2json import metrics
 from pse2json.text_block import Rectangle, TextBlock
 
-_BASIC_CHARGE = ' Basic Charge '
-_BASIC_CHARGE_OFFSET = 1
-
 _RE_SPACES = re.compile(r'\s+')
-_RE_ELECTRICITY = re.compile(r'^electricity ', flags=re.IGNORECASE)
 
-def _find_table_rect(blocks: Iterable[TextBlock], from_text: str, to_text: str) -> Rectangle:
+def find_table_rect(blocks: Iterable[TextBlock], from_text: str, to_text: str) -> Rectangle:
     left = 0.0
     right = 0.0
     top = 0.0
@@ -31,23 +29,30 @@ def _find_table_rect(blocks: Iterable[TextBlock], from_text: str, to_text: str)
 
     return Rectangle(left, top, right, bottom)
 
-def _transform_row(text: str) -> str:
+def transform_row(text: str, layout: bill_layout.CompiledLayout) -> str:
     new_text = _RE_SPACES.sub(' ', text)
 
     # replace Unicode MINUS SIGN with ASCII minus
     new_text = new_text.replace('\N{MINUS SIGN}', '-')
 
-    # First 'Tier 1' row contains 'Electricity' in the beginning of the row
-    new_text = _RE_ELECTRICITY.sub('', new_text)
+    if layout.row_prefix is not None:
+        new_text = layout.row_prefix.sub('', new_text)
 
     return new_text
 
 
 
-def read_table_rows(blocks: Iterable[TextBlock], from_text: str, to_text: str) -> list[str]:
+def read_table_rows(
+    blocks: Iterable[TextBlock],
+    from_text: str,
+    to_text: str,
+    layout: bill_layout.CompiledLayout = bill_layout.PSE_ELECTRIC,
+    table_rect: Rectangle | None = None,
+) -> list[str]:
     rows: list[str] = []
 
-    table_rect = _find_table_rect(blocks, from_text, to_text)
+    if table_rect is None:
+        table_rect = find_table_rect(blocks, from_text, to_text)
 
     new_block = True
     text = ''
@@ -55,11 +60,11 @@ def read_table_rows(blocks: Iterable[TextBlock], from_text: str, to_text: str) -
         if block.in_rectangle(table_rect):
             block_text = block.text.replace('\n', ' ').strip()
 
-            # split 'Basic charge' into it's own row
-            basic_charge_index = block_text.find(_BASIC_CHARGE)
-            if basic_charge_index >= 0:
-                rows.append(_transform_row(block_text[:basic_charge_index]))
-                block_text = block_text[basic_charge_index + _BASIC_CHARGE_OFFSET:].replace(' $ ', ' ')
+            # split e.g. 'Basic charge' into it's own row
+            split_index = block_text.find(layout.split_before) if layout.split_before else -1
+            if split_index >= 0:
+                rows.append(transform_row(block_text[:split_index], layout))
+                block_text = block_text[split_index:].lstrip().replace(' $ ', ' ')
 
             if new_block:
                 text = block_text
@@ -68,12 +73,13 @@ def read_table_rows(blocks: Iterable[TextBlock], from_text: str, to_text: str) -
                 text += block_text
 
             new_block = (math.isclose(block.rect.right, table_rect.right, rel_tol=0.01)
-                or 'Taxes' in text)
+                or bool(layout.row_end) and layout.row_end in text)
             if new_block:
-                rows.append(_transform_row(text))
+                rows.append(transform_row(text, layout))
                 text = ''
 
     if text:
-        rows.append(_transform_row(text))
+        rows.append(transform_row(text, layout))
 
+    metrics.TABLE_ROWS.inc(len(rows))
     return rows
@@ -1,5 +1,7 @@
 from dataclasses import dataclass
 
+# text aligned to the same edge ends at coordinates differing in their last digits
+_EDGE_TOLERANCE = 0.01
 
 @dataclass
 class Rectangle:
@@ -25,8 +27,8 @@ class Rectangle:
 
     def in_rectangle(self, rect: 'Rectangle') -> bool:
         return (
-            rect.left <= self.left and self.right <= rect.right
-            and rect.top <= self.top and self.bottom <= rect.bottom)
+            rect.left - _EDGE_TOLERANCE <= self.left and self.right <= rect.right + _EDGE_TOLERANCE
+            and rect.top - _EDGE_TOLERANCE <= self.top and self.bottom <= rect.bottom + _EDGE_TOLERANCE)
 
 
 @dataclass
@@ -36,3 +38,12 @@ class TextBlock:
 
     def in_rectangle(self, rect: Rectangle) -> bool:
         return self.rect.in_rectangle(rect)
+
+
+@dataclass
+class TextWord:
+    rect: Rectangle
+    text: str
+
+    def in_rectangle(self, rect: Rectangle) -> bool:
+        return self.rect.in_rectangle(rect)
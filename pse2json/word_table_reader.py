@@ -0,0 +1,132 @@
+import math
+
+from collections.abc import Iterable
+
+from pse2json import bill_layout
+from pse2json import metrics
+from pse2json import table_reader
+from pse2json.text_block import Rectangle, TextWord
+
+# words whose baselines are closer than this part of the word height are on the same line
+_BASELINE_TOLERANCE = 0.5
+# the wrapped lines of a label are about one line height apart, rows of the table further
+_WRAP_TOLERANCE = 1.15
+
+
+def group_lines(words: Iterable[TextWord]) -> list[list[TextWord]]:
+    lines: list[list[TextWord]] = []
+    baseline = -math.inf
+    for word in sorted(words, key=lambda w: (w.rect.bottom, w.rect.left)):
+        height = word.rect.bottom - word.rect.top
+        if word.rect.bottom - baseline > height * _BASELINE_TOLERANCE:
+            lines.append([])
+            baseline = word.rect.bottom
+        lines[-1].append(word)
+
+    for line in lines:
+        line.sort(key=lambda w: w.rect.left)
+    return lines
+
+
+def _find_anchor(lines: list[list[TextWord]], anchor: str, last: bool = False) -> tuple[int, TextWord] | None:
+    texts = anchor.split()
+    found = None
+    for line_index, line in enumerate(lines):
+        for i in range(len(line) - len(texts) + 1):
+            if all(word.text == text for word, text in zip(line[i:], texts)):
+                found = (line_index, line[i])
+                if not last:
+                    return found
+                break
+    return found
+
+
+def matches(lines: list[list[TextWord]], layout: bill_layout.CompiledLayout) -> bool:
+    return all(_find_anchor(lines, anchor) is not None for anchor in layout.anchors)
+
+
+def find_table(lines: list[list[TextWord]], from_text: str, to_text: str) -> tuple[Rectangle, list[list[TextWord]]]:
+    top = _find_anchor(lines, from_text)
+    if top is None:
+        raise ValueError('Can\'t find upper boundary of the table')
+    bottom = _find_anchor(lines, to_text, last=True)
+    if bottom is None:
+        raise ValueError('Can\'t find lower boundary of the table')
+
+    top_index, top_word = top
+    bottom_index, bottom_word = bottom
+    table_lines = lines[top_index:bottom_index + 1]
+    right = max(line[-1].rect.right for line in table_lines)
+    clip = Rectangle(top_word.rect.left, top_word.rect.top, right, bottom_word.rect.bottom)
+    clipped_lines = ([word for word in line if word.in_rectangle(clip)] for line in table_lines)
+    return clip, [line for line in clipped_lines if line]
+
+
+def _has_values(line: list[TextWord]) -> bool:
+    # values are in columns right of the label, further from the word before them than a word is high
+    return any(
+        word.rect.left - previous.rect.right > word.rect.bottom - word.rect.top
+        for previous, word in zip(line, line[1:]))
+
+
+def _group_rows(lines: list[list[TextWord]]) -> list[list[list[TextWord]]]:
+    # a line with values ends its row, the lines above it without values start the row: service usage above the
+    # basic charge, which is split off later, or a heading like 'Taxes'; the lines right below it without values
+    # are its label wrapped around the values, as the rows are further apart than the lines of a label
+    rows: list[list[list[TextWord]]] = []
+    closed = True
+    baseline = -math.inf
+    for line in lines:
+        height = max(word.rect.bottom - word.rect.top for word in line)
+        line_baseline = max(word.rect.bottom for word in line)
+        has_values = _has_values(line)
+        wrapped = closed and bool(rows) and not has_values and line_baseline - baseline <= height * _WRAP_TOLERANCE
+        if closed and not wrapped:
+            rows.append([])
+        rows[-1].append(line)
+        closed = has_values or wrapped
+        baseline = line_baseline
+    return rows
+
+
+def _row_text(row: list[list[TextWord]]) -> str:
+    # words are read column by column, so a label wrapped to a second line stays before the numbers
+    words = sorted(
+        ((line_index, word) for line_index, line in enumerate(row) for word in line),
+        key=lambda item: item[1].rect.left)
+
+    columns: list[list[tuple[int, TextWord]]] = []
+    column_right = -math.inf
+    for line_index, word in words:
+        gap = word.rect.bottom - word.rect.top
+        if word.rect.left - column_right > gap:
+            columns.append([])
+        columns[-1].append((line_index, word))
+        column_right = max(column_right, word.rect.right)
+
+    texts = []
+    for column in columns:
+        column.sort(key=lambda item: (item[0], item[1].rect.left))
+        texts.extend(word.text for _, word in column)
+    return ' '.join(texts)
+
+
+def read_table_lines(
+    table_lines: list[list[TextWord]],
+    layout: bill_layout.CompiledLayout = bill_layout.PSE_ELECTRIC,
+) -> list[str]:
+    rows: list[str] = []
+
+    for row in _group_rows(table_lines):
+        text = _row_text(row)
+
+        split_index = text.find(layout.split_before) if layout.split_before else -1
+        if split_index >= 0:
+            rows.append(table_reader.transform_row(text[:split_index], layout))
+            text = text[split_index:].lstrip().replace(' $ ', ' ')
+
+        rows.append(table_reader.transform_row(text, layout))
+
+    metrics.TABLE_ROWS.inc(len(rows))
+    return rows
+
@@ -0,0 +1,254 @@
+import collections, multiprocessing
+
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+from multiprocessing import connection
+from multiprocessing.connection import Connection
+from typing import Any
+
+from pse2json import memory
+
+_RESULT = 'result'
+_EXIT = 'exit'
+
+
+@dataclass
+class RecyclePolicy:
+    max_tasks: int = 0
+    max_rss_bytes: int = 0
+
+    def should_retire(self, tasks_done: int) -> bool:
+        if self.max_tasks and tasks_done >= self.max_tasks:
+            return True
+        return bool(self.max_rss_bytes) and memory.current_rss_bytes() >= self.max_rss_bytes
+
+
+@dataclass
+class PoolStats:
+    workers_started: int = 0
+    workers_recycled: int = 0
+    # workers that exited without finishing, e.g. killed when out of memory
+    workers_died: int = 0
+    worker_peak_rss_bytes: list[int] = field(default_factory=list)
+
+
+class WorkerDied(RuntimeError):
+    pass
+
+
+def _worker_main(
+    func: Callable[[Any], Any],
+    conn: Connection,
+    policy: RecyclePolicy,
+    initializer: Callable[..., None] | None,
+    initargs: tuple,
+    task_report: Callable[[], Any] | None,
+) -> None:
+    if initializer is not None:
+        initializer(*initargs)
+
+    tasks_done = 0
+    retired = False
+    while not retired:
+        task = conn.recv()
+        if task is None:
+            break
+
+        index, arg = task
+        try:
+            ok, value = True, func(arg)
+        except Exception as e:
+            ok, value = False, e
+
+        tasks_done += 1
+        # the pool is told along with the result, so that it doesn't send another task
+        retired = policy.should_retire(tasks_done)
+        conn.send((_RESULT, index, ok, value, task_report() if task_report is not None else None, retired))
+
+    conn.send((_EXIT, memory.peak_rss_bytes()))
+
+
+class _Worker:
+    def __init__(self, process: multiprocessing.process.BaseProcess, conn: Connection):
+        self.process = process
+        self.conn = conn
+        # the task being run, at most one at a time so that a dead worker loses no more than its current file
+        self.task: tuple[int, Any] | None = None
+        self.retired = False
+        # peak RSS once the worker said it exits
+        self.peak_rss_bytes: int | None = None
+
+    @property
+    def idle(self) -> bool:
+        return self.task is None and not self.retired and self.peak_rss_bytes is None
+
+
+class WorkerPool:
+    def __init__(
+        self,
+        func: Callable[[Any], Any],
+        processes: int,
+        policy: RecyclePolicy | None = None,
+        initializer: Callable[..., None] | None = None,
+        initargs: tuple = (),
+        task_report: Callable[[], Any] | None = None,
+        on_task_report: Callable[[Any], None] | None = None,
+        on_worker_died: Callable[[Any, WorkerDied], Any] | None = None,
+    ):
+        if processes < 1:
+            raise ValueError(f'Number of processes should be positive: {processes}')
+
+        self.stats = PoolStats()
+        self._func = func
+        self._processes = processes
+        self._policy = policy or RecyclePolicy()
+        self._initializer = initializer
+        self._initargs = initargs
+        self._task_report = task_report
+        self._on_task_report = on_task_report
+        # the result of a task whose worker died, the error is raised in its place without it
+        self._on_worker_died = on_worker_died
+        self._context = multiprocessing.get_context()
+        self._workers: dict[int, _Worker] = {}
+        self._closing = False
+
+        for _ in range(processes):
+            self._start_worker()
+
+    def _start_worker(self) -> None:
+        conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(
+                self._func, child_conn, self._policy,
+                self._initializer, self._initargs, self._task_report),
+            daemon=True)
+        process.start()
+        child_conn.close()
+        self._workers[process.pid] = _Worker(process, conn)
+        self.stats.workers_started += 1
+
+    def _assign(self, pending: collections.deque[tuple[int, Any]]) -> None:
+        for worker in list(self._workers.values()):
+            if not pending:
+                return
+            if worker.idle:
+                task = pending.popleft()
+                try:
+                    worker.conn.send(task)
+                    worker.task = task
+                except OSError:
+                    # the worker is gone, it is replaced once its exit is seen
+                    pending.appendleft(task)
+
+    def _receive(self, worker: _Worker, done: dict[int, tuple[bool, Any]]) -> bool:
+        try:
+            message = worker.conn.recv()
+        except (EOFError, OSError):
+            return False
+
+        if message[0] == _EXIT:
+            worker.peak_rss_bytes = message[1]
+        else:
+            _, index, ok, value, report, worker.retired = message
+            if self._on_task_report is not None:
+                self._on_task_report(report)
+            worker.task = None
+            done[index] = (ok, value)
+        return True
+
+    def _on_process_exit(self, worker: _Worker, done: dict[int, tuple[bool, Any]]) -> None:
+        # the last messages of the worker may still be in the pipe
+        while worker.conn.poll() and self._receive(worker, done):
+            pass
+
+        pid = worker.process.pid
+        worker.process.join()
+        worker.conn.close()
+        del self._workers[pid]
+
+        if worker.peak_rss_bytes is not None:
+            self.stats.worker_peak_rss_bytes.append(worker.peak_rss_bytes)
+            if worker.retired:
+                self.stats.workers_recycled += 1
+        else:
+            self.stats.workers_died += 1
+            if worker.task is not None:
+                index, arg = worker.task
+                error = WorkerDied(f'Worker {pid} died with exit code {worker.process.exitcode}')
+                done[index] = (True, self._on_worker_died(arg, error)) if self._on_worker_died else (False, error)
+
+        if (worker.peak_rss_bytes is None or worker.retired) and not self._closing:
+            self._start_worker()
+
+    def _wait(self, done: dict[int, tuple[bool, Any]]) -> None:
+        by_conn = {worker.conn: worker for worker in self._workers.values()}
+        by_sentinel = {worker.process.sentinel: worker for worker in self._workers.values()}
+        ready = connection.wait(list(by_conn) + list(by_sentinel))
+
+        for obj in ready:
+            if obj in by_conn:
+                self._receive(by_conn[obj], done)
+        for obj in ready:
+            if obj in by_sentinel:
+                self._on_process_exit(by_sentinel[obj], done)
+
+    def imap(self, iterable: Iterable[Any]) -> Iterator[Any]:
+        max_in_flight = self._processes * 2
+        args = iter(iterable)
+        pending: collections.deque[tuple[int, Any]] = collections.deque()
+        done: dict[int, tuple[bool, Any]] = {}
+        submitted = 0
+        next_index = 0
+        exhausted = False
+
+        while True:
+            while not exhausted and submitted - next_index < max_in_flight:
+                try:
+                    pending.append((submitted, next(args)))
+                    submitted += 1
+                except StopIteration:
+                    exhausted = True
+
+            if exhausted and next_index == submitted:
+                return
+
+            self._assign(pending)
+            while next_index not in done:
+                self._wait(done)
+                self._assign(pending)
+
+            ok, value = done.pop(next_index)
+            next_index += 1
+            if not ok:
+                raise value
+            yield value
+
+    def close(self) -> None:
+        self._closing = True
+        for worker in self._workers.values():
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+
+        # results of tasks nobody waits for any more are dropped, their reports are still passed on
+        while self._workers:
+            self._wait({})
+
+    def terminate(self) -> None:
+        self._closing = True
+        for worker in self._workers.values():
+            worker.process.terminate()
+            worker.process.join()
+            worker.conn.close()
+        self._workers.clear()
+
+    def __enter__(self) -> 'WorkerPool':
+        return self
+
+    def __exit__(self, exc_type, *_) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
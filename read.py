@@ -3,31 +3,205 @@
 # Install PyMuPDF
 # > pip3 install PyMuPDF
 
-import sys
+import argparse, itertools, sys
 
+from collections.abc import Iterator
+
+from pse2json import batch
+from pse2json import converter
+from pse2json import diagnostics
 from pse2json import electricity_bill as eb
-from pse2json import pdf_text_block_reader as ptbr
+from pse2json import inputs
+from pse2json import memory
+from pse2json import metrics
+from pse2json import output
+from pse2json import prefetch
+from pse2json import profiling
 from pse2json import rows_reader
-from pse2json import table_reader
+from pse2json import worker_pool
+
+
+def _parse_args(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Convert PSE bills from PDF to JSON.')
+    parser.add_argument(
+        'files', nargs='*',
+        help='PDF bills to convert, directories are searched for PDF files recursively, '
+             'quoted glob patterns such as \'bills/**/*.pdf\' are expanded without the shell')
+    parser.add_argument(
+        '--files-from', metavar='PATH',
+        help='also convert the files listed in PATH, one per line, - to read the list from stdin')
+    parser.add_argument(
+        '-0', '--null', action='store_true',
+        help='file names in the --files-from list are separated by NUL characters, as printed by find -print0')
+    parser.add_argument(
+        '--checkpoint', metavar='DIR',
+        help='journal every converted bill into DIR, so an interrupted run can be resumed')
+    parser.add_argument(
+        '--checkpoint-batch', metavar='N', type=int, default=32,
+        help='number of converted bills per journal commit (default: %(default)s)')
+    parser.add_argument(
+        '--resume', action='store_true',
+        help='skip bills already recorded in the --checkpoint journal')
+    parser.add_argument(
+        '-j', '--jobs', metavar='N', type=int, default=1,
+        help='number of worker processes (default: %(default)s)')
+    parser.add_argument(
+        '--max-tasks-per-worker', metavar='N', type=int, default=0,
+        help='replace a worker process after it converted N bills')
+    parser.add_argument(
+        '--max-worker-rss', metavar='MB', type=float, default=0,
+        help='replace a worker process once its resident memory reaches MB megabytes')
+    parser.add_argument(
+        '--mupdf-store-limit', metavar='MB', type=float, default=0,
+        help='shrink the MuPDF resource store whenever it grows above MB megabytes')
+    parser.add_argument(
+        '--mupdf-shrink-every', metavar='N', type=int, default=0,
+        help='shrink the MuPDF resource store after every N bills')
+    parser.add_argument(
+        '--memory-report', action='store_true',
+        help='print peak memory usage to stderr at the end of the run')
+    parser.add_argument(
+        '--preflight', action='store_true',
+        help='skip PDFs that are not PSE bills and duplicate bills before parsing them')
+    parser.add_argument(
+        '--validation', choices=rows_reader.VALIDATION_MODES, default=rows_reader.STRICT,
+        help='strict: fail on charges and totals that don\'t add up, lenient: keep such bills with warnings, '
+             'off: skip the arithmetic checks, e.g. for already verified archives (default: %(default)s)')
+    parser.add_argument(
+        '--extractor', choices=sorted(converter.EXTRACTORS), default=converter.BLOCKS,
+        help='how the charge table is read from the page: MuPDF text blocks or words clustered into rows '
+             'and columns by their position (default: %(default)s)')
+    parser.add_argument(
+        '--prefetch', metavar='N', type=int, default=0,
+        help='read up to N files ahead at the same time while the bills are parsed, '
+             'for storage with a high latency per file')
+    parser.add_argument(
+        '--prefetch-budget', metavar='MB', type=float, default=64,
+        help='with --prefetch, pause reading ahead when the files read but not yet parsed take MB megabytes '
+             '(default: %(default)s)')
+    parser.add_argument(
+        '--output-dir', metavar='DIR',
+        help='write bills as JSON lines into shard files in DIR with a manifest.json, instead of stdout')
+    parser.add_argument(
+        '--partition', choices=output.PARTITIONS, default=output.NONE,
+        help='with --output-dir, one shard per service start year or month, per input shard, '
+             'or a single file (default: %(default)s)')
+    parser.add_argument(
+        '--shards', metavar='N', type=int, default=16,
+        help='number of input shards for --partition shard (default: %(default)s)')
+    parser.add_argument(
+        '--shard-records', metavar='N', type=int, default=0,
+        help='with --output-dir, start a new shard file of a partition after N bills')
+    parser.add_argument(
+        '--shard-size', metavar='MB', type=float, default=0,
+        help='with --output-dir, start a new shard file of a partition after MB megabytes of uncompressed JSON')
+    parser.add_argument(
+        '--max-open-shards', metavar='N', type=int, default=8,
+        help='with --output-dir, keep at most N shard files open, each holds a compressor of up to about 90 MB '
+             'with lzma; the least recently used one is closed and its partition continues in a new file '
+             '(default: %(default)s)')
+    parser.add_argument(
+        '--compress', choices=sorted(output.COMPRESSIONS), default='none',
+        help='with --output-dir, compress the shard files (default: %(default)s)')
+    parser.add_argument(
+        '--diagnostics', metavar='PATH',
+        help='write a JSON record of every bill that failed to convert to PATH, one per line')
+    parser.add_argument(
+        '--profile', action='store_true',
+        help='print per stage timing percentiles and the slowest files to stderr')
+    parser.add_argument(
+        '--profile-sample', metavar='N', type=int, default=0,
+        help='with --profile, capture cProfile stats for about one in N files')
+    parser.add_argument(
+        '--profile-memory', action='store_true',
+        help='with --profile-sample, also trace memory allocations of the sampled files')
+    parser.add_argument(
+        '--profile-dir', metavar='DIR', default='.',
+        help='where sampled profiles are written (default: current directory)')
+    parser.add_argument(
+        '--metrics-file', metavar='PATH',
+        help='write metrics in Prometheus text format to PATH at the end of the run')
+    parser.add_argument(
+        '--metrics-port', metavar='PORT', type=int,
+        help='serve metrics in Prometheus text format on http://ADDRESS:PORT/metrics during the run')
+    parser.add_argument(
+        '--metrics-address', metavar='ADDRESS', default='127.0.0.1',
+        help='address the metrics server binds to with --metrics-port (default: 127.0.0.1, use 0.0.0.0 for all)')
+
+    args = parser.parse_args(argv)
+    if args.null and not args.files_from:
+        parser.error('--null requires --files-from')
+    if args.resume and not args.checkpoint:
+        parser.error('--resume requires --checkpoint')
+    if args.jobs < 1:
+        parser.error('--jobs should be positive')
+    if args.max_tasks_per_worker < 0 or args.max_worker_rss < 0:
+        parser.error('--max-tasks-per-worker and --max-worker-rss should not be negative')
+    if args.mupdf_store_limit < 0 or args.mupdf_shrink_every < 0:
+        parser.error('--mupdf-store-limit and --mupdf-shrink-every should not be negative')
+    if args.prefetch < 0:
+        parser.error('--prefetch should not be negative')
+    if args.shards < 1:
+        parser.error('--shards should be positive')
+    if args.shard_records < 0 or args.shard_size < 0:
+        parser.error('--shard-records and --shard-size should not be negative')
+    if args.max_open_shards < 1:
+        parser.error('--max-open-shards should be positive')
+    if ((args.partition != output.NONE or args.compress != 'none' or args.shard_records or args.shard_size)
+            and not args.output_dir):
+        parser.error('--partition, --compress, --shard-records and --shard-size require --output-dir')
+    if args.profile_sample < 0:
+        parser.error('--profile-sample should not be negative')
+    return args
 
 
-PAGE_INDEX = 1
-FROM_TEXT = 'Your Electric Charge Details'
-TO_TEXT = 'Current Electric Charges'
+def _batch_options(args: argparse.Namespace) -> batch.BatchOptions:
+    return batch.BatchOptions(
+        jobs=args.jobs,
+        recycle=worker_pool.RecyclePolicy(
+            max_tasks=args.max_tasks_per_worker,
+            max_rss_bytes=memory.from_mb(args.max_worker_rss)),
+        store=memory.StoreSettings(
+            limit_bytes=memory.from_mb(args.mupdf_store_limit),
+            shrink_every=args.mupdf_shrink_every),
+        checkpoint_dir=args.checkpoint,
+        checkpoint_batch=args.checkpoint_batch,
+        resume=args.resume,
+        preflight=args.preflight,
+        profile=profiling.ProfileOptions(
+            sample_every=args.profile_sample,
+            output_dir=args.profile_dir,
+            trace_memory=args.profile_memory) if args.profile else None,
+        metrics=bool(args.metrics_file or args.metrics_port is not None),
+        validation=args.validation,
+        extractor=args.extractor,
+        prefetch_options=prefetch.PrefetchOptions(
+            concurrency=args.prefetch,
+            budget_bytes=memory.from_mb(args.prefetch_budget)) if args.prefetch else None)
 
 
-def read_table(file_name: str) -> eb.ElectricityBill:
-    
-    blocks = ptbr.read_text_blocks(file_name, PAGE_INDEX)
-    rows = table_reader.read_table_rows(blocks, FROM_TEXT, TO_TEXT)
-    return rows_reader.read_electricity_bill(rows)
+def _print_memory_report(pool_stats: list[worker_pool.PoolStats]) -> None:
+    report = [
+        f'peak RSS: {memory.to_mb(memory.peak_rss_bytes()):.1f} MB',
+        memory.describe_store(),
+    ]
 
+    if pool_stats:
+        # workers that died couldn't report their peak, the kernel still accounts for them
+        worker_peak = max(
+            max((peak for stats in pool_stats for peak in stats.worker_peak_rss_bytes), default=0),
+            memory.peak_children_rss_bytes())
+        started = sum(stats.workers_started for stats in pool_stats)
+        recycled = sum(stats.workers_recycled for stats in pool_stats)
+        died = sum(stats.workers_died for stats in pool_stats)
+        report.append(f'peak worker RSS: {memory.to_mb(worker_peak):.1f} MB')
+        report.append(f'workers started: {started}, recycled: {recycled}, died: {died}')
 
-def main() -> int:
-    bills: list[eb.ElectricityBill] = []
-    for file_name in sys.argv[1:]:
-        bills.append(read_table(file_name))
+    for line in report:
+        print(line, file=sys.stderr)
 
+
+def _print_bills(bills: list[eb.ElectricityBill]) -> None:
     match len(bills):
         case 0:
             pass
@@ -39,8 +213,57 @@ def main() -> int:
             bills_json = bills_list.to_json(indent=2)
             print(bills_json)
 
-    return 0
+
+def _input_files(args: argparse.Namespace) -> Iterator[str]:
+    file_names = inputs.expand(args.files)
+    if args.files_from:
+        file_names = itertools.chain(file_names, inputs.files_from(args.files_from, b'\0' if args.null else b'\n'))
+    return file_names
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _parse_args(argv)
+
+    server = metrics.serve(args.metrics_port, args.metrics_address) if args.metrics_port is not None else None
+    try:
+        if args.output_dir:
+            # bills are written into the shards as they are converted
+            options = output.OutputOptions(
+                args.output_dir, args.partition, args.shards, args.compress,
+                max_records=args.shard_records, max_bytes=memory.from_mb(args.shard_size),
+                max_open=args.max_open_shards)
+            with output.ShardWriter(options) as writer:
+                result = batch.convert_files(_input_files(args), _batch_options(args), writer.add)
+        else:
+            result = batch.convert_files(_input_files(args), _batch_options(args))
+    finally:
+        if args.metrics_file:
+            metrics.write_textfile(args.metrics_file)
+        if server is not None:
+            server.shutdown()
+
+    if not args.output_dir:
+        _print_bills(result.bills)
+
+    for skipped in result.skipped:
+        print(f'{skipped.file_name}: skipped, {skipped.reason}', file=sys.stderr)
+
+    report = diagnostics.DiagnosticReport()
+    report.extend(result.failures)
+    if args.diagnostics:
+        report.write_jsonl(args.diagnostics)
+    for line in report.lines():
+        print(line, file=sys.stderr)
+
+    if args.memory_report:
+        _print_memory_report(result.pool_stats)
+
+    if result.profile is not None:
+        for line in result.profile.lines():
+            print(line, file=sys.stderr)
+
+    return 1 if result.failures else 0
 
 
 if __name__ == '__main__':
-    sys.exit(main())
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+
+import argparse, json, sys
+
+from pse2json import reconcile
+
+
+def _parse_args(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description='Match the bills of two conversion runs by their service dates and report what changed.')
+    parser.add_argument('old', help='bills of the earlier run: JSON printed by read.py, a JSON lines shard '
+                                    'or a read.py --output-dir directory')
+    parser.add_argument('new', help='bills of the later run, in any of the same formats')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON with the bill hashes')
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _parse_args(argv)
+
+    result = reconcile.reconcile(reconcile.load_bills(args.old), reconcile.load_bills(args.new))
+
+    if args.json:
+        print(json.dumps(result.to_dict(), indent=2))
+    else:
+        for line in result.lines():
+            print(line)
+
+    # like diff, the exit status tells whether the runs differ
+    return 1 if result.differs else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
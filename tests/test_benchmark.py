@@ -0,0 +1,129 @@
+import math
+import os
+import tempfile
+import unittest
+
+from pse2json import benchmark
+from pse2json import memory
+from pse2json import table_reader
+
+
+def _results(samples: dict[str, list[float]]) -> dict:
+    return {'stages': {name: {'samples': values} for name, values in samples.items()}}
+
+
+class BenchmarkTests(unittest.TestCase):
+    def test_run(self):
+        with tempfile.TemporaryDirectory() as directory:
+            results = benchmark.run(directory, [4, 2])
+
+        self.assertEqual([2, 4], [result.size for result in results])
+        for result in results:
+            self.assertEqual(1.0, result.accuracy)
+            self.assertEqual(0, result.failed)
+            self.assertGreater(result.bills_per_second, 0)
+            self.assertIn('page.get_text', result.stages)
+
+        lines = benchmark.format_results(results)
+        self.assertEqual(3, lines.index('stages of 4 bills with blocks, p50 / p90 ms:'))
+
+    def test_run_extractors(self):
+        with tempfile.TemporaryDirectory() as directory:
+            results = benchmark.run(directory, [2], extractors=['blocks', 'words'])
+
+        self.assertEqual(['blocks', 'words'], [result.extractor for result in results])
+        self.assertTrue(all(result.accuracy == 1.0 for result in results))
+        self.assertIn('group_lines', results[1].stages)
+        self.assertIn('stages of 2 bills with words, p50 / p90 ms:', benchmark.format_results(results))
+
+    def test_failed_bill(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = f'{directory}/missing.pdf'
+            result = benchmark.run_corpus([file_name])
+
+        self.assertEqual(1, result.failed)
+        self.assertEqual(0.0, result.accuracy)
+
+    def test_peak_rss_of_corpus(self):
+        # memory of this process is not a part of the peak of the corpus
+        ballast = b'x' * (2 * memory.peak_rss_bytes())
+        with tempfile.TemporaryDirectory() as directory:
+            result = benchmark.run(directory, [1])[0]
+
+        self.assertLess(result.peak_rss_bytes, len(ballast))
+        self.assertGreater(result.peak_rss_bytes, 0)
+
+    def test_fixtures_rows(self):
+        from_text, to_text, fixtures = benchmark.load_fixtures()
+
+        self.assertTrue(fixtures)
+        for fixture in fixtures:
+            with self.subTest(fixture=fixture.name):
+                self.assertEqual(fixture.rows, table_reader.read_table_rows(fixture.blocks, from_text, to_text))
+
+    def test_record_save_load(self):
+        results = benchmark.record(repeat=2, min_seconds=0)
+
+        self.assertEqual(
+            {'read_table_rows', 'read_electricity_bill', 'read_electricity_bill_unchecked', 'read_table', 'read_table_words'},
+            set(results['stages']))
+        self.assertEqual(2, len(results['stages']['read_table']['samples']))
+        self.assertIn('pymupdf', results['environment'])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'results.json')
+            benchmark.save(path, results)
+            self.assertEqual(results, benchmark.load(path))
+
+    def test_load_unsupported_version(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'results.json')
+            benchmark.save(path, {'version': 0})
+            with self.assertRaises(ValueError):
+                benchmark.load(path)
+
+    def test_compare_regression(self):
+        base = _results({'stage': [1.0 + i / 1000 for i in range(15)]})
+        new = _results({'stage': [1.5 + i / 1000 for i in range(15)]})
+
+        comparisons = benchmark.compare(base, new, threshold=0.1)
+
+        self.assertEqual(1, len(comparisons))
+        self.assertTrue(comparisons[0].regression)
+        self.assertAlmostEqual(0.5, comparisons[0].change, places=2)
+        self.assertTrue(benchmark.format_comparison(comparisons)[1].endswith('REGRESSION'))
+
+    def test_compare_below_threshold(self):
+        base = _results({'stage': [1.0 + i / 1000 for i in range(15)]})
+        new = _results({'stage': [1.05 + i / 1000 for i in range(15)]})
+
+        self.assertFalse(benchmark.compare(base, new, threshold=0.1)[0].regression)
+
+    def test_compare_noise(self):
+        base = _results({'stage': [1.0, 2.0, 1.0, 2.0, 1.0, 2.0, 1.0, 2.0]})
+        new = _results({'stage': [1.2, 2.4, 1.2, 2.4, 1.2, 2.4, 1.2, 2.4]})
+
+        comparisons = benchmark.compare(base, new, threshold=0.1)
+        self.assertFalse(comparisons[0].regression)
+        self.assertGreater(comparisons[0].noise, 0.2)
+
+    def test_compare_faster(self):
+        base = _results({'stage': [2.0 + i / 1000 for i in range(15)], 'removed': [1.0]})
+        new = _results({'stage': [1.0 + i / 1000 for i in range(15)]})
+
+        comparisons = benchmark.compare(base, new)
+        self.assertEqual(['stage'], [c.stage for c in comparisons])
+        self.assertFalse(comparisons[0].regression)
+
+    def test_compare_zero_median(self):
+        base = _results({'unused': [0.0] * 15, 'new': [0.0] * 15})
+        new = _results({'unused': [0.0] * 15, 'new': [0.5 + i / 1000 for i in range(15)]})
+
+        unused, added = benchmark.compare(base, new)
+        self.assertEqual((0.0, False), (unused.change, unused.regression))
+        self.assertEqual((math.inf, True), (added.change, added.regression))
+        self.assertIn(' n/a ', benchmark.format_comparison([unused, added])[2])
+
+
+if __name__ == '__main__':
+    unittest.main()
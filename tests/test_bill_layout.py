@@ -0,0 +1,107 @@
+import dataclasses
+import unittest
+
+from unittest import mock
+
+from pse2json import bill_layout as bl
+from pse2json import converter
+from pse2json import rows_reader
+from pse2json import table_reader
+from pse2json.text_block import Rectangle, TextBlock
+
+_OLD_LAYOUT = bl.BillLayout(
+    name='old-electric',
+    page_index=0,
+    from_text='Electric Service Detail',
+    to_text='Total Electric Charges',
+    split_before=' Monthly Charge ',
+    line_items=(
+        bl.LineItem('Electric Service Detail', bl.IGNORE),
+        bl.LineItem('used for service', bl.USAGE, anywhere=True),
+        bl.LineItem('Monthly Charge', bl.BASIC_CHARGE, 'basic_charge_cents'),
+        bl.LineItem('Energy Charge', bl.TIER, 'tier_1'),
+        bl.LineItem('Other Charges', bl.CHARGE, 'other'),
+        bl.LineItem('Amount Before Taxes', bl.AMOUNT, 'subtotal_cents'),
+        bl.LineItem('Total Electric Charges', bl.AMOUNT, 'total_cents'),
+    ))
+
+_OLD_BLOCKS = [
+    TextBlock(Rectangle(10, 10, 200, 20), 'Electric Service Detail (31 days)'),
+    TextBlock(Rectangle(10, 20, 200, 30), '500 kWh used for service 1/1/2015 - 1/31/2015 Monthly Charge $ 7.87'),
+    TextBlock(Rectangle(10, 30, 200, 40), 'Energy Charge 0.1 500 kWh 50.00'),
+    TextBlock(Rectangle(10, 40, 200, 50), 'Other Charges 0.001 500 kWh 0.50'),
+    TextBlock(Rectangle(10, 50, 200, 60), 'Amount Before Taxes 58.37'),
+    TextBlock(Rectangle(10, 60, 200, 70), 'Total Electric Charges $ 58.37'),
+]
+
+
+class BillLayoutTests(unittest.TestCase):
+    def test_line_item(self):
+        layout = bl.PSE_ELECTRIC
+
+        self.assertEqual('tier_1', layout.line_item('Tier 1 (First 600 kWh Used) 0.1 600 kWh 60.00').field)
+        self.assertEqual('tier_2', layout.line_item('Tier 2 (Above 600 kWh Used) 0.1 600 kWh 60.00').field)
+        self.assertEqual(bl.USAGE, layout.line_item('1,459 kWh used for service 12/8/2019 - 1/8/2020').kind)
+        self.assertEqual('total_cents', layout.line_item('Current Electric Charges $ 1.00').field)
+        self.assertIsNone(layout.line_item('Unknown Charge 1.00'))
+
+    def test_unknown_kind(self):
+        layout = dataclasses.replace(_OLD_LAYOUT, line_items=(bl.LineItem('Fee', 'fee', 'fee_cents'),))
+        with self.assertRaises(ValueError):
+            bl.compile_layout(layout)
+
+    def test_missing_field(self):
+        layout = dataclasses.replace(_OLD_LAYOUT, line_items=(bl.LineItem('Fee', bl.AMOUNT),))
+        with self.assertRaises(ValueError):
+            bl.compile_layout(layout)
+
+    def test_matches(self):
+        self.assertFalse(bl.PSE_ELECTRIC.matches(_OLD_BLOCKS))
+        self.assertTrue(bl.compile_layout(_OLD_LAYOUT).matches(_OLD_BLOCKS))
+        self.assertFalse(bl.compile_layout(dataclasses.replace(_OLD_LAYOUT, markers=('Account',))).matches(_OLD_BLOCKS))
+
+    def test_read_with_layout(self):
+        layout = bl.compile_layout(_OLD_LAYOUT)
+
+        rows = table_reader.read_table_rows(_OLD_BLOCKS, layout.from_text, layout.to_text, layout)
+        bill = rows_reader.read_electricity_bill(rows, layout=layout)
+
+        self.assertEqual('Monthly Charge 7.87', rows[2])
+        self.assertEqual(500, bill.used_kwh)
+        self.assertEqual(787, bill.basic_charge_cents)
+        self.assertEqual(5000, bill.tier_1[0].charge.charge_cents)
+        self.assertEqual(50, bill.other.charge_cents)
+        self.assertEqual(5837, bill.total_cents)
+
+    def test_register(self):
+        registered = bl.register(_OLD_LAYOUT)
+        self.addCleanup(bl.REGISTERED.remove, registered)
+
+        with self.assertRaises(ValueError):
+            bl.register(_OLD_LAYOUT)
+
+    @mock.patch('pse2json.pdf_text_block_reader.read_text_blocks')
+    def test_select_layout(self, read_text_blocks_mock):
+        old = bl.compile_layout(_OLD_LAYOUT)
+        read_text_blocks_mock.return_value = _OLD_BLOCKS
+
+        layout, blocks = converter.select_layout('bill.pdf', [bl.PSE_ELECTRIC, old])
+
+        self.assertIs(old, layout)
+        self.assertIs(_OLD_BLOCKS, blocks)
+        self.assertEqual(2, read_text_blocks_mock.call_count)
+
+    @mock.patch('pse2json.pdf_text_block_reader.read_text_blocks')
+    def test_select_no_layout(self, read_text_blocks_mock):
+        read_text_blocks_mock.return_value = []
+
+        with self.assertRaises(ValueError):
+            converter.select_layout('bill.pdf', [bl.PSE_ELECTRIC, bl.compile_layout(_OLD_LAYOUT)])
+
+        # a single layout is used as is, so that its table reader tells what is missing
+        layout, _ = converter.select_layout('bill.pdf', [bl.PSE_ELECTRIC])
+        self.assertIs(bl.PSE_ELECTRIC, layout)
+
+
+if __name__ == '__main__':
+    unittest.main()
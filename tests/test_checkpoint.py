@@ -0,0 +1,139 @@
+import datetime
+import os
+import tempfile
+import unittest
+
+from unittest import mock
+
+from pse2json import batch
+from pse2json import checkpoint
+from pse2json import converter
+from pse2json import electricity_bill as eb
+from pse2json import rows_reader
+from pse2json import synthetic
+
+
+def _make_bill(total_cents: int) -> eb.ElectricityBill:
+    charge = eb.Charge(0.1, total_cents / 10, total_cents)
+    return eb.ElectricityBill(
+        eb.DateRange(datetime.date(2020, 1, 1), datetime.date(2020, 1, 31)),
+        100, 0,
+        [eb.TierCharge(None, 460, charge)], [], [], [], [], [], [],
+        eb.Charge(0.006794, 0, 0),
+        total_cents, 0.03873, total_cents)
+
+
+class CheckpointJournalTests(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+        self.directory = self._dir.name
+
+    def test_resume_loads_recorded_bills(self):
+        bill = _make_bill(1234)
+        with checkpoint.CheckpointJournal(self.directory) as journal:
+            journal.record('a.pdf', bill)
+
+        with checkpoint.CheckpointJournal(self.directory, resume=True) as journal:
+            self.assertTrue(journal.is_done('a.pdf'))
+            self.assertFalse(journal.is_done('b.pdf'))
+            self.assertEqual(bill, journal.load_bill('a.pdf'))
+
+    def test_loaded_bill_serializes_identically(self):
+        rows = [
+            '1,459 kWh used for service 12/8/2019 - 1/8/2020',
+            'Other Electric Charges & Credits 0.006794 0 kWh 0.00',
+            'Subtotal 0.00',
+            'Current Electric Charges $ 0.00',
+        ]
+        bill = rows_reader.read_electricity_bill(rows)
+        with checkpoint.CheckpointJournal(self.directory) as journal:
+            journal.record('a.pdf', bill)
+
+        with checkpoint.CheckpointJournal(self.directory, resume=True) as journal:
+            self.assertEqual(bill.to_json(indent=2), journal.load_bill('a.pdf').to_json(indent=2))
+
+    def test_without_resume_starts_over(self):
+        with checkpoint.CheckpointJournal(self.directory) as journal:
+            journal.record('a.pdf', _make_bill(1))
+
+        with checkpoint.CheckpointJournal(self.directory) as journal:
+            self.assertFalse(journal.is_done('a.pdf'))
+
+    def test_uncommitted_batch_is_not_journaled(self):
+        journal = checkpoint.CheckpointJournal(self.directory, batch_size=2)
+        journal.record('a.pdf', _make_bill(1))
+        journal.record('b.pdf', _make_bill(2))
+        journal.record('c.pdf', _make_bill(3))
+
+        # simulate a crash: nothing after the last full batch is committed
+        resumed = checkpoint.CheckpointJournal(self.directory, resume=True)
+        self.assertTrue(resumed.is_done('a.pdf'))
+        self.assertTrue(resumed.is_done('b.pdf'))
+        self.assertFalse(resumed.is_done('c.pdf'))
+        resumed.close()
+        journal.close()
+
+    def test_truncated_entry_ignored(self):
+        with checkpoint.CheckpointJournal(self.directory) as journal:
+            journal.record('a.pdf', _make_bill(1))
+
+        journal_path = os.path.join(self.directory, 'journal.jsonl')
+        with open(journal_path, 'a', encoding='utf-8') as f:
+            f.write('{"input": "b.p')
+
+        with checkpoint.CheckpointJournal(self.directory, resume=True) as journal:
+            self.assertTrue(journal.is_done('a.pdf'))
+            self.assertFalse(journal.is_done('b.pdf'))
+            journal.record('b.pdf', _make_bill(2))
+
+        with checkpoint.CheckpointJournal(self.directory, resume=True) as journal:
+            self.assertTrue(journal.is_done('b.pdf'))
+            self.assertEqual(_make_bill(2), journal.load_bill('b.pdf'))
+
+    def test_synced_once_per_batch(self):
+        with mock.patch('os.fsync') as fsync_mock:
+            with checkpoint.CheckpointJournal(self.directory, batch_size=2) as journal:
+                journal.record('a.pdf', _make_bill(1))
+                fsync_mock.assert_not_called()
+
+                journal.record('b.pdf', _make_bill(2))
+                # the two bill files, the bills directory and the journal
+                self.assertEqual(4, fsync_mock.call_count)
+
+    def test_invalid_batch_size(self):
+        with self.assertRaises(ValueError):
+            checkpoint.CheckpointJournal(self.directory, batch_size=0)
+
+
+
+class BatchResumeTests(unittest.TestCase):
+    def test_resumed_output_matches_clean_run(self):
+        read_table = converter.read_table
+
+        with tempfile.TemporaryDirectory() as directory:
+            file_names = synthetic.generate_corpus(os.path.join(directory, 'corpus'), 5)
+            options = batch.BatchOptions(checkpoint_dir=os.path.join(directory, 'checkpoint'), checkpoint_batch=2)
+            clean = batch.convert_files(file_names, batch.BatchOptions())
+
+            def interrupted(file_name: str, *args, **kwargs) -> eb.ElectricityBill:
+                if file_name == file_names[3]:
+                    raise KeyboardInterrupt()
+                return read_table(file_name, *args, **kwargs)
+
+            with mock.patch.object(converter, 'read_table', side_effect=interrupted):
+                with self.assertRaises(KeyboardInterrupt):
+                    batch.convert_files(file_names, options)
+
+            options.resume = True
+            with mock.patch.object(converter, 'read_table', side_effect=read_table) as read_table_mock:
+                resumed = batch.convert_files(file_names, options)
+
+            # only the files after the interruption are converted again
+            self.assertEqual(file_names[3:], [call.args[0] for call in read_table_mock.call_args_list])
+            self.assertEqual(clean.file_names, resumed.file_names)
+            self.assertEqual([bill.to_json() for bill in clean.bills], [bill.to_json() for bill in resumed.bills])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+import os
+import pickle
+import signal
+import tempfile
+import unittest
+
+from unittest import mock
+
+from pse2json import batch
+from pse2json import bill_layout as bl
+from pse2json import converter
+from pse2json import diagnostics
+from pse2json import rows_reader
+from pse2json import synthetic
+from pse2json import worker_pool
+from pse2json.text_block import Rectangle, TextBlock
+
+_LAYOUT = bl.compile_layout(bl.BillLayout(
+    name='test-electric',
+    page_index=0,
+    from_text='Electric Service Detail',
+    to_text='Total Electric Charges',
+    line_items=(
+        bl.LineItem('Electric Service Detail', bl.IGNORE),
+        bl.LineItem('used for service', bl.USAGE, anywhere=True),
+        bl.LineItem('Energy Charge', bl.TIER, 'tier_1'),
+        bl.LineItem('Other Charges', bl.CHARGE, 'other'),
+        bl.LineItem('Amount Before Taxes', bl.AMOUNT, 'subtotal_cents'),
+        bl.LineItem('Total Electric Charges', bl.AMOUNT, 'total_cents'),
+    )))
+
+
+def _blocks(total: str, energy_charge: str = 'Energy Charge 0.1 500 kWh 50.00') -> list[TextBlock]:
+    return [
+        TextBlock(Rectangle(10, 10, 200, 20), 'Electric Service Detail (31 days)'),
+        TextBlock(Rectangle(10, 20, 200, 30), '500 kWh used for service 1/1/2015 - 1/31/2015'),
+        TextBlock(Rectangle(10, 30, 200, 40), energy_charge),
+        TextBlock(Rectangle(10, 40, 200, 50), 'Other Charges 0.001 500 kWh 0.50'),
+        TextBlock(Rectangle(10, 50, 200, 60), 'Amount Before Taxes 50.50'),
+        TextBlock(Rectangle(10, 60, 200, 70), f'Total Electric Charges {total}'),
+    ]
+
+
+@mock.patch.object(bl, 'REGISTERED', [_LAYOUT])
+@mock.patch('os.path.getsize', mock.Mock(return_value=1))
+@mock.patch('pse2json.pdf_text_block_reader.read_text_blocks')
+class ReadTableDiagnosticsTests(unittest.TestCase):
+    def test_total_mismatch(self, read_text_blocks_mock):
+        read_text_blocks_mock.return_value = _blocks('51.00')
+
+        with self.assertRaises(diagnostics.ParseError) as context:
+            converter.read_table('bill.pdf')
+
+        diagnostic = context.exception.diagnostic
+        self.assertEqual(diagnostics.READ_ELECTRICITY_BILL, diagnostic.stage)
+        self.assertEqual(rows_reader.TOTAL_MISMATCH, diagnostic.kind)
+        self.assertEqual(0, diagnostic.page)
+        self.assertEqual('test-electric', diagnostic.layout)
+        self.assertEqual((10, 10, 200, 70), diagnostic.table_rect)
+        self.assertEqual((5050, 5100), (diagnostic.expected, diagnostic.actual))
+
+    def test_offending_row(self, read_text_blocks_mock):
+        read_text_blocks_mock.return_value = _blocks('50.50', 'Energy Charge 0.1 500 kWh fifty')
+
+        with self.assertRaises(diagnostics.ParseError) as context:
+            converter.read_table('bill.pdf')
+
+        diagnostic = context.exception.diagnostic
+        self.assertEqual(rows_reader.MALFORMED_VALUE, diagnostic.kind)
+        self.assertEqual('Energy Charge 0.1 500 kWh fifty', diagnostic.row)
+
+    def test_missing_table(self, read_text_blocks_mock):
+        read_text_blocks_mock.return_value = _blocks('50.50')[1:]
+
+        with self.assertRaises(diagnostics.ParseError) as context:
+            converter.read_table('bill.pdf')
+
+        diagnostic = context.exception.diagnostic
+        self.assertEqual(diagnostics.READ_TABLE_ROWS, diagnostic.stage)
+        self.assertEqual('ValueError', diagnostic.kind)
+        self.assertIsNone(diagnostic.table_rect)
+
+    def test_unreadable_file(self, read_text_blocks_mock):
+        read_text_blocks_mock.side_effect = RuntimeError('cannot open bill.pdf: broken file')
+
+        with self.assertRaises(diagnostics.ParseError) as context:
+            converter.read_table('bill.pdf')
+
+        diagnostic = context.exception.diagnostic
+        self.assertEqual(diagnostics.SELECT_LAYOUT, diagnostic.stage)
+        self.assertEqual('select_layout: RuntimeError: cannot open <file>: broken file', diagnostic.signature)
+
+
+class DiagnosticsTests(unittest.TestCase):
+    def test_errors_pickle(self):
+        error = rows_reader.BillError(rows_reader.CHARGE_MISMATCH, 'mismatch', 'Tier 1 1.00', 100, 101)
+        copy = pickle.loads(pickle.dumps(error))
+        self.assertEqual(('mismatch', 'Tier 1 1.00', 100, 101), (str(copy), copy.row, copy.expected, copy.actual))
+
+        parse_error = diagnostics.error('bill.pdf', diagnostics.READ_ELECTRICITY_BILL, error)
+        self.assertEqual(parse_error.diagnostic, pickle.loads(pickle.dumps(parse_error)).diagnostic)
+
+    def test_report_groups_by_signature(self):
+        report = diagnostics.DiagnosticReport()
+        report.extend([
+            diagnostics.Diagnostic('a.pdf', 'read_electricity_bill', 'total_mismatch', 'expected 5050, actual 5100'),
+            diagnostics.Diagnostic('b.pdf', 'read_electricity_bill', 'total_mismatch', 'expected 720, actual 7'),
+            diagnostics.Diagnostic('c.pdf', 'read_electricity_bill', 'unknown_value', 'Unknown value found: Fee 1.00'),
+        ])
+
+        self.assertEqual(2, len(report.groups))
+        lines = report.lines(examples=1)
+        self.assertEqual('3 file(s) failed, 2 distinct failure(s):', lines[0])
+        self.assertEqual('      2 read_electricity_bill: total_mismatch: expected #, actual #', lines[1])
+        self.assertEqual('        a.pdf', lines[2])
+        self.assertEqual('      1 read_electricity_bill: unknown_value: Unknown value found: Fee #', lines[3])
+
+    def test_batch_reports_failures(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_names = synthetic.generate_corpus(directory, 2)
+            missing = os.path.join(directory, 'missing.pdf')
+
+            for jobs in (1, 2):
+                with self.subTest(jobs=jobs):
+                    result = batch.convert_files([file_names[0], missing, file_names[1]], batch.BatchOptions(jobs=jobs))
+
+                    self.assertEqual([synthetic.expected_bill(f) for f in file_names], result.bills)
+                    self.assertEqual([missing], [failure.file_name for failure in result.failures])
+                    self.assertEqual(diagnostics.SELECT_LAYOUT, result.failures[0].stage)
+                    self.assertEqual('FileNotFoundError', result.failures[0].kind)
+
+    def test_batch_survives_dead_worker(self):
+        read_table = converter.read_table
+
+        with tempfile.TemporaryDirectory() as directory:
+            file_names = synthetic.generate_corpus(directory, 4)
+
+            def killed_on_second(file_name: str, *args, **kwargs):
+                if file_name == file_names[1]:
+                    os.kill(os.getpid(), signal.SIGKILL)
+                return read_table(file_name, *args, **kwargs)
+
+            with mock.patch.object(converter, 'read_table', killed_on_second):
+                result = batch.convert_files(file_names, batch.BatchOptions(jobs=2))
+
+            self.assertEqual([synthetic.expected_bill(f) for f in file_names if f != file_names[1]], result.bills)
+            self.assertEqual([file_names[1]], [failure.file_name for failure in result.failures])
+            self.assertEqual(worker_pool.WorkerDied.__name__, result.failures[0].kind)
+            self.assertEqual(1, result.pool_stats[0].workers_died)
+
+    def test_preflight_reports_failures(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_names = synthetic.generate_corpus(directory, 2)
+            missing = os.path.join(directory, 'missing.pdf')
+
+            for jobs in (1, 2):
+                with self.subTest(jobs=jobs):
+                    options = batch.BatchOptions(jobs=jobs, preflight=True)
+                    result = batch.convert_files([file_names[0], missing, file_names[1]], options)
+
+                    self.assertEqual([synthetic.expected_bill(f) for f in file_names], result.bills)
+                    self.assertEqual([missing], [failure.file_name for failure in result.failures])
+                    self.assertEqual(diagnostics.PREFLIGHT, result.failures[0].stage)
+                    self.assertEqual('FileNotFoundError', result.failures[0].kind)
+
+
+if __name__ == '__main__':
+    unittest.main()
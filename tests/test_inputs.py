@@ -0,0 +1,89 @@
+import io
+import os
+import tempfile
+import unittest
+
+from pse2json import inputs
+
+
+class _Chunks(io.RawIOBase):
+    def __init__(self, chunks: list[bytes]):
+        self._chunks = list(chunks)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if not self._chunks:
+            return 0
+        chunk = self._chunks.pop(0)
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+
+class InputsTests(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+        self.directory = self._dir.name
+
+        for name in ('b.pdf', 'a.PDF', 'notes.txt', os.path.join('2020', 'c.pdf'), os.path.join('2020', 'x', 'd.pdf')):
+            path = os.path.join(self.directory, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, 'wb').close()
+
+    def _path(self, *names: str) -> str:
+        return os.path.join(self.directory, *names)
+
+    def test_scan_directory(self):
+        self.assertEqual(
+            [self._path('2020', 'c.pdf'), self._path('2020', 'x', 'd.pdf'), self._path('a.PDF'), self._path('b.pdf')],
+            list(inputs.scan_directory(self.directory)))
+
+    def test_scan_does_not_follow_directory_links(self):
+        os.symlink(self.directory, self._path('2020', 'loop'))
+        self.assertEqual(4, len(list(inputs.scan_directory(self.directory))))
+
+    def test_expand(self):
+        files = list(inputs.expand([self._path('2020'), self._path('missing.pdf')]))
+        self.assertEqual([self._path('2020', 'c.pdf'), self._path('2020', 'x', 'd.pdf'), self._path('missing.pdf')], files)
+
+    def test_expand_glob(self):
+        self.assertEqual([self._path('b.pdf')], list(inputs.expand([self._path('*.pdf')])))
+        self.assertEqual(
+            [self._path('2020', 'c.pdf'), self._path('2020', 'x', 'd.pdf'), self._path('b.pdf')],
+            list(inputs.expand([self._path('**', '?.pdf')])))
+        self.assertEqual([self._path('2020', 'c.pdf')], list(inputs.expand([self._path('2020', '*')])))
+        self.assertEqual([self._path('2020', 'x', 'd.pdf')], list(inputs.expand([self._path('**', 'd.*')])))
+
+    def test_expand_existing_path_with_glob_characters(self):
+        path = self._path('bill [1].pdf')
+        open(path, 'wb').close()
+
+        self.assertEqual([path], list(inputs.expand([path])))
+
+    def test_expand_glob_without_matches(self):
+        pattern = self._path('*.json')
+        self.assertEqual([pattern], list(inputs.expand([pattern])))
+
+    def test_expand_is_lazy(self):
+        files = inputs.expand(iter([self._path('b.pdf'), None]))
+        self.assertEqual(self._path('b.pdf'), next(files))
+
+    def test_read_file_list(self):
+        f = io.BufferedReader(_Chunks([b'a.pdf\nb', b'.pdf\n\nc', b' d.pdf']))
+        self.assertEqual(['a.pdf', 'b.pdf', 'c d.pdf'], list(inputs.read_file_list(f)))
+
+    def test_read_nul_separated_file_list(self):
+        f = io.BufferedReader(_Chunks([b'a\nb.pdf\0c.pdf\0']))
+        self.assertEqual(['a\nb.pdf', 'c.pdf'], list(inputs.read_file_list(f, b'\0')))
+
+    def test_files_from(self):
+        list_path = self._path('list.txt')
+        with open(list_path, 'wb') as f:
+            f.write(b'a.pdf\nb.pdf\n')
+        self.assertEqual(['a.pdf', 'b.pdf'], list(inputs.files_from(list_path)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+
+from unittest import mock
+
+from pse2json import memory
+
+
+class MemoryTests(unittest.TestCase):
+    def tearDown(self):
+        memory.configure_store(memory.StoreSettings())
+
+    @mock.patch('fitz.TOOLS')
+    def test_shrink_every(self, tools_mock):
+        memory.configure_store(memory.StoreSettings(shrink_every=2, shrink_percent=30))
+
+        memory.after_document()
+        tools_mock.store_shrink.assert_not_called()
+
+        memory.after_document()
+        tools_mock.store_shrink.assert_called_once_with(30)
+        tools_mock.glyph_cache_empty.assert_called_once()
+
+    @mock.patch('fitz.TOOLS')
+    def test_store_limit(self, tools_mock):
+        tools_mock.store_size.return_value = 400
+        memory.configure_store(memory.StoreSettings(limit_bytes=100))
+
+        memory.after_document()
+
+        tools_mock.store_shrink.assert_called_once_with(75)
+
+    @mock.patch('fitz.TOOLS')
+    def test_store_under_limit(self, tools_mock):
+        tools_mock.store_size.return_value = 100
+        memory.configure_store(memory.StoreSettings(limit_bytes=100))
+
+        memory.after_document()
+
+        tools_mock.store_shrink.assert_not_called()
+
+    @mock.patch('fitz.TOOLS')
+    def test_store_limit_unknown_size(self, tools_mock):
+        tools_mock.store_size.return_value = None
+        memory.configure_store(memory.StoreSettings(limit_bytes=100, shrink_percent=20))
+
+        memory.after_document()
+
+        tools_mock.store_shrink.assert_called_once_with(20)
+
+    @mock.patch('fitz.TOOLS')
+    def test_describe_store(self, tools_mock):
+        tools_mock.store_size.return_value = 1024 * 1024
+        tools_mock.store_maxsize.return_value = 256 * 1024 * 1024
+        self.assertEqual('MuPDF store: 1.0 MB of 256.0 MB', memory.describe_store())
+
+        tools_mock.store_size.return_value = None
+        self.assertEqual('MuPDF store: size unknown', memory.describe_store())
+
+    @mock.patch('fitz.TOOLS')
+    def test_store_size_as_property(self, tools_mock):
+        tools_mock.store_size = 123
+
+        self.assertEqual(123, memory.store_size())
+
+    def test_invalid_settings(self):
+        with self.assertRaises(ValueError):
+            memory.configure_store(memory.StoreSettings(limit_bytes=-1))
+        with self.assertRaises(ValueError):
+            memory.configure_store(memory.StoreSettings(shrink_percent=0))
+
+    def test_rss(self):
+        self.assertGreater(memory.current_rss_bytes(), 0)
+        self.assertGreater(memory.peak_rss_bytes(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import functools
+import multiprocessing
+import os
+import tempfile
+import unittest
+import urllib.request
+
+from unittest import mock
+
+from pse2json import batch
+from pse2json import diagnostics
+from pse2json import metrics
+from pse2json import synthetic
+from pse2json import worker_pool
+
+
+class MetricsTests(unittest.TestCase):
+    def test_counter(self):
+        registry = metrics.Registry()
+        counter = registry.counter('bills_total', 'Bills.', ('reason',))
+
+        counter.inc(labels=('a',))
+        counter.inc(2, labels=('a',))
+        counter.inc(labels=('b"\n',))
+
+        self.assertEqual(3, counter.value(('a',)))
+        self.assertEqual(
+            '# HELP bills_total Bills.\n'
+            '# TYPE bills_total counter\n'
+            'bills_total{reason="a"} 3\n'
+            'bills_total{reason="b\\"\\n"} 1\n',
+            registry.render())
+
+    def test_histogram(self):
+        registry = metrics.Registry()
+        histogram = registry.histogram('seconds', 'Seconds.', buckets=(0.1, 1.0))
+
+        histogram.observe(0.05)
+        histogram.observe(0.1)
+        histogram.observe(5)
+
+        self.assertEqual(3, histogram.count())
+        self.assertEqual(
+            '# HELP seconds Seconds.\n'
+            '# TYPE seconds histogram\n'
+            'seconds_bucket{le="0.1"} 2\n'
+            'seconds_bucket{le="1"} 2\n'
+            'seconds_bucket{le="+Inf"} 3\n'
+            'seconds_sum 5.15\n'
+            'seconds_count 3\n',
+            registry.render())
+
+    def test_drain_merge(self):
+        worker = metrics.Registry()
+        worker_counter = worker.counter('c', 'C.')
+        worker_histogram = worker.histogram('h', 'H.', ('stage',))
+        main = metrics.Registry()
+        main_counter = main.counter('c', 'C.')
+        main_histogram = main.histogram('h', 'H.', ('stage',))
+
+        for _ in range(2):
+            worker_counter.inc()
+            worker_histogram.observe(0.5, ('open',))
+            main.merge(worker.drain())
+
+        self.assertEqual(0, worker_counter.value())
+        self.assertEqual({}, worker.drain())
+        self.assertEqual(2, main_counter.value())
+        self.assertEqual(2, main_histogram.count(('open',)))
+
+    def test_duplicate_metric(self):
+        registry = metrics.Registry()
+        registry.counter('c', 'C.')
+        with self.assertRaises(ValueError):
+            registry.counter('c', 'C.')
+
+    def test_write_textfile(self):
+        registry = metrics.Registry()
+        registry.counter('c', 'C.').inc()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'pse2json.prom')
+            metrics.write_textfile(path, registry)
+
+            with open(path, 'r', encoding='utf-8') as f:
+                self.assertEqual(registry.render(), f.read())
+            self.assertEqual(['pse2json.prom'], os.listdir(directory))
+
+    def test_serve(self):
+        registry = metrics.Registry()
+        registry.counter('c', 'C.').inc()
+
+        server = metrics.serve(0, registry=registry)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.assertEqual('127.0.0.1', server.server_address[0])
+
+        with urllib.request.urlopen(f'http://127.0.0.1:{server.server_address[1]}/metrics') as response:
+            self.assertEqual(registry.render(), response.read().decode('utf-8'))
+
+    def test_failures_counted(self):
+        labels = (diagnostics.SELECT_LAYOUT, 'FileNotFoundError')
+        before = metrics.PARSE_FAILURES.value(labels)
+
+        with tempfile.TemporaryDirectory() as directory:
+            file_names = synthetic.generate_corpus(directory, 1) + [os.path.join(directory, 'missing.pdf')]
+            for jobs in (1, 2):
+                batch.convert_files(file_names, batch.BatchOptions(jobs=jobs, metrics=True))
+
+        self.assertEqual(before + 2, metrics.PARSE_FAILURES.value(labels))
+
+    def test_bytes_read(self):
+        before = metrics.BYTES_READ.value()
+
+        with tempfile.TemporaryDirectory() as directory:
+            file_names = synthetic.generate_corpus(directory, 2)
+            batch.convert_files(file_names, batch.BatchOptions(metrics=False))
+            self.assertEqual(before, metrics.BYTES_READ.value())
+
+            batch.convert_files(file_names, batch.BatchOptions(metrics=True))
+            size = sum(os.path.getsize(file_name) for file_name in file_names)
+            self.assertEqual(before + size, metrics.BYTES_READ.value())
+
+    def test_spawned_workers_counted(self):
+        before = metrics.BILLS_PARSED.value()
+        spawn_context = functools.partial(multiprocessing.get_context, 'spawn')
+
+        with tempfile.TemporaryDirectory() as directory:
+            file_names = synthetic.generate_corpus(directory, 3)
+            with mock.patch.object(worker_pool.multiprocessing, 'get_context', spawn_context):
+                result = batch.convert_files(file_names, batch.BatchOptions(jobs=2, metrics=True))
+
+        self.assertEqual(3, len(result.bills))
+        self.assertEqual(before + 3, metrics.BILLS_PARSED.value())
+
+
+if __name__ == '__main__':
+    unittest.main()
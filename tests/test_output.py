@@ -0,0 +1,173 @@
+import bz2
+import gzip
+import hashlib
+import json
+import lzma
+import os
+import random
+import tempfile
+import unittest
+
+from pse2json import batch
+from pse2json import electricity_bill as eb
+from pse2json import output
+from pse2json import synthetic
+
+_DECOMPRESS = {'none': bytes, 'gzip': gzip.decompress, 'lzma': lzma.decompress, 'bz2': bz2.decompress}
+
+
+class OutputTests(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+        self.directory = self._dir.name
+
+        rng = random.Random(1)
+        self.bills = [(f'bill-{i}.pdf', synthetic.random_bill(rng)) for i in range(20)]
+
+    def _read_shards(self, manifest: dict) -> dict[str, list[eb.ElectricityBill]]:
+        shards = {}
+        for shard in manifest['shards']:
+            with open(os.path.join(self.directory, shard['path']), 'rb') as f:
+                data = f.read()
+            self.assertEqual(shard['bytes'], len(data))
+            self.assertEqual(shard['sha256'], hashlib.sha256(data).hexdigest())
+
+            lines = _DECOMPRESS[manifest['compression']](data).decode('utf-8').splitlines()
+            self.assertEqual(shard['records'], len(lines))
+            shards.setdefault(shard['key'], []).extend(eb.ElectricityBill.from_json(line) for line in lines)
+        return shards
+
+    def _load_manifest(self) -> dict:
+        with open(os.path.join(self.directory, output.MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_single_file(self):
+        manifest = output.write(output.OutputOptions(self.directory), self.bills)
+
+        self.assertEqual(20, manifest.records)
+        shards = self._read_shards(self._load_manifest())
+        self.assertEqual({'bills': [bill for _, bill in self.bills]}, shards)
+
+    def test_compressions(self):
+        for compression in output.COMPRESSIONS:
+            with self.subTest(compression):
+                options = output.OutputOptions(self.directory, output.MONTH, compression=compression)
+                output.write(options, self.bills)
+
+                shards = self._read_shards(self._load_manifest())
+                self.assertEqual(20, sum(len(bills) for bills in shards.values()))
+
+    def test_month_partition(self):
+        output.write(output.OutputOptions(self.directory, output.MONTH, writers=3), self.bills)
+
+        for key, bills in self._read_shards(self._load_manifest()).items():
+            for bill in bills:
+                self.assertEqual(key, bill.dates.from_date.strftime('%Y-%m'))
+
+        # bills keep the input order inside a shard
+        expected = [bill for _, bill in self.bills if bill.dates.from_date.strftime('%Y-%m') == key]
+        self.assertEqual(expected, bills)
+
+    def test_shard_partition_is_stable(self):
+        options = output.OutputOptions(self.directory, output.SHARD, shards=4, compression='gzip')
+        first = output.write(options, self.bills)
+        second = output.write(options, reversed(self.bills[10:]))
+
+        self.assertLessEqual(len(first.shards), 4)
+        keys = {output.partition_key(options, file_name, bill): file_name for file_name, bill in self.bills}
+        self.assertEqual(sorted(keys), [shard.key for shard in first.shards])
+        self.assertEqual(10, second.records)
+
+    def test_same_bills_same_checksums(self):
+        options = output.OutputOptions(self.directory, output.YEAR, compression='gzip')
+        first = output.write(options, self.bills)
+        second = output.write(options, self.bills)
+
+        self.assertEqual(first, second)
+        self.assertFalse([name for name in os.listdir(self.directory) if name.endswith('.tmp')])
+
+    def test_rotation(self):
+        manifest = output.write(output.OutputOptions(self.directory, max_records=8, compression='gzip'), self.bills)
+
+        self.assertEqual(
+            ['bills-00000.jsonl.gz', 'bills-00001.jsonl.gz', 'bills-00002.jsonl.gz'],
+            [shard.path for shard in manifest.shards])
+        self.assertEqual([8, 8, 4], [shard.records for shard in manifest.shards])
+        self.assertEqual({'bills': [bill for _, bill in self.bills]}, self._read_shards(self._load_manifest()))
+
+        size = len(self.bills[0][1].to_json()) * 3
+        manifest = output.write(output.OutputOptions(self.directory, max_bytes=size), self.bills)
+        self.assertGreater(len(manifest.shards), 3)
+        self.assertEqual(20, manifest.records)
+        self.assertTrue(all(shard.bytes >= size for shard in manifest.shards[:-1]))
+
+    def test_open_shards_capped(self):
+        options = output.OutputOptions(self.directory, output.MONTH, compression='lzma', max_open=2)
+        manifest = output.write(options, self.bills)
+
+        keys = [shard.key for shard in manifest.shards]
+        self.assertGreater(len(keys), len(set(keys)))
+        self.assertEqual(20, manifest.records)
+        expected: dict[str, list[eb.ElectricityBill]] = {}
+        for _, bill in self.bills:
+            expected.setdefault(bill.dates.from_date.strftime('%Y-%m'), []).append(bill)
+        self.assertEqual(expected, self._read_shards(self._load_manifest()))
+
+    def test_stale_shards_removed(self):
+        output.write(output.OutputOptions(self.directory, output.MONTH, compression='lzma'), self.bills)
+        with open(os.path.join(self.directory, 'bills-00003.jsonl.tmp'), 'w') as f:
+            f.write('left by an interrupted run')
+
+        output.write(output.OutputOptions(self.directory), self.bills[:2])
+
+        self.assertEqual(['bills-00000.jsonl', output.MANIFEST_NAME], sorted(os.listdir(self.directory)))
+
+    def test_foreign_files_kept(self):
+        foreign = os.path.join(self.directory, 'mine.jsonl')
+        with open(foreign, 'w') as f:
+            f.write('{}\n')
+
+        with self.assertRaises(ValueError):
+            output.write(output.OutputOptions(self.directory), self.bills)
+        self.assertEqual(['mine.jsonl'], os.listdir(self.directory))
+
+    def test_abort(self):
+        with self.assertRaises(RuntimeError):
+            with output.ShardWriter(output.OutputOptions(self.directory, output.YEAR)) as writer:
+                for file_name, bill in self.bills:
+                    writer.add(file_name, bill)
+                raise RuntimeError('interrupted')
+
+        self.assertEqual([], os.listdir(self.directory))
+
+    def test_batch_streams_bills(self):
+        with tempfile.TemporaryDirectory() as corpus:
+            file_names = synthetic.generate_corpus(corpus, 6)
+            inputs = file_names[:3] + [os.path.join(corpus, 'missing.pdf')] + file_names[3:]
+
+            for jobs in (1, 2):
+                with self.subTest(jobs=jobs):
+                    added = []
+                    result = batch.convert_files(
+                        inputs, batch.BatchOptions(jobs=jobs), lambda *file_bill: added.append(file_bill))
+
+                    self.assertEqual([(f, synthetic.expected_bill(f)) for f in file_names], added)
+                    self.assertEqual([], result.bills)
+                    self.assertEqual(1, len(result.failures))
+
+    def test_invalid_options(self):
+        with self.assertRaises(ValueError):
+            output.write(output.OutputOptions(self.directory, 'day'), self.bills)
+        with self.assertRaises(ValueError):
+            output.write(output.OutputOptions(self.directory, compression='zip'), self.bills)
+        with self.assertRaises(ValueError):
+            output.write(output.OutputOptions(self.directory, output.SHARD, shards=0), self.bills)
+        with self.assertRaises(ValueError):
+            output.write(output.OutputOptions(self.directory, max_records=-1), self.bills)
+        with self.assertRaises(ValueError):
+            output.write(output.OutputOptions(self.directory, max_open=0), self.bills)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,26 @@
+import unittest
+
+from unittest import mock
+
+from pse2json import pdf_text_word_reader as ptwr
+from pse2json import text_block
+
+
+class PdfTextWordReaderTests(unittest.TestCase):
+    @mock.patch('fitz.open')
+    def test_read_text_words(self, fitz_open_mock):
+        doc_mock = fitz_open_mock().__enter__()
+        page_mock = doc_mock.load_page()
+        page_mock.get_text.return_value = [(1, 2, 3, 4, 'word', 5, 6, 7)]
+
+        words = ptwr.read_text_words('file.pdf', 1)
+
+        fitz_open_mock.assert_called_with('file.pdf')
+        doc_mock.load_page.assert_called_with(1)
+        page_mock.get_text.assert_called_with('words')
+
+        self.assertEqual([text_block.TextWord(text_block.Rectangle(1, 2, 3, 4), 'word')], words)
+
+
+if __name__ == '__main__':
+    unittest.main()
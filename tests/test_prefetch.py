@@ -0,0 +1,97 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from unittest import mock
+
+from pse2json import converter
+from pse2json import prefetch
+from pse2json import synthetic
+
+
+class _SlowStorage:
+    def __init__(self, delay: float, sizes: dict[str, int]):
+        self.delay = delay
+        self.sizes = sizes
+        self.reading = 0
+        self.max_reading = 0
+        self._lock = threading.Lock()
+
+    def read(self, file_name: str) -> bytes | None:
+        with self._lock:
+            self.reading += 1
+            self.max_reading = max(self.max_reading, self.reading)
+        time.sleep(self.delay)
+        with self._lock:
+            self.reading -= 1
+        return b'x' * self.sizes[file_name] if file_name in self.sizes else None
+
+
+class PrefetcherTests(unittest.TestCase):
+    def _prefetch(self, storage: _SlowStorage, file_names: list[str], options: prefetch.PrefetchOptions):
+        with mock.patch('pse2json.prefetch._read_file', storage.read):
+            with prefetch.Prefetcher(file_names, options) as prefetcher:
+                return list(prefetcher)
+
+    def test_keeps_order(self):
+        file_names = [f'{i}.pdf' for i in range(20)]
+        storage = _SlowStorage(0.001, {file_name: i for i, file_name in enumerate(file_names)})
+
+        items = self._prefetch(storage, file_names, prefetch.PrefetchOptions(concurrency=4))
+
+        self.assertEqual([(file_name, b'x' * i) for i, file_name in enumerate(file_names)], items)
+
+    def test_reads_concurrently(self):
+        file_names = [f'{i}.pdf' for i in range(16)]
+        storage = _SlowStorage(0.05, dict.fromkeys(file_names, 10))
+
+        start = time.perf_counter()
+        self._prefetch(storage, file_names, prefetch.PrefetchOptions(concurrency=8))
+        seconds = time.perf_counter() - start
+
+        self.assertEqual(8, storage.max_reading)
+        self.assertLess(seconds, 16 * 0.05 / 2)
+
+    def test_budget_limits_reads_ahead(self):
+        file_names = [f'{i}.pdf' for i in range(10)]
+        storage = _SlowStorage(0, dict.fromkeys(file_names, 100))
+
+        with mock.patch('pse2json.prefetch._read_file', storage.read):
+            with prefetch.Prefetcher(file_names, prefetch.PrefetchOptions(concurrency=4, budget_bytes=250)) as prefetcher:
+                items = iter(prefetcher)
+                next(items)
+                time.sleep(0.05)
+                # reads stop once the budget is used, the reads in flight at that moment may go over it
+                self.assertGreaterEqual(prefetcher._buffered_bytes, 250)
+                self.assertLess(prefetcher._buffered_bytes, 700)
+                self.assertEqual(9, len(list(items)))
+
+    def test_unreadable_file(self):
+        storage = _SlowStorage(0, {'a.pdf': 1})
+        items = self._prefetch(storage, ['a.pdf', 'missing.pdf'], prefetch.PrefetchOptions())
+        self.assertEqual([('a.pdf', b'x'), ('missing.pdf', None)], items)
+
+    def test_stops_early(self):
+        storage = _SlowStorage(0.01, {})
+        with mock.patch('pse2json.prefetch._read_file', storage.read):
+            with prefetch.Prefetcher((f'{i}.pdf' for i in range(1000)), prefetch.PrefetchOptions(2)) as prefetcher:
+                next(iter(prefetcher))
+        self.assertLess(storage.reading, 2 + 1)
+
+    def test_read_table_from_bytes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = synthetic.generate_corpus(directory, 1)[0]
+            with open(file_name, 'rb') as f:
+                data = f.read()
+            os.remove(file_name)
+
+            for extractor in converter.EXTRACTORS:
+                with self.subTest(extractor):
+                    bill = converter.read_table(file_name, extractor=extractor, data=data)
+                    self.assertEqual(synthetic.expected_bill(file_name), bill)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+from unittest import mock
+
+from pse2json import batch
+from pse2json import converter
+from pse2json import electricity_bill as eb
+from pse2json import preflight
+from pse2json import synthetic
+
+# import PyMuPDF - python binding for MuPDF
+import fitz
+
+_FROM_TEXT = 'Your Electric Charge Details'
+_TO_TEXT = 'Current Electric Charges'
+
+
+def _write_pdf(path: str, lines: list[str], page_count: int = 2) -> None:
+    doc = fitz.open()
+    for _ in range(page_count):
+        doc.new_page()
+    page = doc.load_page(page_count - 1)
+    for i, line in enumerate(lines):
+        page.insert_text((22, 110 + 20 * i), line, fontsize=8)
+    doc.save(path)
+    doc.close()
+
+
+_BILL_LINES = [
+    'Your Electric Charge Details (31 days)',
+    '1,383 kWh used for service 11/7/2019 - 12/7/2019',
+    'Current Electric Charges $ 1,139.09',
+]
+
+
+class PreflightTests(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self._dir.name, name)
+
+    def _check(self, path: str) -> preflight.PreflightResult:
+        return preflight.check(path, 1, _FROM_TEXT, _TO_TEXT)
+
+    def test_bill(self):
+        path = self._path('bill.pdf')
+        _write_pdf(path, _BILL_LINES)
+
+        result = self._check(path)
+
+        self.assertIsNone(result.rejected)
+        self.assertEqual(64, len(result.content_hash))
+        self.assertEqual(
+            preflight.Fingerprint(
+                eb.DateRange(datetime.date(2019, 11, 7), datetime.date(2019, 12, 7)),
+                113909),
+            result.fingerprint)
+
+    def test_not_a_pdf(self):
+        path = self._path('notes.pdf')
+        with open(path, 'w') as f:
+            f.write('not a PDF')
+
+        self.assertTrue(self._check(path).rejected.startswith('not a PDF'))
+
+    def test_single_page(self):
+        path = self._path('single.pdf')
+        _write_pdf(path, _BILL_LINES, page_count=1)
+
+        self.assertEqual('1 page(s), no page 2', self._check(path).rejected)
+
+    def test_no_anchor(self):
+        path = self._path('other.pdf')
+        _write_pdf(path, ['Some other statement', _TO_TEXT])
+
+        self.assertEqual(f'\'{_FROM_TEXT}\' not found', self._check(path).rejected)
+
+    def test_no_fingerprint(self):
+        path = self._path('partial.pdf')
+        _write_pdf(path, [_BILL_LINES[0], _BILL_LINES[2]])
+
+        result = self._check(path)
+        self.assertIsNone(result.rejected)
+        self.assertIsNone(result.fingerprint)
+
+
+class DeduplicatorTests(unittest.TestCase):
+    _DATES = eb.DateRange(datetime.date(2019, 11, 7), datetime.date(2019, 12, 7))
+
+    def test_duplicate_content(self):
+        deduplicator = preflight.Deduplicator()
+        fingerprint = preflight.Fingerprint(self._DATES, 100)
+
+        self.assertIsNone(deduplicator.check(preflight.PreflightResult('a.pdf', 'hash')))
+        # a file is a duplicate only once a copy of it was converted
+        self.assertIsNone(deduplicator.check(preflight.PreflightResult('b.pdf', 'hash')))
+        self.assertIsNone(deduplicator.record('hash', fingerprint))
+        self.assertEqual(
+            'duplicate file content',
+            deduplicator.check(preflight.PreflightResult('b.pdf', 'hash')))
+        self.assertEqual('duplicate file content', deduplicator.record('hash', fingerprint))
+
+    def test_duplicate_fingerprint(self):
+        deduplicator = preflight.Deduplicator()
+        fingerprint = preflight.Fingerprint(self._DATES, 100)
+
+        self.assertIsNone(deduplicator.check(preflight.PreflightResult('a.pdf', 'a', fingerprint=fingerprint)))
+        self.assertIsNone(deduplicator.record('a', fingerprint))
+        self.assertEqual(
+            'duplicate bill 2019-11-07 - 2019-12-07',
+            deduplicator.check(preflight.PreflightResult('b.pdf', 'b', fingerprint=fingerprint)))
+        self.assertIsNone(deduplicator.record('c', preflight.Fingerprint(self._DATES, 101)))
+
+    def test_seed(self):
+        deduplicator = preflight.Deduplicator()
+        deduplicator.seed(['a'], [preflight.Fingerprint(self._DATES, 100)])
+
+        self.assertIsNotNone(deduplicator.check(preflight.PreflightResult('a.pdf', 'a')))
+        self.assertIsNotNone(deduplicator.record('b', preflight.Fingerprint(self._DATES, 100)))
+
+
+class BatchPreflightTests(unittest.TestCase):
+    def test_copy_of_failed_bill_is_converted(self):
+        read_table = converter.read_table
+
+        with tempfile.TemporaryDirectory() as directory:
+            file_names = synthetic.generate_corpus(directory, 2)
+            copy = os.path.join(directory, 'copy.pdf')
+            shutil.copyfile(file_names[0], copy)
+
+            def fail_first(file_name: str, *args, **kwargs) -> eb.ElectricityBill:
+                if file_name == file_names[0]:
+                    raise RuntimeError('failed')
+                # the bytes read by the preflight check are passed on
+                self.assertIsNotNone(kwargs['data'])
+                return read_table(file_name, *args, **kwargs)
+
+            with mock.patch.object(converter, 'read_table', side_effect=fail_first):
+                result = batch.convert_files(
+                    [file_names[0], copy, file_names[1], copy], batch.BatchOptions(preflight=True))
+
+            self.assertEqual([synthetic.expected_bill(file_names[0]), synthetic.expected_bill(file_names[1])],
+                             result.bills)
+            self.assertEqual([file_names[0]], [failure.file_name for failure in result.failures])
+            self.assertEqual([(copy, 'duplicate file content')],
+                             [(skipped.file_name, skipped.reason) for skipped in result.skipped])
+
+    def test_checked_and_converted_by_one_pool(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_names = synthetic.generate_corpus(directory, 3)
+            copy = os.path.join(directory, 'copy.pdf')
+            shutil.copyfile(file_names[0], copy)
+
+            result = batch.convert_files(file_names + [copy], batch.BatchOptions(jobs=2, preflight=True))
+
+            self.assertEqual([synthetic.expected_bill(file_name) for file_name in file_names], result.bills)
+            self.assertEqual([(copy, 'duplicate file content')],
+                             [(skipped.file_name, skipped.reason) for skipped in result.skipped])
+            self.assertEqual(1, len(result.pool_stats))
+
+
+if __name__ == '__main__':
+    unittest.main()
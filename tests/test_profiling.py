@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+
+from pse2json import profiling
+
+
+def _convert(file_name: str) -> str:
+    with profiling.stage('parse'):
+        with profiling.stage('inner'):
+            pass
+    with profiling.stage('parse'):
+        pass
+    return file_name.upper()
+
+
+class ProfilingTests(unittest.TestCase):
+    def test_stage_is_noop_when_off(self):
+        self.assertIs(profiling.stage('a'), profiling.stage('b'))
+
+    def test_collect(self):
+        with profiling.collect() as timings:
+            _convert('a.pdf')
+
+        self.assertEqual({'parse', 'inner'}, set(timings))
+        self.assertIs(profiling.stage('a'), profiling.stage('b'))
+
+    def test_profiled(self):
+        profile = profiling.profiled(_convert, profiling.ProfileOptions(), 'a.pdf')
+
+        self.assertEqual('A.PDF', profile.value)
+        self.assertEqual({'parse', 'inner', profiling.TOTAL}, set(profile.timings))
+        self.assertGreaterEqual(profile.timings[profiling.TOTAL], profile.timings['parse'])
+        self.assertIsNone(profile.traced_peak_bytes)
+
+    def test_sampled_files_write_profiles(self):
+        with tempfile.TemporaryDirectory() as directory:
+            options = profiling.ProfileOptions(sample_every=1, output_dir=directory, trace_memory=True)
+
+            profile = profiling.profiled(_convert, options, 'a.pdf')
+
+            names = sorted(os.listdir(directory))
+            self.assertEqual(2, len(names))
+            self.assertTrue(names[0].endswith('.prof'))
+            self.assertTrue(names[1].endswith('.tracemalloc.txt'))
+            self.assertIsNotNone(profile.traced_peak_bytes)
+
+    def test_report(self):
+        report = profiling.ProfileReport()
+        for i in range(1, 101):
+            report.add(profiling.Profiled(f'{i}.pdf', None, {'parse': i / 1000, profiling.TOTAL: i / 1000}))
+
+        lines = report.lines(slowest=2)
+
+        self.assertTrue(lines[1].startswith('parse'))
+        self.assertEqual(['100', '50.00', '90.00', '99.00', '100.00', '5.050'], lines[1].split()[1:])
+        self.assertEqual('slowest 2 file(s):', lines[3])
+        self.assertTrue(lines[4].endswith('100.pdf'))
+        self.assertTrue(lines[5].endswith('99.pdf'))
+
+    def test_empty_report(self):
+        self.assertEqual(['no files profiled'], profiling.ProfileReport().lines())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import copy
+import json
+import os
+import random
+import tempfile
+import unittest
+
+from pse2json import electricity_bill as eb
+from pse2json import output
+from pse2json import reconcile
+from pse2json import synthetic
+
+
+def _bills(count: int) -> list[dict]:
+    rng = random.Random(3)
+    return [synthetic.random_bill(rng).to_dict() for _ in range(count)]
+
+
+class ReconcileTests(unittest.TestCase):
+    def test_hash_is_stable(self):
+        bill = _bills(1)[0]
+        reordered = dict(reversed(list(bill.items())))
+
+        self.assertEqual(reconcile.bill_hash(bill), reconcile.bill_hash(reordered))
+        self.assertEqual(reconcile.bill_hash(bill), reconcile.bill_hash(dict(bill, warnings=['checked'])))
+        self.assertNotEqual(reconcile.bill_hash(bill), reconcile.bill_hash(dict(bill, total_cents=0)))
+
+    def test_line_item_hashes(self):
+        bill = _bills(1)[0]
+        changed = copy.deepcopy(bill)
+        changed['tier_1'][0]['charge']['charge_cents'] += 1
+
+        old = reconcile.line_item_hashes(bill)
+        new = reconcile.line_item_hashes(changed)
+        changed_paths = [path for path in old if old[path] != new[path]]
+        self.assertEqual(1, len(changed_paths))
+        self.assertTrue(changed_paths[0].startswith('tier_1['))
+
+    def test_line_item_hashes_keyed_by_dates(self):
+        bill = {'tier_1': [
+            {'dates': {'from_date': '2020-01-01', 'to_date': '2020-01-15'}, 'charge': {'charge_cents': 10}},
+            {'dates': {'from_date': '2020-01-16', 'to_date': '2020-01-31'}, 'charge': {'charge_cents': 20}},
+        ], 'total_cents': 30}
+        inserted = copy.deepcopy(bill)
+        inserted['tier_1'].insert(0, {'dates': {'from_date': '2019-12-20', 'to_date': '2019-12-31'},
+                                      'charge': {'charge_cents': 5}})
+        inserted['total_cents'] = 35
+
+        old = reconcile.line_item_hashes(bill)
+        new = reconcile.line_item_hashes(inserted)
+        self.assertEqual(
+            ['tier_1[2019-12-20 - 2019-12-31]', 'total_cents'],
+            sorted(path for path in old.keys() | new.keys() if old.get(path) != new.get(path)))
+
+    def test_unchanged(self):
+        bills = _bills(5)
+        result = reconcile.reconcile(bills, reversed(copy.deepcopy(bills)))
+
+        self.assertEqual(5, result.unchanged)
+        self.assertFalse(result.differs)
+
+    def test_changes(self):
+        old = _bills(4)
+        new = copy.deepcopy(old[1:]) + _bills(5)[4:]
+        new[0]['total_cents'] += 100
+        new[1]['other']['charge_cents'] = 0
+
+        result = reconcile.reconcile(old, new)
+
+        self.assertEqual(1, result.unchanged)
+        self.assertEqual(
+            [[reconcile.Change('total_cents', old[1]['total_cents'], old[1]['total_cents'] + 100)],
+             [reconcile.Change('other.charge_cents', old[2]['other']['charge_cents'], 0)]],
+            [bill_diff.changes for bill_diff in result.changed])
+        self.assertEqual(['total_cents'], result.changed[0].line_items)
+        self.assertEqual([reconcile.bill_hash(old[0])], [bill_hash for _, bill_hash in result.only_old])
+        self.assertEqual(1, len(result.only_new))
+        self.assertTrue(result.differs)
+
+    def test_line_items_matched_by_dates(self):
+        old = {'dates': {'from_date': '2020-01-01', 'to_date': '2020-01-31'}, 'power_cost_adjustment': [
+            {'dates': {'from_date': '2020-01-01', 'to_date': '2020-01-15'}, 'charge': {'charge_cents': 10}},
+            {'dates': {'from_date': '2020-01-16', 'to_date': '2020-01-31'}, 'charge': {'charge_cents': 20}},
+        ]}
+        new = copy.deepcopy(old)
+        del new['power_cost_adjustment'][0]
+        new['power_cost_adjustment'][0]['charge']['charge_cents'] = 25
+
+        self.assertEqual([
+            reconcile.Change('power_cost_adjustment[0].charge.charge_cents', 20, 25),
+            reconcile.Change('power_cost_adjustment[0]', old['power_cost_adjustment'][0], None),
+        ], reconcile.diff_bills(old, new))
+
+    def test_load_bills(self):
+        bills = _bills(3)
+        with tempfile.TemporaryDirectory() as directory:
+            list_path = os.path.join(directory, 'bills.json')
+            with open(list_path, 'w', encoding='utf-8') as f:
+                f.write(eb.ElectricityBillList(bills=[eb.ElectricityBill.from_dict(b) for b in bills]).to_json(indent=2))
+
+            single_path = os.path.join(directory, 'bill.json')
+            with open(single_path, 'w', encoding='utf-8') as f:
+                f.write(eb.ElectricityBill.from_dict(bills[0]).to_json(indent=2))
+
+            shards_dir = os.path.join(directory, 'out')
+            options = output.OutputOptions(shards_dir, output.MONTH, compression='bz2')
+            output.write(options, [('bill.pdf', eb.ElectricityBill.from_dict(b)) for b in bills])
+
+            self.assertEqual(bills, list(reconcile.load_bills(list_path)))
+            self.assertEqual(bills[:1], list(reconcile.load_bills(single_path)))
+            self.assertEqual(3, reconcile.reconcile(reconcile.load_bills(list_path), reconcile.load_bills(shards_dir)).unchanged)
+
+            with open(os.path.join(shards_dir, output.MANIFEST_NAME), 'r', encoding='utf-8') as f:
+                shard = json.load(f)['shards'][0]
+            shard_path = os.path.join(shards_dir, shard['path'])
+            self.assertEqual(shard['records'], len(list(reconcile.load_bills(shard_path))))
+
+            # a damaged shard fails its checksum
+            with open(shard_path, 'ab') as f:
+                f.write(b'\0')
+            with self.assertRaises(ValueError):
+                list(reconcile.load_bills(shards_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -224,6 +224,75 @@ class RowReaderTests(unittest.TestCase):
         exception = context.exception
         self.assertTrue(str(exception).startswith('rate '))
 
+    def test_charge_mismatch_kind(self):
+        rows = _build_rows(
+            ['Energy Exchange Credit -0.007386 1,629 kWh -12.06'],
+        )
+        with self.assertRaises(rr.BillError) as context:
+            rr.read_electricity_bill(rows)
+        self.assertEqual(rr.CHARGE_MISMATCH, context.exception.kind)
+
+    def test_malformed_charge(self):
+        rows = _build_rows(
+            ['Energy Exchange Credit -0.007386 1,629 kW -12.03'],
+        )
+        for validation in rr.VALIDATION_MODES:
+            with self.subTest(validation=validation), self.assertRaises(rr.BillError) as context:
+                rr.read_electricity_bill(rows, validation)
+            self.assertEqual(rr.MALFORMED_CHARGE, context.exception.kind)
+
+    def test_subtotal_mismatch(self):
+        rows = _build_rows(['Basic Charge $7.49 per month 7.49'])
+        rows[-2] = 'Subtotal 7.50'
+        with self.assertRaises(rr.BillError) as context:
+            rr.read_electricity_bill(rows)
+        self.assertEqual(rr.SUBTOTAL_MISMATCH, context.exception.kind)
+
+    def test_total_mismatch(self):
+        rows = _build_rows(['Basic Charge $7.49 per month 7.49'])
+        rows[-1] = 'Current Electric Charges $ 7.50'
+        with self.assertRaises(rr.BillError) as context:
+            rr.read_electricity_bill(rows)
+        self.assertEqual(rr.TOTAL_MISMATCH, context.exception.kind)
+
+    def test_missing_value(self):
+        rows = _build_rows(add_used_for_service_row=False)
+        with self.assertRaises(rr.BillError) as context:
+            rr.read_electricity_bill(rows)
+        self.assertEqual(rr.MISSING_VALUE, context.exception.kind)
+
+    def test_lenient_collects_warnings(self):
+        rows = _build_rows(['Energy Exchange Credit -0.007386 1,629 kWh -12.06'])
+        rows[-1] = 'Current Electric Charges $ 0.00'
+
+        result = rr.read_electricity_bill(rows, rr.LENIENT)
+        self.assertEqual(-1206, result.energy_exchange_credit[0].charge.charge_cents)
+        self.assertEqual(2, len(result.warnings))
+        self.assertTrue(result.warnings[0].startswith('rate '))
+        self.assertTrue(result.warnings[1].startswith('Total doesn\'t match'))
+        self.assertIn('"warnings"', result.to_json())
+
+    def test_off_skips_checks(self):
+        rows = _build_rows(['Energy Exchange Credit -0.007386 1,629 kWh -12.06'])
+        rows[-1] = 'Current Electric Charges $ 0.00'
+
+        result = rr.read_electricity_bill(rows, rr.OFF)
+        self.assertEqual(0, result.total_cents)
+        self.assertEqual([], result.warnings)
+
+    def test_valid_bill_has_no_warnings(self):
+        rows = _build_rows(['Basic Charge $7.49 per month 7.49'])
+
+        strict = rr.read_electricity_bill(rows)
+        self.assertEqual([], strict.warnings)
+        self.assertNotIn('warnings', strict.to_json())
+        for validation in (rr.LENIENT, rr.OFF):
+            self.assertEqual(strict, rr.read_electricity_bill(rows, validation))
+
+    def test_unknown_validation_mode(self):
+        with self.assertRaises(ValueError):
+            rr.read_electricity_bill(_build_rows(), 'loose')
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,58 @@
+import os
+import random
+import tempfile
+import unittest
+
+from pse2json import converter
+from pse2json import synthetic
+
+
+class SyntheticTests(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+        self.directory = self._dir.name
+
+    def test_bills_parse_to_expected(self):
+        file_names = synthetic.generate_corpus(self.directory, 12, seed=3)
+
+        self.assertEqual(12, len(file_names))
+        for file_name in file_names:
+            with self.subTest(file_name=os.path.basename(file_name)):
+                self.assertEqual(synthetic.expected_bill(file_name), converter.read_table(file_name))
+
+    def test_bills_parse_to_expected_with_words(self):
+        file_names = synthetic.generate_corpus(self.directory, 12, seed=3)
+
+        for file_name in file_names:
+            with self.subTest(file_name=os.path.basename(file_name)):
+                self.assertEqual(synthetic.expected_bill(file_name), converter.read_table(file_name, extractor=converter.WORDS))
+
+    def test_single_layout(self):
+        file_names = synthetic.generate_corpus(self.directory, 2, layouts=['wrapped'])
+
+        self.assertTrue(all(file_name.endswith('-wrapped.pdf') for file_name in file_names))
+
+    def test_corpus_is_reused(self):
+        file_names = synthetic.generate_corpus(self.directory, 2)
+        mtimes = [os.path.getmtime(file_name) for file_name in file_names]
+
+        self.assertEqual(file_names, synthetic.generate_corpus(self.directory, 2))
+        self.assertEqual(mtimes, [os.path.getmtime(file_name) for file_name in file_names])
+
+    def test_random_bill_is_consistent(self):
+        rng = random.Random(5)
+        for _ in range(50):
+            bill = synthetic.random_bill(rng)
+            charges = (
+                bill.tier_1 + bill.tier_2 + bill.energy_exchange_credit + bill.electric_cons_program_charge
+                + bill.federal_wind_power_credit + bill.renewable_energy_credit + bill.power_cost_adjustment)
+
+            self.assertEqual(
+                bill.subtotal_cents,
+                bill.basic_charge_cents + bill.other.charge_cents + sum(x.charge.charge_cents for x in charges))
+            self.assertLessEqual(bill.dates.from_date, bill.dates.to_date)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -28,6 +28,12 @@ class RectangleTests(unittest.TestCase):
 
         self.assertFalse(result)
 
+    def test_in_rectangle_edge(self):
+        outer_rect = tb.Rectangle(1, 1, 5, 5)
+
+        self.assertTrue(tb.Rectangle(1, 1, 5.00003, 5).in_rectangle(outer_rect))
+        self.assertFalse(tb.Rectangle(1, 1, 5.1, 5).in_rectangle(outer_rect))
+
     def test_all_permutations(self):
         permutations = [
             ((1.0, 2.0), (1.0, 2.0), True),
@@ -0,0 +1,145 @@
+import unittest
+
+from pse2json import bill_layout
+from pse2json import word_table_reader
+from pse2json.text_block import Rectangle, TextWord
+
+_HEIGHT = 10
+_SPACE = 2
+_CHAR = 4
+# the word height of a real bill, whose rows are about 11.2 apart and wrapped lines about 9.2
+_DENSE_HEIGHT = 8.9375
+
+
+def _words(x: float, baseline: float, text: str, height: float = _HEIGHT) -> list[TextWord]:
+    words = []
+    for word in text.split():
+        right = x + len(word) * _CHAR
+        words.append(TextWord(Rectangle(x, baseline - height, right, baseline), word))
+        x = right + _SPACE
+    return words
+
+
+def _right(right: float, baseline: float, text: str, height: float = _HEIGHT) -> list[TextWord]:
+    words = text.split()
+    width = sum(len(word) for word in words) * _CHAR + (len(words) - 1) * _SPACE
+    return _words(right - width, baseline, text, height)
+
+
+def _dense_line(baseline: float, label: str, rate: str = '', units: str = '', amount: str = '') -> list[TextWord]:
+    words = _words(22, baseline, label, _DENSE_HEIGHT)
+    for right, text in ((280, rate), (335, units), (374, amount)):
+        if text:
+            words += _right(right, baseline, text, _DENSE_HEIGHT)
+    return words
+
+
+def _read_rows(words: list[TextWord]) -> list[str]:
+    layout = bill_layout.PSE_ELECTRIC
+    _, table_lines = word_table_reader.find_table(word_table_reader.group_lines(words), layout.from_text, layout.to_text)
+    return word_table_reader.read_table_lines(table_lines, layout)
+
+
+class WordTableReaderTests(unittest.TestCase):
+    def test_group_lines(self):
+        words = (
+            _words(100, 21, 'right') + _words(10, 20, 'left') +
+            _words(10, 30, 'next line'))
+
+        lines = word_table_reader.group_lines(words)
+
+        self.assertEqual([['left', 'right'], ['next', 'line']], [[w.text for w in line] for line in lines])
+
+    def test_no_upper_boundary(self):
+        with self.assertRaises(ValueError) as context:
+            _read_rows(_words(10, 20, 'End'))
+        self.assertEqual('Can\'t find upper boundary of the table', str(context.exception))
+
+    def test_no_lower_boundary(self):
+        words = _words(10, 20, 'Your Electric Charge Details')
+        with self.assertRaises(ValueError) as context:
+            _read_rows(words)
+        self.assertEqual('Can\'t find lower boundary of the table', str(context.exception))
+
+    def test_rows(self):
+        words = (
+            _words(10, 20, 'Words above the table') +
+            _words(10, 40, 'Your Electric Charge Details (31 days)') + _right(400, 40, '= Charge') +
+            # service usage is a line above the basic charge, basic charge is split into its own row
+            _words(10, 60, '1,459 kWh used for service 12/8/2019 - 1/8/2020') +
+            _words(10, 70, 'Basic Charge $7.49 per month') + _right(400, 70, '7.49') +
+            # the dates of the label wrap below the line with the numbers
+            _words(10, 90, 'Electricity Tier 1 (First 600 kWh Used)') +
+            _words(10, 100, '(12/8/2019 - 12/31/2019)') +
+            _words(240, 90, '0.1 1 kWh') + _right(400, 90, '0.10') +
+            _words(10, 120, 'Taxes State Utility Tax ($0.01 included in above charges)') + _right(320, 120, '3.873%') +
+            _words(10, 140, 'Current Electric Charges') + _words(330, 140, '$') + _right(400, 140, '\N{MINUS SIGN}7.59') +
+            _words(10, 160, 'Words below the table'))
+
+        rows = _read_rows(words)
+
+        self.assertEqual([
+            'Your Electric Charge Details (31 days) = Charge',
+            '1,459 kWh used for service 12/8/2019 - 1/8/2020',
+            'Basic Charge $7.49 per month 7.49',
+            'Tier 1 (First 600 kWh Used) (12/8/2019 - 12/31/2019) 0.1 1 kWh 0.10',
+            'Taxes State Utility Tax ($0.01 included in above charges) 3.873%',
+            'Current Electric Charges $ -7.59',
+        ], rows)
+
+    def test_dense_rows(self):
+        # the baselines of test_table_reader.test_complex_table
+        words = (
+            _dense_line(114.2, 'Your Electric Charge Details (30 days)', 'Rate x Unit', '', '= Charge') +
+            _dense_line(127.4, '1,629 kWh used for service 12/9/2020 - 1/7/2021') +
+            _dense_line(137.45, 'Basic Charge $7.49 per month', '', '$', '7.49') +
+            _dense_line(148.65, 'Electricity') +
+            _dense_line(159.85, 'Tier 1 (First 460 kWh Used)', '0.094437', '460 kWh', '43.44') +
+            _dense_line(169.05, '(12/9/2020 - 12/31/2020)') +
+            _dense_line(180.25, 'Tier 2 (Above 460 kWh Used)', '0.114643', '788.9 kWh', '90.44') +
+            _dense_line(189.45, '(12/9/2020 - 12/31/2020)') +
+            _dense_line(200.65, 'Tier 1 (First 140 kWh Used) (1/1/2021 - 1/7/2021)', '0.093697', '140 kWh', '13.12') +
+            _dense_line(211.85, 'Tier 2 (Above 140 kWh Used)', '0.113903', '240.1 kWh', '27.35') +
+            _dense_line(221.05, '(1/1/2021 - 1/7/2021)') +
+            _dense_line(232.25, 'Energy Exchange Credit', '\N{MINUS SIGN}0.007386', '1,629 kWh', '\N{MINUS SIGN}12.03') +
+            _dense_line(243.45, 'Federal Wind Power Credit', '\N{MINUS SIGN}0.001893', '1,248.9 kWh', '\N{MINUS SIGN}2.36') +
+            _dense_line(252.64, '(12/9/2020 - 12/31/2020)') +
+            _dense_line(
+                263.84, 'Federal Wind Power Credit (1/1/2021 - 1/7/2021)',
+                '\N{MINUS SIGN}0.001440', '380.1 kWh', '\N{MINUS SIGN}0.55') +
+            _dense_line(
+                275.04, 'Renewable Energy Credit (12/9/2020 - 12/31/2020)',
+                '\N{MINUS SIGN}0.000082', '1,248.9 kWh', '\N{MINUS SIGN}0.10') +
+            _dense_line(
+                286.24, 'Renewable Energy Credit (1/1/2021 - 1/7/2021)',
+                '\N{MINUS SIGN}0.000043', '380.1 kWh', '\N{MINUS SIGN}0.02') +
+            _dense_line(297.44, 'Other Electric Charges & Credits', '0.006794', '1,629 kWh', '11.07') +
+            _dense_line(308.64, 'Subtotal', '', '', '177.85') +
+            _dense_line(322.64, 'Taxes') +
+            _dense_line(333.84, 'State Utility Tax ($6.89 included in above charges)', '', '3.873%') +
+            _dense_line(345.04, 'Current Electric Charges', '', '$', '177.85'))
+
+        rows = _read_rows(words)
+
+        self.assertEqual([
+            'Your Electric Charge Details (30 days) Rate x Unit = Charge',
+            '1,629 kWh used for service 12/9/2020 - 1/7/2021',
+            'Basic Charge $7.49 per month 7.49',
+            'Tier 1 (First 460 kWh Used) (12/9/2020 - 12/31/2020) 0.094437 460 kWh 43.44',
+            'Tier 2 (Above 460 kWh Used) (12/9/2020 - 12/31/2020) 0.114643 788.9 kWh 90.44',
+            'Tier 1 (First 140 kWh Used) (1/1/2021 - 1/7/2021) 0.093697 140 kWh 13.12',
+            'Tier 2 (Above 140 kWh Used) (1/1/2021 - 1/7/2021) 0.113903 240.1 kWh 27.35',
+            'Energy Exchange Credit -0.007386 1,629 kWh -12.03',
+            'Federal Wind Power Credit (12/9/2020 - 12/31/2020) -0.001893 1,248.9 kWh -2.36',
+            'Federal Wind Power Credit (1/1/2021 - 1/7/2021) -0.001440 380.1 kWh -0.55',
+            'Renewable Energy Credit (12/9/2020 - 12/31/2020) -0.000082 1,248.9 kWh -0.10',
+            'Renewable Energy Credit (1/1/2021 - 1/7/2021) -0.000043 380.1 kWh -0.02',
+            'Other Electric Charges & Credits 0.006794 1,629 kWh 11.07',
+            'Subtotal 177.85',
+            'Taxes State Utility Tax ($6.89 included in above charges) 3.873%',
+            'Current Electric Charges $ 177.85',
+        ], rows)
+
+
+if __name__ == '__main__':
+    unittest.main()
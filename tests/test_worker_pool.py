@@ -0,0 +1,109 @@
+import os
+import signal
+import unittest
+
+from pse2json import worker_pool
+
+
+def _square(x: int) -> int:
+    return x * x
+
+
+def _pid(_) -> int:
+    return os.getpid()
+
+
+def _fail_on_three(x: int) -> int:
+    if x == 3:
+        raise ValueError(f'bad value {x}')
+    return x
+
+
+def _killed_on_three(x: int) -> int:
+    if x == 3:
+        os.kill(os.getpid(), signal.SIGKILL)
+    return x
+
+
+class WorkerPoolTests(unittest.TestCase):
+    def test_results_in_input_order(self):
+        with worker_pool.WorkerPool(_square, 3) as pool:
+            results = list(pool.imap(range(20)))
+
+        self.assertEqual([x * x for x in range(20)], results)
+        self.assertEqual(3, pool.stats.workers_started)
+        self.assertEqual(0, pool.stats.workers_recycled)
+        self.assertEqual(3, len(pool.stats.worker_peak_rss_bytes))
+
+    def test_empty_input(self):
+        with worker_pool.WorkerPool(_square, 2) as pool:
+            self.assertEqual([], list(pool.imap([])))
+
+    def test_recycle_after_max_tasks(self):
+        policy = worker_pool.RecyclePolicy(max_tasks=2)
+        with worker_pool.WorkerPool(_pid, 2, policy) as pool:
+            pids = list(pool.imap(range(10)))
+
+        for pid in set(pids):
+            self.assertLessEqual(pids.count(pid), 2)
+        self.assertGreaterEqual(len(set(pids)), 5)
+        self.assertGreaterEqual(pool.stats.workers_recycled, 3)
+        self.assertEqual(pool.stats.workers_started, len(pool.stats.worker_peak_rss_bytes))
+
+    def test_recycle_after_max_rss(self):
+        policy = worker_pool.RecyclePolicy(max_rss_bytes=1)
+        with worker_pool.WorkerPool(_pid, 1, policy) as pool:
+            pids = list(pool.imap(range(3)))
+
+        self.assertEqual(3, len(set(pids)))
+
+    def test_exception_raised_in_order(self):
+        results = []
+        with self.assertRaises(ValueError) as context:
+            with worker_pool.WorkerPool(_fail_on_three, 2) as pool:
+                for result in pool.imap(range(6)):
+                    results.append(result)
+
+        self.assertEqual([0, 1, 2], results)
+        self.assertEqual('bad value 3', str(context.exception))
+
+    def test_dead_worker_replaced(self):
+        lost = []
+
+        def on_worker_died(arg: int, error: worker_pool.WorkerDied) -> int:
+            lost.append((arg, str(error)))
+            return -1
+
+        with worker_pool.WorkerPool(_killed_on_three, 2, on_worker_died=on_worker_died) as pool:
+            results = list(pool.imap(range(8)))
+
+        self.assertEqual([0, 1, 2, -1, 4, 5, 6, 7], results)
+        self.assertEqual([3], [arg for arg, _ in lost])
+        self.assertTrue(lost[0][1].endswith(f'died with exit code {-signal.SIGKILL}'))
+        self.assertEqual((3, 1), (pool.stats.workers_started, pool.stats.workers_died))
+        self.assertEqual(2, len(pool.stats.worker_peak_rss_bytes))
+
+    def test_dead_worker_raised_in_order(self):
+        results = []
+        with self.assertRaises(worker_pool.WorkerDied):
+            with worker_pool.WorkerPool(_killed_on_three, 2) as pool:
+                for result in pool.imap(range(6)):
+                    results.append(result)
+
+        self.assertEqual([0, 1, 2], results)
+
+    def test_task_report(self):
+        reports = []
+        with worker_pool.WorkerPool(_square, 2, task_report=os.getpid, on_task_report=reports.append) as pool:
+            list(pool.imap(range(5)))
+
+        self.assertEqual(5, len(reports))
+        self.assertNotIn(os.getpid(), reports)
+
+    def test_invalid_processes(self):
+        with self.assertRaises(ValueError):
+            worker_pool.WorkerPool(_square, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()